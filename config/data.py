@@ -42,3 +42,50 @@ if os.path.exists(CONFIG_FILE):
     CLIPBOARD_FILE = config.get('clipboard_file', CLIPBOARD_FILE_DEFAULT)
 else:
     CLIPBOARD_FILE = CLIPBOARD_FILE_DEFAULT
+
+THUMBNAIL_CACHE_SIZE_MB_DEFAULT = 64
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    THUMBNAIL_CACHE_SIZE_MB = config.get('thumbnail_cache_size_mb', THUMBNAIL_CACHE_SIZE_MB_DEFAULT)
+else:
+    THUMBNAIL_CACHE_SIZE_MB = THUMBNAIL_CACHE_SIZE_MB_DEFAULT
+
+VISUALIZER_FPS_DEFAULT = 60
+VISUALIZER_GRAVITY_DEFAULT = 0
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    VISUALIZER_FPS = config.get('visualizer_fps', VISUALIZER_FPS_DEFAULT)
+    VISUALIZER_GRAVITY = config.get('visualizer_gravity', VISUALIZER_GRAVITY_DEFAULT)
+else:
+    VISUALIZER_FPS = VISUALIZER_FPS_DEFAULT
+    VISUALIZER_GRAVITY = VISUALIZER_GRAVITY_DEFAULT
+
+METRICS_HISTORY_MINUTES_DEFAULT = 5
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    METRICS_HISTORY_MINUTES = config.get('metrics_history_minutes', METRICS_HISTORY_MINUTES_DEFAULT)
+else:
+    METRICS_HISTORY_MINUTES = METRICS_HISTORY_MINUTES_DEFAULT
+
+# Notification storm control: popups per app per minute once the burst is used up
+# (0, the default, disables the limit), and the window in which notifications are
+# folded together
+NOTIFICATION_RATE_LIMIT_DEFAULT = 0
+NOTIFICATION_BURST_DEFAULT = 5
+NOTIFICATION_COALESCE_SECONDS_DEFAULT = 10
+NOTIFICATION_REPLACE_APPS_DEFAULT = ["Spotify"]
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, 'r') as f:
+        config = json.load(f)
+    NOTIFICATION_RATE_LIMIT = config.get('notification_rate_limit', NOTIFICATION_RATE_LIMIT_DEFAULT)
+    NOTIFICATION_BURST = config.get('notification_burst', NOTIFICATION_BURST_DEFAULT)
+    NOTIFICATION_COALESCE_SECONDS = config.get('notification_coalesce_seconds', NOTIFICATION_COALESCE_SECONDS_DEFAULT)
+    NOTIFICATION_REPLACE_APPS = config.get('notification_replace_apps', NOTIFICATION_REPLACE_APPS_DEFAULT)
+else:
+    NOTIFICATION_RATE_LIMIT = NOTIFICATION_RATE_LIMIT_DEFAULT
+    NOTIFICATION_BURST = NOTIFICATION_BURST_DEFAULT
+    NOTIFICATION_COALESCE_SECONDS = NOTIFICATION_COALESCE_SECONDS_DEFAULT
+    NOTIFICATION_REPLACE_APPS = NOTIFICATION_REPLACE_APPS_DEFAULT
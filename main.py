@@ -1,3 +1,7 @@
+# The profiler has to be enabled before anything else is imported
+from utils.startup_profiler import enable_from_argv
+profiler = enable_from_argv()
+
 # ensure usage of gtk 3
 import gi
 gi.require_version("Gtk", "3.0")
@@ -29,12 +33,18 @@ if __name__ == "__main__":
         example_wallpaper = os.path.expanduser(f"~/.wallpapers/example-1.jpg")
         os.symlink(example_wallpaper, current_wallpaper)
 
-    corners = Corners()
-    bar = Bar()
-    sidebar = SideBar(main_bar=bar)
-    notification = NotificationWindow()
-    notch = Notch(notif_win=notification)
-    dock = Dock() 
+    with profiler.measure("Corners"):
+        corners = Corners()
+    with profiler.measure("Bar"):
+        bar = Bar()
+    with profiler.measure("SideBar"):
+        sidebar = SideBar(main_bar=bar)
+    with profiler.measure("NotificationWindow"):
+        notification = NotificationWindow()
+    with profiler.measure("Notch"):
+        notch = Notch(notif_win=notification)
+    with profiler.measure("Dock"):
+        dock = Dock() 
     bar.notch = notch
     notch.bar = bar
     app = Application(f"{APP_NAME}", bar, notch, dock, notification)
@@ -50,6 +60,9 @@ if __name__ == "__main__":
 
     app.set_css = set_css
 
-    app.set_css()
+    with profiler.measure("Stylesheet"):
+        app.set_css()
+
+    profiler.watch_first_paint(bar, f"{CACHE_DIR}/startup-profile.txt")
 
     app.run()
@@ -1,13 +1,14 @@
 # Standard library imports
 import os
-import struct
 import subprocess
 import re
 import ctypes
 import signal
+import time
+from array import array
 
 # Third-party imports
-from gi.repository import GLib, Gtk, Gdk
+from gi.repository import GLib, Gtk, Gdk, Gio
 from loguru import logger
 from math import pi
 
@@ -16,6 +17,8 @@ from fabric.widgets.overlay import Overlay
 from fabric.utils.helpers import get_relative_path
 
 import configparser
+from config.data import VISUALIZER_FPS, VISUALIZER_GRAVITY
+from services.hyprland_state import HyprlandState
 
 def get_bars(file_path):
     config = configparser.ConfigParser()
@@ -26,14 +29,19 @@ CAVA_CONFIG = get_relative_path("../config/cavalcade/cava.ini")
 
 bars = get_bars(CAVA_CONFIG)
 
+COLORS_CSS = get_relative_path("../styles/colors.css")
+# Frames read from the FIFO in one go; when the main loop lags only the newest is drawn
+READ_FRAMES = 8
+
 def set_death_signal():
     """
-    Set the death signal of the child process to SIGTERM so that if the parent
+    Set the death signal of the child process to SIGKILL so that if the parent
     process is killed, the child (cava) is automatically terminated.
+    SIGTERM would stay pending while cava is stopped by pause().
     """
     libc = ctypes.CDLL("libc.so.6")
     PR_SET_PDEATHSIG = 1
-    libc.prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+    libc.prctl(PR_SET_PDEATHSIG, signal.SIGKILL)
 
 class Cava:
     """
@@ -60,12 +68,23 @@ class Cava:
         is_16bit = True
         self.byte_type, self.byte_size, self.byte_norm = ("H", 2, 65535) if is_16bit else ("B", 1, 255)
 
+        # Preallocated buffers: the FIFO is read into read_buffer and the newest complete
+        # frame is copied into frame, which the spectrum reads through a typed view.
+        self.frame_size = self.byte_size * self.bars
+        self.read_buffer = bytearray(self.frame_size * READ_FRAMES)
+        self.read_view = memoryview(self.read_buffer)
+        self.pending = 0  # Bytes of an incomplete frame at the start of read_buffer
+        self.frame = array(self.byte_type, bytes(self.frame_size))
+        self.frame_bytes = memoryview(self.frame).cast("B")
+
         if not os.path.exists(self.path):
             os.mkfifo(self.path)
 
         self.fifo_fd = None
         self.fifo_dummy_fd = None
         self.io_watch_id = None
+        self.process = None
+        self.paused = False
 
     def _run_process(self):
         logger.debug("Launching cava process...")
@@ -91,23 +110,26 @@ class Cava:
         self.io_watch_id = GLib.io_add_watch(self.fifo_fd, GLib.IO_IN, self._io_callback)
 
     def _io_callback(self, source, condition):
-        chunk = self.byte_size * self.bars  # number of bytes for given format
         try:
-            data = os.read(self.fifo_fd, chunk)
+            read = os.readv(self.fifo_fd, [self.read_view[self.pending:]])
+        except BlockingIOError:
+            return True
         except OSError as e:
             # logger.error("Error reading FIFO: {}".format(e))
             return False
 
-        # When no data is read, do not remove the IO watch immediately.
-        if len(data) < chunk:
-            # Instead of closing the FIFO, we log a warning and continue.
-            # logger.warning("Incomplete data packet received (expected {} bytes, got {}). Waiting for more data...".format(chunk, len(data)))
-            # Returning True keeps the IO watch active. A real EOF will only occur when the writer closes.
-            return True
-
-        fmt = self.byte_type * self.bars  # format string for struct.unpack
-        sample = [i / self.byte_norm for i in struct.unpack(fmt, data)]
-        GLib.idle_add(self.data_handler, sample)
+        available = self.pending + read
+        complete = available // self.frame_size
+        if complete:
+            # Older frames that piled up while the main loop was busy are dropped
+            end = complete * self.frame_size
+            self.frame_bytes[:] = self.read_view[end - self.frame_size:end]
+            self.pending = available - end
+            self.read_view[:self.pending] = self.read_view[end:available]
+            self.data_handler(self.frame, self.byte_norm)
+        else:
+            # Incomplete packet: keep it and wait for the rest of the frame
+            self.pending = available
         return True
 
     def _on_stop(self):
@@ -124,6 +146,36 @@ class Cava:
         self._start_io_reader()
         self._run_process()
 
+    def pause(self):
+        """Stop reading the FIFO and freeze the cava process without killing it"""
+        if self.paused or self.fifo_fd is None:
+            return
+        self.paused = True
+        if self.io_watch_id:
+            GLib.source_remove(self.io_watch_id)
+            self.io_watch_id = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGSTOP)
+
+    def resume(self):
+        """Continue a paused cava, or launch it the first time it is needed"""
+        if self.fifo_fd is None:
+            self.start()
+            return
+        if not self.paused:
+            return
+        self.paused = False
+        # Whatever was written before the pause is stale
+        try:
+            while os.read(self.fifo_fd, len(self.read_buffer)):
+                pass
+        except BlockingIOError:
+            pass
+        self.pending = 0
+        if self.process is not None and self.process.poll() is None:
+            self.process.send_signal(signal.SIGCONT)
+        self.io_watch_id = GLib.io_add_watch(self.fifo_fd, GLib.IO_IN, self._io_callback)
+
     def restart(self):
         """Restart cava process"""
         if self.state == self.RUNNING:
@@ -138,7 +190,7 @@ class Cava:
     def close(self):
         """Stop cava process"""
         self.state = self.CLOSING
-        if self.process.poll() is None:
+        if self.process is not None and self.process.poll() is None:
             self.process.kill()
         if self.io_watch_id:
             GLib.source_remove(self.io_watch_id)
@@ -161,9 +213,18 @@ class Spectrum:
     """Spectrum drawing"""
     def __init__(self):
         self.silence_value = 0
-        self.audio_sample = []
+        self.audio_sample = array("H", bytes(2 * bars))
+        self.audio_norm = 1
+        self.levels = array("d", bytes(8 * bars))  # Drawn bar heights in [0, 1]
         self.color = None
 
+        # Render governor: redraws are capped to VISUALIZER_FPS and stop when nothing moves
+        self.frame_interval = max(1, int(1000 / max(VISUALIZER_FPS, 1)))
+        self.gravity = VISUALIZER_GRAVITY  # Falloff in bar heights per second, 0 disables it
+        self._tick_id = 0
+        self._last_tick = 0.0
+        self._has_new_sample = False
+
         self.area = Gtk.DrawingArea()
         self.area.connect("draw", self.redraw)
         self.area.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
@@ -178,20 +239,66 @@ class Spectrum:
         self.area.connect("configure-event", self.size_update)
         self.color_update()
 
+        # The color is cached and only re-read when the generated colors change
+        self.color_monitor = Gio.File.new_for_path(COLORS_CSS).monitor_file(Gio.FileMonitorFlags.NONE, None)
+        self.color_monitor.connect("changed", self.on_colors_changed)
+
     def is_silence(self, value):
         """Check if volume level critically low during last iterations"""
         self.silence_value = 0 if value > 0 else self.silence_value + 1
         return self.silence_value > self.silence
 
-    def update(self, data):
-        """Audio data processing"""
-        self.color_update()
+    def update(self, data, norm):
+        """Audio data processing. data is a reused buffer of raw samples in [0, norm]."""
         self.audio_sample = data
+        self.audio_norm = norm
         if not self.is_silence(self.audio_sample[0]):
-            self.area.queue_draw()
+            self.schedule_frame()
         elif self.silence_value == (self.silence + 1):
-            self.audio_sample = [0] * self.sizes.number
+            self.audio_sample = array("H", bytes(2 * bars))
+            self.schedule_frame()
+
+    def schedule_frame(self):
+        """Samples arriving between two frames just replace each other"""
+        self._has_new_sample = True
+        if not self._tick_id:
+            self._last_tick = time.monotonic()
+            self._tick_id = GLib.timeout_add(self.frame_interval, self._tick)
+            self._render_frame()
+
+    def stop_frames(self):
+        if self._tick_id:
+            GLib.source_remove(self._tick_id)
+            self._tick_id = 0
+
+    def _tick(self):
+        if self._render_frame():
+            return True
+        self._tick_id = 0
+        return False
+
+    def _render_frame(self):
+        """Move the drawn levels towards the latest sample; returns False once nothing changes"""
+        now = time.monotonic()
+        dt = now - self._last_tick
+        self._last_tick = now
+
+        scale = 1 / self.audio_norm
+        # Bars jump up to new peaks and fall back at a constant speed
+        fall = self.gravity * dt if self.gravity > 0 else None
+        levels = self.levels
+        changed = False
+        for i, raw in enumerate(self.audio_sample):
+            level = raw * scale
+            if fall is not None:
+                level = max(level, levels[i] - fall)
+            if level != levels[i]:
+                levels[i] = level
+                changed = True
+        if changed or self._has_new_sample:
             self.area.queue_draw()
+        self._has_new_sample = False
+        return changed
 
     def redraw(self, widget, cr):
         """Draw spectrum graph"""
@@ -199,7 +306,7 @@ class Spectrum:
         dx = 3
 
         center_y = self.sizes.area.height / 2  # center vertical of the drawing area
-        for i, value in enumerate(self.audio_sample):
+        for value in self.levels:
             width = self.sizes.area.width / self.sizes.number - self.sizes.padding
             radius = width / 2
             height = max(self.sizes.bar.height * min(value, 1), self.sizes.zero) / 2
@@ -230,11 +337,16 @@ class Spectrum:
         self.sizes.bar.width = max(int(tw / self.sizes.number), 1)
         self.sizes.bar.height = self.sizes.area.height
 
+    def on_colors_changed(self, monitor, file, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.CREATED):
+            self.color_update()
+            self.area.queue_draw()
+
     def color_update(self):
         """Set drawing color according to current settings by reading primary color from CSS"""
         color = "#a5c8ff"  # default value
         try:
-            with open(get_relative_path("../styles/colors.css"), "r") as f:
+            with open(COLORS_CSS, "r") as f:
                 content = f.read()
                 m = re.search(r"--primary:\s*(#[0-9a-fA-F]{6})", content)
                 if m:
@@ -244,7 +356,7 @@ class Spectrum:
         red = int(color[1:3], 16) / 255
         green = int(color[3:5], 16) / 255
         blue = int(color[5:7], 16) / 255
-        self.color = Gdk.RGBA(red=red, green=green, blue=blue, alpha=1.0)
+        self.color = (red, green, blue, 1.0)
 
 class SpectrumRender:
     def __init__(self, mode=None, **kwargs):
@@ -253,7 +365,36 @@ class SpectrumRender:
 
         self.draw = Spectrum()
         self.cava = Cava(self)
-        self.cava.start()
+
+        # cava only runs while the spectrum can actually be seen
+        self._pause_reasons = {"unmapped"}
+        self.draw.area.connect("map", lambda *_: self.set_paused("unmapped", False))
+        self.draw.area.connect("unmap", lambda *_: self.set_paused("unmapped", True))
+
+        self.hyprland = HyprlandState.get_initial()
+        self.hyprland.connect("clients-changed", self._check_fullscreen)
+        self.hyprland.connect("workspace-changed", self._check_fullscreen)
+        self._check_fullscreen()
+
+    def set_paused(self, reason: str, paused: bool):
+        """Pause while any reason (unmapped, fullscreen, hidden) applies"""
+        if paused:
+            self._pause_reasons.add(reason)
+        else:
+            self._pause_reasons.discard(reason)
+
+        if self._pause_reasons:
+            self.cava.pause()
+            self.draw.stop_frames()
+        else:
+            self.cava.resume()
+
+    def _check_fullscreen(self, *_):
+        fullscreen = any(
+            client.get("fullscreen")
+            for client in self.hyprland.get_clients_on_workspace(self.hyprland.active_workspace)
+        )
+        self.set_paused("fullscreen", fullscreen)
 
     def get_spectrum_box(self):
         # Get the spectrum box
@@ -1,20 +1,47 @@
-import operator
-from collections.abc import Iterator
 from fabric.widgets.box import Box
 from fabric.widgets.label import Label
 from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
-from fabric.widgets.scrolledwindow import ScrolledWindow
-from fabric.utils import idle_add, remove_handler, exec_shell_command_async
+from fabric.utils import exec_shell_command_async
 from gi.repository import GLib, Gdk
 import modules.icons as icons
-from config.data import CLIPBOARD_FILE
-import os
+from config.data import CACHE_DIR, CLIPBOARD_FILE
+import re
 import subprocess
-from thefuzz import fuzz
-from config.data import FUZZY_THRESHOLD
-import sqlite3
 import chardet
+from utils.storage import Database
+from widgets.recycled_list import RecycledList
+
+CLIPBOARD_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS c (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, contents text)",
+)
+
+CLIPBOARD_SEARCH_FILE = f"{CACHE_DIR}/clipboard_search.db"
+
+# Full-text index over the whole history. The history file belongs to the clipboard
+# watcher, so the index lives in a database of our own, attached as "search", with
+# rows keyed by entry id. It catches up with the history whenever the clipboard opens.
+CLIPBOARD_SEARCH_SCHEMA = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search.c_fts USING fts5(contents)",
+)
+CLIPBOARD_SEARCH_SYNC = (
+    # Entries deleted since the last sync, by us or by another client
+    "DELETE FROM search.c_fts WHERE rowid NOT IN (SELECT id FROM c)",
+    # Entries added since the last sync
+    '''INSERT INTO search.c_fts (rowid, contents)
+       SELECT id, contents FROM c
+       WHERE id > coalesce((SELECT rowid FROM search.c_fts ORDER BY rowid DESC LIMIT 1), 0)''',
+)
+# Earlier versions indexed the history file in place; undo that
+LEGACY_SEARCH_CLEANUP = (
+    "DROP TRIGGER IF EXISTS main.c_fts_ai",
+    "DROP TRIGGER IF EXISTS main.c_fts_ad",
+    "DROP TRIGGER IF EXISTS main.c_fts_au",
+    "DROP TABLE IF EXISTS main.c_fts",
+)
+
+PAGE_SIZE = 50  # Entries fetched per page while scrolling
+RESULT_LIMIT = 1000  # Maximum number of entries listed for one query
 
 class Clipboard(Box):
     def __init__(self, **kwargs):
@@ -28,10 +55,25 @@ class Clipboard(Box):
         self.notch = kwargs["notch"]
         self.selected_index = -1  # Track the selected item index
 
-        self._arranger_handler: int = 0
         self._sorted_filtered_clipboard_entries = []
+        self._query = ""
+        self._has_more = False
+        self.db = Database.get(
+            CLIPBOARD_FILE,
+            CLIPBOARD_SCHEMA,
+            wal=False,
+            attach={"search": CLIPBOARD_SEARCH_FILE},
+        )
+        self._search_ready = False
+        statements = CLIPBOARD_SEARCH_SCHEMA + CLIPBOARD_SEARCH_SYNC
+        if self.db.query_one("SELECT 1 FROM main.sqlite_master WHERE name = 'c_fts'") is not None:
+            statements = LEGACY_SEARCH_CLEANUP + statements
+        # Index whatever was added while we weren't running, in the background
+        self.db.write_many(
+            [(statement, ()) for statement in statements],
+            callback=self.on_search_index_built,
+        )
 
-        self.viewport = Box(name="viewport", spacing=4, orientation="v")
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Clipboard...",
@@ -41,13 +83,17 @@ class Clipboard(Box):
             on_key_press_event=self.on_search_entry_key_press,  # Handle key presses
         )
         self.search_entry.props.xalign = 0.5
-        self.scrolled_window = ScrolledWindow(
+        self.scrolled_window = RecycledList(
+            create_row=self.bake_clipboard_entry_slot,
+            bind_row=self.bind_clipboard_entry_slot,
+            row_height=52,
+            spacing=4,
             name="scrolled-window",
-            spacing=10,
             min_content_size=(450, 105),
             max_content_size=(450, 705),
-            child=self.viewport,
+            on_end_reached=self.load_next_page,
         )
+        self.viewport = self.scrolled_window.viewport
 
         self.header_box = Box(
             name="header_box",
@@ -85,85 +131,100 @@ class Clipboard(Box):
         self.add(self.launcher_box)
         self.show_all()
 
-    def get_clipboard_history(self):
-        self.create_db_if_not_exists(CLIPBOARD_FILE)
-
-        conn = sqlite3.connect(CLIPBOARD_FILE)
-        cursor = conn.cursor()
-        cursor.execute('''SELECT id, contents FROM c ORDER BY id DESC LIMIT 20''')
+    def has_search_index(self):
+        return self.db.query_one("SELECT 1 FROM search.sqlite_master WHERE type = 'table' AND name = 'c_fts'") is not None
+
+    def on_search_index_built(self):
+        self._search_ready = self.has_search_index()
+        if self._search_ready and self._query:
+            self.arrange_viewport(self._query)
+
+    def get_clipboard_history(self, query: str = "", offset: int = 0, limit: int = PAGE_SIZE):
+        # Contents are read as bytes so one invalid entry doesn't abort the whole query
+        tokens = re.findall(r"\w+", query)
+        if not query.strip():
+            rows = self.db.query(
+                "SELECT id, CAST(contents AS BLOB) FROM c ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset),
+            )
+        elif self._search_ready and tokens:
+            # Every word must match as a prefix; best matches first, then newest
+            rows = self.db.query(
+                '''SELECT c.id, CAST(c.contents AS BLOB) FROM search.c_fts JOIN c ON c.id = c_fts.rowid
+                   WHERE c_fts MATCH ? ORDER BY c_fts.rank, c.id DESC LIMIT ? OFFSET ?''',
+                (" ".join(f'"{token}"*' for token in tokens), limit, offset),
+            )
+        else:
+            # No index yet, or a query without words: plain substring search
+            rows = self.db.query(
+                "SELECT id, CAST(contents AS BLOB) FROM c WHERE instr(lower(contents), ?) > 0 ORDER BY id DESC LIMIT ? OFFSET ?",
+                (query.lower(), limit, offset),
+            )
 
         rtn = []
-        for _ in range(20):
+        for entry_id, contents in rows:
             try:
-                output = cursor.fetchone()
-                if output is None:
-                    # no entries left
-                    break
-                rtn.append((output[0], output[1]))
-            except:
+                rtn.append((entry_id, bytes(contents or b"").decode("utf-8")))
+            except UnicodeDecodeError:
                 print(f"Skipping invalid UTF-8 entry")
 
-        conn.close()
-
         return rtn
 
     def close_clipboard(self):
-        self.viewport.children = []
+        self.scrolled_window.set_items([])
         self.selected_index = -1  # Reset selection
         self.notch.force_close_notch()
 
     def open_clipboard(self):
-        self.arrange_viewport()
+        if self._search_ready:
+            self.db.write_many(
+                [(statement, ()) for statement in CLIPBOARD_SEARCH_SYNC],
+                callback=self.on_search_index_built,
+            )
+        self.reload_history()
+
+    def reload_history(self):
+        self.arrange_viewport(self.search_entry.get_text())
 
     def arrange_viewport(self, query: str = ""):
-        # remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self._all_clipboard_entries = self.get_clipboard_history()
-        self.viewport.children = []
         self.selected_index = -1 # Clear selection when viewport changes
-        
-        filtered_sorted = sorted (
-                [ # list comprehension to filter out mismatching entries # da wollen wir keine liste, sondern ein dict also {} ^^ right? i think so 
-                (key, value)
-                for key, value in self._all_clipboard_entries
-                if fuzz.partial_ratio(
-                    query.casefold(), value.casefold()
-                ) >= FUZZY_THRESHOLD or query == ""
-            ],
-            key=lambda e: -(e[0])
-        )
-        
-        self._sorted_filtered_clipboard_entries = filtered_sorted        
-        filtered_entries_iter = iter(filtered_sorted)
 
-        should_resize = operator.length_hint(filtered_entries_iter) == len(self._all_clipboard_entries)
+        # Only the first page is read now; the rest is fetched while scrolling
+        entries = self.get_clipboard_history(query)
+        self._query = query
+        self._has_more = len(entries) == PAGE_SIZE
+        self._sorted_filtered_clipboard_entries = entries
+        should_resize = not query.strip()
+
+        self.scrolled_window.set_items(entries)
+        self.handle_arrange_complete(should_resize, query)
 
-        self._arranger_handler = idle_add(
-            lambda clipboard_iter: self.add_next_clipboard_entry(clipboard_iter) or self.handle_arrange_complete(should_resize, query),
-            filtered_entries_iter,
-            pin=True,
+    def load_next_page(self):
+        entries = self._sorted_filtered_clipboard_entries
+        if not self._has_more or len(entries) >= RESULT_LIMIT:
+            return
+        page = self.get_clipboard_history(
+            self._query, len(entries), min(PAGE_SIZE, RESULT_LIMIT - len(entries))
         )
+        self._has_more = len(page) == PAGE_SIZE
+        entries.extend(page)
+        self.scrolled_window.extend_items(page)
 
     def handle_arrange_complete(self, should_resize, query):
         if should_resize:
-            self.resize_viewport()
+            GLib.idle_add(self.resize_viewport)
         # Only auto-select first item if query exists
-        if query.strip() != "" and self.viewport.get_children():
+        if query.strip() != "" and self._sorted_filtered_clipboard_entries:
             self.update_selection(0)
         return False
 
-    def add_next_clipboard_entry(self, entries_iter: Iterator[(str, str)]):
-        if not (entry := next(entries_iter, None)):
-            return False
-        self.viewport.add(self.bake_clipboard_entry_slot(entry))
-        return True
-
     def resize_viewport(self):
         self.scrolled_window.set_min_content_width(
             self.viewport.get_allocation().width  # type: ignore
         )
         return False
 
-    def bake_clipboard_entry_slot(self, entry: tuple[str, str], **kwargs) -> Button:
+    def bake_clipboard_entry_slot(self, **kwargs) -> Button:
         button = Button(
             name="clipboard-entry-slot-button",
             child=Box(
@@ -173,22 +234,26 @@ class Clipboard(Box):
                 children=[
                     Label(
                         name="clipboard-entry-label",
-                        label=entry[1] or "Unknown",
                         ellipsization="end",
                         v_align="center",
                         h_align="center",
                     ),
                 ],
             ),
-            on_clicked=lambda *_: self.copy_or_rightclick(entry, None, None),
+            on_clicked=lambda button, *_: self.copy_or_rightclick(button.item, None, None),
             **kwargs,
         )
         button.connect(
             "button-press-event",
-            lambda button, event: self.copy_or_rightclick(entry, button, event)
+            lambda button, event: self.copy_or_rightclick(button.item, button, event)
         )
         return button
 
+    def bind_clipboard_entry_slot(self, button: Button, entry: tuple[int, str], index: int):
+        label = button.get_child().get_children()[0]
+        # Slots are recycled, so every entry is shown on a single line of the same height
+        label.set_label(" ".join((entry[1] or "Unknown").split()) or "Unknown")
+
     def copy_or_rightclick(self, entry, button, event):
         if event == None or event.button == Gdk.BUTTON_PRIMARY:
             self.copy_text_to_clipboard(entry[1])
@@ -198,55 +263,19 @@ class Clipboard(Box):
             self.delete_from_history(entry[0])
 
     def update_selection(self, new_index: int):
-        # Unselect current
-        if self.selected_index != -1 and self.selected_index < len(self.viewport.get_children()):
-            current_button = self.viewport.get_children()[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-        # Select new
-        if new_index != -1 and new_index < len(self.viewport.get_children()):
-            new_button = self.viewport.get_children()[new_index]
-            new_button.get_style_context().add_class("selected")
-            self.selected_index = new_index
-            self.scroll_to_selected(new_button)
-        else:
-            self.selected_index = -1
-
-    def scroll_to_selected(self, button):
-        def scroll():
-            adj = self.scrolled_window.get_vadjustment()
-            alloc = button.get_allocation()
-            if alloc.height == 0:
-                return False  # Retry if allocation isn't ready
-
-            y = alloc.y
-            height = alloc.height
-            page_size = adj.get_page_size()
-            current_value = adj.get_value()
-
-            # Calculate visible boundaries
-            visible_top = current_value
-            visible_bottom = current_value + page_size
-
-            if y < visible_top:
-                # Item above viewport - align to top
-                adj.set_value(y)
-            elif y + height > visible_bottom:
-                # Item below viewport - align to bottom
-                new_value = y + height - page_size
-                adj.set_value(new_value)
-            # No action if already fully visible
-            return False
-        GLib.idle_add(scroll)
+        # The list moves the "selected" class and scrolls the slot into view
+        self.scrolled_window.select(new_index)
+        self.selected_index = self.scrolled_window.selected_index
 
     def on_search_entry_activate(self, text):
-        children = self.viewport.get_children()
-        if children:
+        entries = self._sorted_filtered_clipboard_entries
+        if entries:
             # Only activate if we have selection or non-empty query
             if text.strip() == "" and self.selected_index == -1:
                 return  # Prevent accidental activation when empty
             selected_index = self.selected_index if self.selected_index != -1 else 0
-            if 0 <= selected_index < len(children):
-                children[selected_index].clicked()
+            if 0 <= selected_index < len(entries):
+                self.copy_or_rightclick(entries[selected_index], None, None)
 
     def delete_selected_from_history(self):
         selected_entry_id = self._sorted_filtered_clipboard_entries[self.selected_index][0]
@@ -272,7 +301,7 @@ class Clipboard(Box):
         return False
 
     def move_selection(self, delta: int):
-        children = self.viewport.get_children()
+        children = self._sorted_filtered_clipboard_entries
         if not children:
             return
         # Allow starting selection from nothing when empty
@@ -289,34 +318,17 @@ class Clipboard(Box):
         except subprocess.CalledProcessError as e:
             print(f"Clipboard copy failed: {e}")
 
-    def create_db_if_not_exists(self, db_path):
-        if not os.path.exists(db_path):
-            subprocess.call(['touch', db_path])
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS c
-                (id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, contents text)''')
-            conn.commit()
-            conn.close()
-
     def delete_from_history(self, entry_id):
-        conn = sqlite3.connect(CLIPBOARD_FILE)
-        cursor = conn.cursor()
-
-        cursor.execute('''DELETE FROM c WHERE id = ?''', (entry_id,))
-
-        conn.commit()
-        conn.close()
-
-        self.arrange_viewport(self.search_entry.get_text())
+        self.db.write_many(
+            [
+                ("DELETE FROM c WHERE id = ?", (entry_id,)),
+                ("DELETE FROM search.c_fts WHERE rowid = ?", (entry_id,)),
+            ],
+            callback=self.reload_history,
+        )
 
     def clear_clipboard_database(self):
-        conn = sqlite3.connect(CLIPBOARD_FILE)
-        cursor = conn.cursor()
-
-        cursor.execute('''DELETE FROM c''')
-
-        conn.commit()
-        conn.close()
-
-        self.arrange_viewport(self.search_entry.get_text())
+        self.db.write_many(
+            [("DELETE FROM c", ()), ("DELETE FROM search.c_fts", ())],
+            callback=self.reload_history,
+        )
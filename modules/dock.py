@@ -2,13 +2,14 @@ import json
 from gi.repository import GLib, Gtk, Gdk, Gio
 import cairo
 from utils.icon_resolver import IconResolver
-from utils.occlusion import check_occlusion
+from utils.occlusion import OcclusionEngine
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.image import Image
 from fabric.widgets.eventbox import EventBox
 from fabric.widgets.wayland import WaylandWindow as Window
 from fabric.hyprland.widgets import get_hyprland_connection
+from services.hyprland_state import HyprlandState
 from fabric.utils import exec_shell_command, exec_shell_command_async, idle_add, remove_handler, get_relative_path
 from fabric.utils.helpers import get_desktop_applications
 
@@ -85,6 +86,7 @@ class Dock(Window):
         Dock._instances.append(self)
         self.config = read_config()
         self.conn = get_hyprland_connection()
+        self.state = HyprlandState.get_initial()
         self.icon = IconResolver()
         self.pinned = self.config.get("pinned_apps", [])
         self.config_path = get_relative_path("../config/dock.json")
@@ -97,6 +99,10 @@ class Dock(Window):
         self._arranger_handler = None
         self._drag_in_progress = False  # Drag lock flag
         self.is_hovered = False
+        self.is_occluded = False
+        self._buttons = {}  # Dock buttons keyed by (section, app key, occurrence), reused across updates
+        self._unresolved_classes = set()  # Window classes that already triggered an app map refresh
+        self.separator = Box(orientation="v", v_expand=True, name="dock-separator")
 
         # Set up UI containers
         self.view = Box(name="viewport", orientation="h", spacing=8)
@@ -133,19 +139,18 @@ class Dock(Window):
         self.view.connect("drag-begin", self.on_drag_begin)
         self.view.connect("drag-end", self.on_drag_end)
 
-        # Initialization
-        if self.conn.ready:
+        # Initialization (the state service emits its signals once it has loaded)
+        if self.state.is_ready:
             self.update_dock()
             GLib.timeout_add(500, self.check_hide)
-        else:
-            self.conn.connect("event::ready", self.update_dock)
-            self.conn.connect("event::ready", self.check_hide)
 
-        for ev in ("activewindow", "openwindow", "closewindow", "changefloatingmode"):
-            self.conn.connect(f"event::{ev}", self.update_dock)
-        self.conn.connect("event::workspace", self.check_hide)
+        self.state.connect("clients-changed", self.update_dock)
+        self.state.connect("focus-changed", self._on_focus_changed)
+        self.state.connect("workspace-changed", self.check_hide)
 
-        GLib.timeout_add(250, self.check_occlusion_state)
+        # Get notified by the geometry index only when the dock area's occupancy changes
+        self.occlusion = OcclusionEngine.get_initial()
+        self.occlusion.watch((0, data.CURRENT_HEIGHT - 80, data.CURRENT_WIDTH, 80), self._on_occlusion_changed)
         # Monitor dock.json for changes
         GLib.timeout_add_seconds(1, self.check_config_change)
         
@@ -245,7 +250,7 @@ class Dock(Window):
         # Immediate occlusion check on true leave
         occlusion_region = (0, data.CURRENT_HEIGHT - 70, data.CURRENT_WIDTH, 70)
         # Only add occlusion style if not dragging an icon.
-        if not self._drag_in_progress and (check_occlusion(occlusion_region) or not self.view.get_children()):
+        if not self._drag_in_progress and (self.occlusion.is_occluded(occlusion_region) or not self.view.get_children()):
             self.wrapper.add_style_class("occluded")
         return True
 
@@ -329,10 +334,6 @@ class Dock(Window):
                 
         items = [Image(pixbuf=icon_img)]
 
-        tooltip = display_name or (id_value if isinstance(id_value, str) else "Unknown")
-        if not display_name and instances and instances[0].get("title"):
-            tooltip = instances[0]["title"]
-
         button = Button(
             child=Box(
                 name="dock-icon",
@@ -340,18 +341,17 @@ class Dock(Window):
                 h_align="center",
                 children=items,
             ),
-            on_clicked=lambda *a: self.handle_app(app_identifier, instances, desktop_app), # Pass desktop_app as well
-            tooltip_text=tooltip,
+            # Read the data from the button so that reused buttons act on their current instances
+            on_clicked=lambda btn, *a: self.handle_app(btn.app_identifier, btn.instances, btn.desktop_app),
             name="dock-app-button",
         )
 
         # Store app data with the button for future reference
         button.app_identifier = app_identifier
         button.desktop_app = desktop_app
-        button.instances = instances
-
-        if instances:
-            button.add_style_class("instance") # Style running apps
+        button.display_name = display_name
+        button.instances = []
+        self.update_button(button, app_identifier, instances)
 
         # Enable DnD for ALL apps
         button.drag_source_set(
@@ -374,6 +374,49 @@ class Dock(Window):
         button.connect("enter-notify-event", self._on_child_enter)
         return button
 
+    def update_button(self, button, app_identifier, instances):
+        """Update the running state of an existing dock button without rebuilding it"""
+        button.app_identifier = app_identifier
+        old_addresses = [inst.get("address") for inst in button.instances]
+        button.instances = instances
+
+        id_value = app_identifier["name"] if isinstance(app_identifier, dict) else app_identifier
+        tooltip = button.display_name or (id_value if isinstance(id_value, str) else "Unknown")
+        if not button.display_name and instances and instances[0].get("title"):
+            tooltip = instances[0]["title"]
+        if button.get_tooltip_text() != tooltip:
+            button.set_tooltip_text(tooltip)
+
+        if instances:
+            button.add_style_class("instance") # Style running apps
+        else:
+            button.remove_style_class("instance")
+
+        if old_addresses != [inst.get("address") for inst in instances]:
+            focused = self.get_focused()
+            if any(inst.get("address") == focused for inst in instances):
+                button.add_style_class("focused")
+            else:
+                button.remove_style_class("focused")
+
+    def _button_key(self, app_identifier):
+        """Stable key for a dock entry, independent of the windows currently open"""
+        if isinstance(app_identifier, dict):
+            for key in ("name", "window_class", "executable", "command_line", "display_name"):
+                if app_identifier.get(key):
+                    return str(app_identifier[key]).lower()
+            return ""
+        return str(app_identifier).lower()
+
+    def _on_focus_changed(self, _, old_address, new_address):
+        """Move the focus indicator between the (at most two) affected buttons"""
+        for button in self._buttons.values():
+            addresses = [inst.get("address") for inst in button.instances]
+            if old_address in addresses:
+                button.remove_style_class("focused")
+            if new_address in addresses:
+                button.add_style_class("focused")
+
     # Enhanced app launching with multiple fallbacks
     def handle_app(self, app_identifier, instances, desktop_app=None):
         """Handle application button clicks with improved fallbacks"""
@@ -455,9 +498,7 @@ class Dock(Window):
 
     def check_hide(self, *args):
         """Determine if dock should auto-hide"""
-        clients = self.get_clients()
-        current_ws = self.get_workspace()
-        ws_clients = [w for w in clients if w["workspace"]["id"] == current_ws]
+        ws_clients = self.state.get_clients_on_workspace(self.get_workspace())
 
         if not ws_clients:
             self.toggle_dock(show=True)
@@ -467,8 +508,7 @@ class Dock(Window):
             self.toggle_dock(show=True)
 
     def update_dock(self, *args):
-        """Refresh dock contents and clear drag lock."""
-        self.update_app_map()  # Update app map before creating buttons
+        """Reconcile dock buttons with the running clients and clear drag lock."""
         arranger_handler = getattr(self, "_arranger_handler", None)
         if arranger_handler:
             remove_handler(arranger_handler)
@@ -508,7 +548,7 @@ class Dock(Window):
             running_windows.setdefault(window_id, []).append(c)
         
         # Map pinned apps to their running instances
-        pinned_buttons = []
+        pinned_items = []
         used_window_classes = set()  # Track which window classes we've already assigned
         
         for app_data in self.pinned:
@@ -558,11 +598,11 @@ class Dock(Window):
             if matched_class:
                 used_window_classes.add(matched_class)
             
-            # Create button for this pinned app with any found instances
-            pinned_buttons.append(self.create_button(app_data, instances))
+            # Keep this pinned app with any found instances
+            pinned_items.append((app_data, instances))
         
         # For any remaining window classes that aren't assigned to pinned apps
-        open_buttons = []
+        open_items = []
         for class_name, instances in running_windows.items():
             if class_name not in used_window_classes:
                 # Enhanced app identification for running windows
@@ -580,6 +620,12 @@ class Dock(Window):
                 # 3. Try with our more robust find_app method
                 if not app:
                     app = self.find_app_by_key(class_name)
+
+                # 3b. Refresh the desktop entries once per unknown class, the app may be newly installed
+                if not app and class_name not in self._unresolved_classes:
+                    self._unresolved_classes.add(class_name)
+                    self.update_app_map()
+                    app = self.app_identifiers.get(class_name) or self.find_app_by_key(class_name)
                 
                 # 4. Try using window title which often contains app name
                 if not app and instances and instances[0].get("title"):
@@ -603,18 +649,56 @@ class Dock(Window):
                     # Fallback to just class name
                     identifier = class_name
                 
-                open_buttons.append(self.create_button(identifier, instances))
+                open_items.append((identifier, instances))
+
+        pinned_buttons = self._reconcile_buttons("pinned", pinned_items)
+        open_buttons = self._reconcile_buttons("open", open_items)
+
+        # Drop buttons for apps that are neither pinned nor running anymore
+        wanted = set(pinned_buttons) | set(open_buttons)
+        for key in [k for k, b in self._buttons.items() if b not in wanted]:
+            self._buttons.pop(key).destroy()
 
         # Assemble dock layout
-        children = pinned_buttons
+        children = list(pinned_buttons)
         # Only add separator if both pinned and open buttons exist
         if pinned_buttons and open_buttons:
-            children += [Box(orientation="v", v_expand=True, name="dock-separator")]
+            children.append(self.separator)
         children += open_buttons
-        
-        self.view.children = children
-        idle_add(self._update_size)
+
+        # Only touch the container when the set or order of buttons changed
+        if self.view.get_children() != children:
+            for child in self.view.get_children():
+                if child not in children:
+                    self.view.remove(child)
+            current = self.view.get_children()
+            for child in children:
+                if child not in current:
+                    self.view.add(child)
+                    child.show_all()
+            for index, child in enumerate(children):
+                self.view.reorder_child(child, index)
+            idle_add(self._update_size)
         self._drag_in_progress = False  # Clear the drag lock
+        self.check_occlusion_state()
+
+    def _reconcile_buttons(self, section, items):
+        """Reuse buttons keyed by app so only instance state changes; create buttons only for new apps"""
+        buttons = []
+        seen = {}
+        for app_identifier, instances in items:
+            app_key = self._button_key(app_identifier)
+            # Entries resolving to the same app key are told apart by their occurrence
+            seen[app_key] = seen.get(app_key, -1) + 1
+            key = (section, app_key, seen[app_key])
+            button = self._buttons.get(key)
+            if button is None:
+                button = self.create_button(app_identifier, instances)
+                self._buttons[key] = button
+            else:
+                self.update_button(button, app_identifier, instances)
+            buttons.append(button)
+        return buttons
 
     def _update_size(self):
         """Update window size based on content"""
@@ -624,41 +708,31 @@ class Dock(Window):
 
     def get_clients(self):
         """Get current client list"""
-        try:
-            return json.loads(self.conn.send_command("j/clients").reply.decode())
-        except json.JSONDecodeError:
-            return []
+        return self.state.clients
 
     def get_focused(self):
         """Get focused window address"""
-        try:
-            return json.loads(
-                self.conn.send_command("j/activewindow").reply.decode()
-            ).get("address", "")
-        except json.JSONDecodeError:
-            return ""
+        return self.state.active_address
 
     def get_workspace(self):
         """Get current workspace ID"""
-        try:
-            return json.loads(
-                self.conn.send_command("j/activeworkspace").reply.decode()
-            ).get("id", 0)
-        except json.JSONDecodeError:
-            return 0
+        return self.state.active_workspace
+
+    def _on_occlusion_changed(self, occluded):
+        """Called by the occlusion engine when windows start or stop covering the dock area"""
+        self.is_occluded = occluded
+        self.check_occlusion_state()
 
     def check_occlusion_state(self):
-        """Periodic occlusion check"""
+        """Apply the occlusion style from the last known occlusion state"""
         # Skip occlusion check if hovered or dragging an icon
         if self.is_hovered or self._drag_in_progress:
             self.wrapper.remove_style_class("occluded")
-            return True
-        occlusion_region = (0, data.CURRENT_HEIGHT - 80, data.CURRENT_WIDTH, 80)
-        if check_occlusion(occlusion_region) or not self.view.get_children():
+            return
+        if self.is_occluded or not self.view.get_children():
             self.wrapper.add_style_class("occluded")
         else:
             self.wrapper.remove_style_class("occluded")
-        return True
 
     def _find_drag_target(self, widget):
         """Find valid drag target in viewport"""
@@ -761,6 +835,7 @@ class Dock(Window):
                                 exec_shell_command(f"hyprctl dispatch closewindow address:{address}")
                                 self.update_dock()  # Update dock after closing window
             self._drag_in_progress = False  # Clear the drag lock
+            self.check_occlusion_state()
 
         GLib.idle_add(process_drag_end)  # Deferred execution with idle_add
 
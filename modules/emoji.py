@@ -2,14 +2,13 @@ from fabric.widgets.box import Box
 from fabric.widgets.label import Label
 from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
-from fabric.widgets.stack import Stack
-from fabric.utils import remove_handler
 from fabric.utils.helpers import get_relative_path
-from gi.repository import Gdk
+from gi.repository import Gdk, Gtk
 import modules.icons as icons
 import os
 import subprocess
 import ijson
+from widgets.recycled_list import RecycledList
 
 class EmojiPicker(Box):
     def __init__(self, **kwargs):
@@ -22,21 +21,23 @@ class EmojiPicker(Box):
 
         self.notch = kwargs["notch"]
         self.selected_index = -1
-        self.emojis_per_page = 9 * 3
-        self.current_page_index = 0
+        self.columns = 9
+        self.visible_rows = 3
         self.filtered_emojis = []
-        self.total_pages = 0
 
-        self._arranger_handler: int = 0
         self._all_emojis = self._load_emoji_data()
 
-        self.stack = Stack(
-            name="viewport",
-            spacing=4,
-            orientation="v",
-            transition_type="slide-up-down",
-            transition_duration=200,
+        # Rows of emoji slots are recycled while scrolling through the results
+        self.grid = RecycledList(
+            create_row=self.bake_emoji_row,
+            bind_row=self.bind_emoji_row,
+            row_height=66,
+            spacing=2,
+            visible_rows=self.visible_rows,
+            name="scrolled-window",
         )
+        self.grid.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        self.grid.set_propagate_natural_width(True)
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Emojis...",
@@ -68,7 +69,7 @@ class EmojiPicker(Box):
             orientation="v",
             children=[
                 self.header_box,
-                self.stack,
+                self.grid,
             ],
         )
 
@@ -90,73 +91,62 @@ class EmojiPicker(Box):
         return emoji_data
 
     def close_picker(self):
-        self.stack.children = []
+        self.grid.set_items([])
         self.selected_index = -1
         self.notch.force_close_notch()
 
     def open_picker(self):
         self.search_entry.set_text("")
-        self.current_page_index = 0
         self.arrange_viewport()
         self.search_entry.grab_focus()
 
     def arrange_viewport(self, query: str = ""):
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.stack.children = []
         self.selected_index = -1
-        self.current_page_index = 0
 
         self.filtered_emojis = [
             (emoji_char, emoji_info)
             for emoji_char, emoji_info in self._all_emojis.items()
             if query.casefold() in (emoji_info.get("name", "") + " " + emoji_info.get("group", "")).casefold()
         ]
-        self.total_pages = (len(self.filtered_emojis) + self.emojis_per_page - 1) // self.emojis_per_page if self.filtered_emojis else 0
-
-        self.load_page(self.current_page_index)
+        self.grid.set_items([
+            self.filtered_emojis[start:start + self.columns]
+            for start in range(0, len(self.filtered_emojis), self.columns)
+        ])
 
         should_resize = not query
 
         if should_resize:
             self.resize_viewport()
-        if query.strip() != "" and self.get_all_emoji_buttons():
+        if query.strip() != "" and self.filtered_emojis:
             self.update_selection(0)
 
-    def load_page(self, page_index):
-        self.update_selection(-1)
-        page_box = Box(name=f"page-box-{page_index}", orientation="v", spacing=4)
-        start_index = page_index * self.emojis_per_page
-        end_index = min((page_index + 1) * self.emojis_per_page, len(self.filtered_emojis))
-        page_emojis = self.filtered_emojis[start_index:end_index]
-
-        grid_box = Box(name="emoji-grid-box", orientation="v", spacing=2)
-
-        row_box = None
-        for i, (emoji_char, emoji_info) in enumerate(page_emojis):
-            if i % 9 == 0:
-                row_box = Box(name="emoji-row-box", orientation="h", spacing=2)
-                grid_box.add(row_box)
-            if row_box is not None:
-                row_box.add(self.bake_emoji_slot(emoji_char, emoji_info))
-        page_box.add(grid_box)
-        self.stack.add_named(page_box, f"page-{page_index}")
-        self.stack.set_visible_child_name(f"page-{page_index}")
-        page_box.show_all()
+    def resize_viewport(self):
+        return False
 
+    def bake_emoji_row(self) -> Box:
+        return Box(
+            name="emoji-row-box",
+            orientation="h",
+            spacing=2,
+            children=[self.bake_emoji_slot() for _ in range(self.columns)],
+        )
 
-        buttons = self.get_all_emoji_buttons()
-        if buttons and self.selected_index != -1:
-            page_relative_index = self.selected_index % self.emojis_per_page
-            if page_relative_index < len(buttons):
-                self.update_selection(page_relative_index)
+    def bind_emoji_row(self, row_box: Box, row_emojis: list, row_index: int):
+        for column, button in enumerate(row_box.get_children()):
+            if column >= len(row_emojis):
+                button.set_visible(False)
+                continue
+            emoji_char, emoji_info = row_emojis[column]
+            button.emoji_char = emoji_char
+            button.get_child().get_children()[0].set_label(emoji_char)
+            button.set_tooltip_text(emoji_info.get("name", "Unknown"))
+            if row_index * self.columns + column == self.selected_index:
+                button.get_style_context().add_class("selected")
             else:
-                self.update_selection(len(buttons) - 1)
-
+                button.get_style_context().remove_class("selected")
+            button.set_visible(True)
 
-    def resize_viewport(self):
-        return False
-
-    def bake_emoji_slot(self, emoji_char: str, emoji_info: dict, **kwargs) -> Button:
+    def bake_emoji_slot(self, **kwargs) -> Button:
         button = Button(
             name="emoji-slot-button",
             child=Box(
@@ -167,7 +157,6 @@ class EmojiPicker(Box):
                 children=[
                     Label(
                         name="emoji-char-label",
-                        label=emoji_char,
                         use_markup=True,
                         v_align="center",
                         h_align="center",
@@ -175,49 +164,30 @@ class EmojiPicker(Box):
                     ),
                 ],
             ),
-            tooltip_text=emoji_info.get("name", "Unknown"),
-            on_clicked=lambda *_: (self.copy_emoji_to_clipboard(emoji_char), self.close_picker()),
+            on_clicked=lambda button, *_: (self.copy_emoji_to_clipboard(button.emoji_char), self.close_picker()),
             **kwargs,
         )
         return button
 
     def update_selection(self, new_index: int):
-        buttons = self.get_all_emoji_buttons()
-        if not buttons:
-            self.selected_index = -1
-            return
-
-        if self.selected_index != -1 and self.selected_index < len(buttons):
-            current_button = buttons[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-            if not buttons or current_button not in buttons:
-                self.selected_index = -1
-
-        if 0 <= new_index < len(buttons):
-            new_button = buttons[new_index]
-            new_button.get_style_context().add_class("selected")
-            self.selected_index = new_index
-        else:
-             self.selected_index = -1
-
-
-    def get_all_emoji_buttons(self):
-        buttons = []
-        current_page = self.stack.get_visible_child()
-        if current_page and current_page.get_children():
-            if current_page.get_children()[0].get_children():
-                for row_box in current_page.get_children()[0].get_children():
-                    buttons.extend(row_box.get_children())
-        return buttons
-
+        if not 0 <= new_index < len(self.filtered_emojis):
+            new_index = -1
+        self.selected_index = new_index
+        if new_index != -1:
+            self.grid.scroll_to_index(new_index // self.columns)
+        # Re-bind the visible rows so the "selected" class follows the selection
+        self.grid.refresh()
 
     def on_search_entry_activate(self, text):
-        buttons = self.get_all_emoji_buttons()
-        if buttons:
+        if self.filtered_emojis:
             if self.selected_index != -1:
-                buttons[self.selected_index].clicked()
-            elif buttons and text.strip() != "":
-                buttons[0].clicked()
+                emoji_char = self.filtered_emojis[self.selected_index][0]
+            elif text.strip() != "":
+                emoji_char = self.filtered_emojis[0][0]
+            else:
+                return
+            self.copy_emoji_to_clipboard(emoji_char)
+            self.close_picker()
 
     def on_search_entry_key_press(self, widget, event):
         if event.keyval in (Gdk.KEY_Up, Gdk.KEY_Down, Gdk.KEY_Left, Gdk.KEY_Right):
@@ -229,82 +199,24 @@ class EmojiPicker(Box):
         return False
 
     def move_selection_2d(self, keyval):
-        buttons = self.get_all_emoji_buttons()
-        total_items_current_page = len(buttons)
-        if total_items_current_page == 0:
+        total_items = len(self.filtered_emojis)
+        if total_items == 0:
             return
 
-        rows = 3
-        columns = 9
-
         if self.selected_index == -1:
-            if keyval in (Gdk.KEY_Down, Gdk.KEY_Right):
-                new_index = 0
-            elif keyval in (Gdk.KEY_Up, Gdk.KEY_Left):
-                new_index = total_items_current_page - 1
-            else:
-                return
-        else:
-            current_index_page = self.selected_index
-            row = current_index_page // columns
-            col = current_index_page % columns
-
-            if keyval == Gdk.KEY_Right:
-                new_col = (col + 1) % columns
-                new_row = row
-                if new_col == 0:
-                    new_row = (row + 1)
-            elif keyval == Gdk.KEY_Left:
-                new_col = (col - 1) % columns
-                new_row = row
-                if new_col == (columns - 1):
-                    new_row = (row - 1)
-            elif keyval == Gdk.KEY_Down:
-                new_row = row + 1
-                new_col = col
-            elif keyval == Gdk.KEY_Up:
-                new_row = row - 1
-                new_col = col
-            else:
-                return
-
-            if new_row >= rows:
-                if self.current_page_index < self.total_pages - 1:
-                    current_col = col # Keep track of current column
-                    self.current_page_index += 1
-                    self.load_page(self.current_page_index)
-                    new_index = current_col # Try to keep the same column
-                    if new_index >= total_items_current_page: # if column is out of bound, select last
-                        new_index = total_items_current_page - 1
-                    self.selected_index = -1
-                    self.update_selection(new_index)
-                    return
-                else:
-                    new_index = total_items_current_page - 1
-            elif new_row < 0:
-                if self.current_page_index > 0:
-                    current_col = col # Keep track of current column
-                    self.current_page_index -= 1
-                    self.load_page(self.current_page_index)
-                    new_index = (rows - 1) * columns + current_col # Select last row, same column
-                    if new_index >= total_items_current_page: # if column is out of bound, select last
-                        new_index = total_items_current_page -1
-                    self.selected_index = -1
-                    self.update_selection(new_index)
-                    return
-                else:
-                    new_index = 0
-            else:
-                new_index = new_row * columns + new_col
-                if new_index >= total_items_current_page:
-                    new_index = total_items_current_page - 1
-
-        if new_index < 0:
             new_index = 0
-        elif new_index >= total_items_current_page:
-            new_index = total_items_current_page - 1
+        elif keyval == Gdk.KEY_Right:
+            new_index = self.selected_index + 1
+        elif keyval == Gdk.KEY_Left:
+            new_index = self.selected_index - 1
+        elif keyval == Gdk.KEY_Down:
+            new_index = self.selected_index + self.columns
+        elif keyval == Gdk.KEY_Up:
+            new_index = self.selected_index - self.columns
+        else:
+            return
 
-        self.update_selection(new_index)
+        self.update_selection(max(0, min(new_index, total_items - 1)))
 
     def copy_emoji_to_clipboard(self, emoji_char: str):
         try:
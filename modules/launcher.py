@@ -1,12 +1,9 @@
-import operator
-from collections.abc import Iterator
 from fabric.widgets.box import Box
 from fabric.widgets.label import Label
 from fabric.widgets.button import Button
 from fabric.widgets.entry import Entry
 from fabric.widgets.image import Image
-from fabric.widgets.scrolledwindow import ScrolledWindow
-from fabric.utils import DesktopApp, get_desktop_applications, idle_add, remove_handler, exec_shell_command_async
+from fabric.utils import DesktopApp, get_desktop_applications, exec_shell_command_async
 from fabric.utils.helpers import get_relative_path
 from gi.repository import GLib, Gdk
 import modules.icons as icons
@@ -16,10 +13,16 @@ import os
 import re
 import math
 import subprocess
-from thefuzz import fuzz
-from config.data import FUZZY_THRESHOLD
+from utils.fuzzy_index import FuzzyIndex
+from widgets.recycled_list import RecycledList
 from modules.dock import Dock  # Import the Dock class
-import sqlite3
+from utils.storage import Database
+
+RECENT_APPS_DB = os.path.expanduser("~/.cache/ax-shell/recent_apps.db")
+RECENT_APPS_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS apps (name text, importance int)",
+    "CREATE INDEX IF NOT EXISTS apps_name_idx ON apps (name)",
+)
 
 class AppLauncher(Box):
     def __init__(self, **kwargs):
@@ -33,8 +36,11 @@ class AppLauncher(Box):
         self.notch = kwargs["notch"]
         self.selected_index = -1  # Track the selected item index
 
-        self._arranger_handler: int = 0
         self._all_apps = get_desktop_applications()
+        self.search_index = self.build_search_index()
+        self._app_order = None  # Recent app importance, loaded once per launcher opening
+        self._icon_cache = {}  # App icons, loaded once per launcher opening
+        self.db = Database.get(RECENT_APPS_DB, RECENT_APPS_SCHEMA)
 
         # Calculator history initialization
         self.calc_history_path = f"{data.CACHE_DIR}/calc.json"
@@ -44,7 +50,6 @@ class AppLauncher(Box):
         else:
             self.calc_history = []
 
-        self.viewport = Box(name="viewport", spacing=4, orientation="v")
         self.search_entry = Entry(
             name="search-entry",
             placeholder="Search Applications...",
@@ -57,13 +62,18 @@ class AppLauncher(Box):
             on_key_press_event=self.on_search_entry_key_press,  # Handle key presses
         )
         self.search_entry.props.xalign = 0.5
-        self.scrolled_window = ScrolledWindow(
+        # Only the visible slots exist; they are re-bound to apps (or calculator
+        # history entries) when the results change or the list is scrolled
+        self.scrolled_window = RecycledList(
+            create_row=self.bake_application_slot,
+            bind_row=self.bind_application_slot,
+            row_height=60,
+            spacing=4,
             name="scrolled-window",
-            spacing=10,
             min_content_size=(450, 105),
             max_content_size=(450, 105),
-            child=self.viewport,
         )
+        self.viewport = self.scrolled_window.viewport
 
         self.header_box = Box(
             name="header_box",
@@ -102,85 +112,65 @@ class AppLauncher(Box):
         self.show_all()
 
     def close_launcher(self):
-        self.viewport.children = []
+        self.scrolled_window.set_items([])
         self.selected_index = -1  # Reset selection
         self.notch.force_close_notch()
 
     def open_launcher(self):
         self._all_apps = get_desktop_applications()
+        self.search_index = self.build_search_index()
+        self._app_order = self.get_db_app_order()
+        self._icon_cache = {}
         self.arrange_viewport()
 
+    def build_search_index(self):
+        return FuzzyIndex(
+            self._all_apps,
+            lambda app: (app.display_name or "") + (" " + app.name + " ") + (app.generic_name or ""),
+        )
+
     def arrange_viewport(self, query: str = ""):
         if query.startswith("="):
             # In calculator mode, update history view once (not per keystroke)
             self.update_calculator_viewport()
             return
-        remove_handler(self._arranger_handler) if self._arranger_handler else None
-        self.viewport.children = []
         self.selected_index = -1  # Clear selection when viewport changes
 
-        apps_recent_order = self.get_db_app_order()
-        
-        filtered_apps_iter = iter(
-            sorted(
-                [
-                    app
-                    for app in self._all_apps
-                    if fuzz.partial_ratio(
-                        query.casefold(),
-                        (
-                            (app.display_name or "")
-                            + (" " + app.name + " ")
-                            + (app.generic_name or "")
-                        ).casefold(),
-                    ) >= FUZZY_THRESHOLD or query == ""
-                ],
-                key=lambda app: (
-                    -(
-                        apps_recent_order.get(app.name, 0) * 1  # Importance (weight = 1)
-                        + fuzz.partial_ratio(  # Fuzzy similarity (weight = 100)
-                            query.casefold(),
-                            (
-                                (app.display_name or "")
-                                + (" " + app.name + " ")
-                                + (app.generic_name or "")
-                            ).casefold(),
-                        )
-                        * 100
-                    ),
-                    (app.display_name or "").casefold(),  # Fallback: sort by display name
+        if self._app_order is None:
+            self._app_order = self.get_db_app_order()
+        apps_recent_order = self._app_order
+
+        # Scores are computed once per query by the index
+        filtered_apps = sorted(
+            self.search_index.search(query),
+            key=lambda match: (
+                -(
+                    apps_recent_order.get(match[0].name, 0) * 1  # Importance (weight = 1)
+                    + match[1] * 100  # Fuzzy similarity (weight = 100)
                 ),
-            )
+                (match[0].display_name or "").casefold(),  # Fallback: sort by display name
+            ),
         )
-        should_resize = operator.length_hint(filtered_apps_iter) == len(self._all_apps)
+        should_resize = len(filtered_apps) == len(self._all_apps)
 
-        self._arranger_handler = idle_add(
-            lambda apps_iter: self.add_next_application(apps_iter) or self.handle_arrange_complete(should_resize, query),
-            filtered_apps_iter,
-            pin=True,
-        )
+        self.scrolled_window.set_items([app for app, _ in filtered_apps])
+        self.handle_arrange_complete(should_resize, query)
 
     def handle_arrange_complete(self, should_resize, query):
         if should_resize:
-            self.resize_viewport()
+            GLib.idle_add(self.resize_viewport)
         # Only auto-select first item if query exists
-        if query.strip() != "" and self.viewport.get_children():
+        if query.strip() != "" and self.scrolled_window.items:
             self.update_selection(0)
         return False
 
-    def add_next_application(self, apps_iter: Iterator[DesktopApp]):
-        if not (app := next(apps_iter, None)):
-            return False
-        self.viewport.add(self.bake_application_slot(app))
-        return True
-
     def resize_viewport(self):
         self.scrolled_window.set_min_content_width(
             self.viewport.get_allocation().width  # type: ignore
         )
         return False
 
-    def bake_application_slot(self, app: DesktopApp, **kwargs) -> Button:
+    def bake_application_slot(self, **kwargs) -> Button:
         button = Button(
             name="app-slot-button",
             child=Box(
@@ -188,26 +178,48 @@ class AppLauncher(Box):
                 orientation="h",
                 spacing=10,
                 children=[
-                    Image(name="app-icon", pixbuf=app.get_icon_pixbuf(size=24), h_align="start"),
+                    Image(name="app-icon", h_align="start"),
                     Label(
                         name="app-label",
-                        label=app.display_name or "Unknown",
                         ellipsization="end",
                         v_align="center",
                         h_align="center",
                     ),
                 ],
             ),
-            tooltip_text=app.description,
-            on_clicked=lambda *_: self.launch_or_rightclick(app, None, None),
+            on_clicked=lambda button, *_: self.on_slot_clicked(button.item),
             **kwargs,
         )
         button.connect(
             "button-press-event",
-            lambda button, event: self.launch_or_rightclick(app, button, event)
+            lambda button, event: self.launch_or_rightclick(button.item, button, event)
+            if isinstance(button.item, DesktopApp) else None
         )
         return button
 
+    def bind_application_slot(self, button: Button, item: DesktopApp | str, index: int):
+        icon, label = button.get_child().get_children()
+        if isinstance(item, str):
+            # Calculator history entry
+            icon.set_visible(False)
+            label.set_name("calc-label")
+            label.set_label(item)
+            button.set_tooltip_text(item)
+            return
+        if item.name not in self._icon_cache:
+            self._icon_cache[item.name] = item.get_icon_pixbuf(size=24)
+        icon.set_from_pixbuf(self._icon_cache[item.name])
+        icon.set_visible(True)
+        label.set_name("app-label")
+        label.set_label(item.display_name or "Unknown")
+        button.set_tooltip_text(item.description)
+
+    def on_slot_clicked(self, item: DesktopApp | str):
+        if isinstance(item, str):
+            self.copy_text_to_clipboard(item)
+        elif item is not None:
+            self.launch_or_rightclick(item, None, None)
+
     def launch_or_rightclick(self, app, button, event):
         print (event)
         if event == None or event.button == Gdk.BUTTON_PRIMARY:
@@ -218,45 +230,9 @@ class AppLauncher(Box):
             self.delete_from_history(app.name)
 
     def update_selection(self, new_index: int):
-        # Unselect current
-        if self.selected_index != -1 and self.selected_index < len(self.viewport.get_children()):
-            current_button = self.viewport.get_children()[self.selected_index]
-            current_button.get_style_context().remove_class("selected")
-        # Select new
-        if new_index != -1 and new_index < len(self.viewport.get_children()):
-            new_button = self.viewport.get_children()[new_index]
-            new_button.get_style_context().add_class("selected")
-            self.selected_index = new_index
-            self.scroll_to_selected(new_button)
-        else:
-            self.selected_index = -1
-
-    def scroll_to_selected(self, button):
-        def scroll():
-            adj = self.scrolled_window.get_vadjustment()
-            alloc = button.get_allocation()
-            if alloc.height == 0:
-                return False  # Retry if allocation isn't ready
-
-            y = alloc.y
-            height = alloc.height
-            page_size = adj.get_page_size()
-            current_value = adj.get_value()
-
-            # Calculate visible boundaries
-            visible_top = current_value
-            visible_bottom = current_value + page_size
-
-            if y < visible_top:
-                # Item above viewport - align to top
-                adj.set_value(y)
-            elif y + height > visible_bottom:
-                # Item below viewport - align to bottom
-                new_value = y + height - page_size
-                adj.set_value(new_value)
-            # No action if already fully visible
-            return False
-        GLib.idle_add(scroll)
+        # The list moves the "selected" class and scrolls the slot into view
+        self.scrolled_window.select(new_index)
+        self.selected_index = self.scrolled_window.selected_index
 
     def on_search_entry_activate(self, text):
         if text.startswith("="):
@@ -272,14 +248,14 @@ class AppLauncher(Box):
             case ":p":
                 self.notch.open_notch("power")
             case _:
-                children = self.viewport.get_children()
-                if children:
+                items = self.scrolled_window.items
+                if items:
                     # Only activate if we have selection or non-empty query
                     if text.strip() == "" and self.selected_index == -1:
                         return  # Prevent accidental activation when empty
                     selected_index = self.selected_index if self.selected_index != -1 else 0
-                    if 0 <= selected_index < len(children):
-                        children[selected_index].clicked()
+                    if 0 <= selected_index < len(items):
+                        self.on_slot_clicked(items[selected_index])
 
     def on_search_entry_key_press(self, widget, event):
         if event.keyval in (Gdk.KEY_Return, Gdk.KEY_KP_Enter) and (event.state & Gdk.ModifierType.SHIFT_MASK):
@@ -325,16 +301,10 @@ class AppLauncher(Box):
 
     def add_selected_app_to_dock(self):
         """Adds the currently selected application to the dock.json file with comprehensive metadata."""
-        children = self.viewport.get_children()
-        if not children or self.selected_index == -1 or self.selected_index >= len(children):
+        selected_app = self.scrolled_window.selected_item
+        if not isinstance(selected_app, DesktopApp):
             return  # No app selected
 
-        selected_button = children[self.selected_index]
-        # Extract the app's display name from the label to find the DesktopApp object
-        selected_app = next((app for app in self._all_apps if app.display_name == selected_button.get_child().get_children()[1].props.label), None)
-        if not selected_app:
-            return
-
         # Create comprehensive app data dictionary - Include all available properties
         # Filter out None values to keep the JSON clean
         app_data = {k: v for k, v in {
@@ -380,7 +350,7 @@ class AppLauncher(Box):
         Dock.notify_config_change()
 
     def move_selection(self, delta: int):
-        children = self.viewport.get_children()
+        children = self.scrolled_window.items
         if not children:
             return
         # Allow starting selection from nothing when empty
@@ -417,37 +387,15 @@ class AppLauncher(Box):
         self.update_calculator_viewport()
 
     def update_calculator_viewport(self):
-        self.viewport.children = []
-        for item in self.calc_history:
-            btn = self.create_calc_history_button(item)
-            self.viewport.add(btn)
+        self.scrolled_window.set_items(self.calc_history)
+        # Keep the highlighted result when the history is re-bound.
+        if self.selected_index != -1:
+            self.update_selection(self.selected_index)
         # Remove resetting selected_index unconditionally so that a highlighted result isn't lost.
         # Optionally, only reset if the input is not more than "=".
         # if self.search_entry.get_text().strip() != "=":
         #     self.selected_index = -1
 
-    def create_calc_history_button(self, text: str) -> Button:
-        btn = Button(
-            name="app-slot-button",  # reuse existing CSS styling
-            child=Box(
-                name="calc-slot-box",
-                orientation="h",
-                spacing=10,
-                children=[
-                    Label(
-                        name="calc-label",
-                        label=text,
-                        ellipsization="end",
-                        v_align="center",
-                        h_align="center",
-                    ),
-                ],
-            ),
-            tooltip_text=text,
-            on_clicked=lambda *_: self.copy_text_to_clipboard(text),
-        )
-        return btn
-
     def copy_text_to_clipboard(self, text: str):
         # Split the text on "=>" and copy only the result part if available
         parts = text.split("=>", 1)
@@ -464,62 +412,29 @@ class AppLauncher(Box):
             self.update_calculator_viewport()
 
     def get_db_app_order(self):
-        db_path = os.path.expanduser(f'~/.cache/ax-shell/recent_apps.db')
-        self.create_db_if_not_exists(db_path)
-
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''SELECT * FROM apps order by importance desc''')
-        output = cursor.fetchall() 
-        rtn = {}
-        for row in output: 
-          rtn[row[0]] = row[1]
-
-        return rtn
+        return dict(self.db.query("SELECT name, importance FROM apps"))
 
     def update_db_order(self, app_name):
-        db_path = os.path.expanduser(f'~/.cache/ax-shell/recent_apps.db')
-        self.create_db_if_not_exists(db_path)
-
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''SELECT importance FROM apps WHERE name = ?''', (app_name,))
-        result = cursor.fetchone()
-
-        if result is not None:
-            importance = int(result[0]) + 1
-            cursor.execute('''UPDATE apps SET importance = ? WHERE name = ?''', (importance, app_name))
-        else:
-            cursor.execute('''INSERT INTO apps (name, importance) VALUES (?, ?)''', (app_name, 1))
-
-        conn.commit()
-        conn.close()
+        self.db.write_many(
+            [
+                ("UPDATE apps SET importance = importance + 1 WHERE name = ?", (app_name,)),
+                (
+                    "INSERT INTO apps (name, importance) SELECT ?, 1 WHERE NOT EXISTS (SELECT 1 FROM apps WHERE name = ?)",
+                    (app_name, app_name),
+                ),
+            ],
+            callback=self.invalidate_app_order,
+        )
 
-    def create_db_if_not_exists(self, db_path):
-        if not os.path.exists(db_path):
-            subprocess.call(['touch', db_path])
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS apps
-                 (name text, importance int)''')
-            conn.commit()
-            conn.close()
+    def invalidate_app_order(self):
+        self._app_order = None
 
     def delete_from_history(self, app_name):
-        db_path = os.path.expanduser(f'~/.cache/ax-shell/recent_apps.db')
-        self.create_db_if_not_exists(db_path)
-
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.execute('''SELECT * FROM apps WHERE name = ?''', (app_name,))
-        result = cursor.fetchone()
-
-        if result is not None:
-            cursor.execute('''DELETE FROM apps WHERE name = ?''', (app_name,))
-
-        conn.commit()
-        conn.close()
-
-        self.arrange_viewport(self.search_entry.get_text())
+        self.db.write(
+            "DELETE FROM apps WHERE name = ?",
+            (app_name,),
+            callback=lambda: (
+                self.invalidate_app_order(),
+                self.arrange_viewport(self.search_entry.get_text()),
+            ),
+        )
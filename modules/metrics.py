@@ -1,14 +1,7 @@
-# Standard library imports
-import re
-import subprocess
-
 # Third-party imports
-import psutil
 from gi.repository import GLib
 
 # Fabric imports
-from fabric.core.fabricator import Fabricator
-from fabric.utils.helpers import exec_shell_command_async
 from fabric.widgets.box import Box
 from fabric.widgets.button import Button
 from fabric.widgets.circularprogressbar import CircularProgressBar
@@ -16,56 +9,41 @@ from fabric.widgets.eventbox import EventBox
 from fabric.widgets.label import Label
 from fabric.widgets.overlay import Overlay
 from fabric.widgets.revealer import Revealer
-from fabric.core.fabricator import Fabricator
-from fabric.utils.helpers import exec_shell_command_async, invoke_repeater
 from fabric.widgets.scale import Scale
 
 # Local imports
 import modules.icons as icons
+from services.metrics import MetricsHistory, MetricsSampler
 from services.network import NetworkClient
-import time
-
-class MetricsProvider:
-    """
-    Class responsible for obtaining centralized CPU, memory, disk usage, and battery metrics.
-    It updates periodically so that all widgets querying it display the same values.
-    """
-    def __init__(self):
-        self.cpu = 0.0
-        self.mem = 0.0
-        self.disk = 0.0
-
-        self.bat_percent = 0.0
-        self.bat_charging = None
-
-        # Updates every 1 second
-        GLib.timeout_add_seconds(1, self._update)
-
-    def _update(self):
-        # Get non-blocking usage percentages (interval=0)
-        # The first call may return 0, but subsequent calls will provide consistent values.
-        self.cpu = psutil.cpu_percent(interval=0)
-        self.mem = psutil.virtual_memory().percent
-        self.disk = psutil.disk_usage("/").percent
-
-        battery = psutil.sensors_battery()
-        if battery is None:
-            self.bat_percent = 0.0
-            self.bat_charging = None
+from widgets.level_bars import LevelBars
+from widgets.sparkline import Sparkline
+
+# Sampling intervals in ms while only the circles are shown and while the levels are revealed
+SMALL_INTERVAL_MS = 2000
+BATTERY_INTERVAL_MS = 5000
+NETWORK_INTERVAL_MS = 3000
+REVEALED_INTERVAL_MS = 1000
+
+# Per-core percentages shown per tooltip line
+CORES_PER_LINE = 8
+
+
+def format_cpu_details(details: dict) -> str:
+    """Tooltip text for the cpu, cores, temp and freq values in details."""
+    lines = [f"CPU {details['cpu']:.0f}%"]
+    if details["temp"] is not None:
+        lines.append(f"Package {details['temp']:.0f} °C")
+    if details["freq"] is not None:
+        current, maximum = details["freq"]
+        if maximum:
+            lines.append(f"{current / 1000:.1f} / {maximum / 1000:.1f} GHz")
         else:
-            self.bat_percent = battery.percent
-            self.bat_charging = battery.power_plugged
-
-        return True
-
-    def get_metrics(self):
-        return (self.cpu, self.mem, self.disk)
+            lines.append(f"{current / 1000:.1f} GHz")
+    cores = details["cores"]
+    for start in range(0, len(cores), CORES_PER_LINE):
+        lines.append(" ".join(f"{percent:3.0f}%" for percent in cores[start:start + CORES_PER_LINE]))
+    return "\n".join(lines)
 
-    def get_battery(self):
-        return (self.bat_percent, self.bat_charging)
-
-# Global instance to share data between both widgets.
-shared_provider = MetricsProvider()
 
 class Metrics(Box):
     def __init__(self, **kwargs):
@@ -189,19 +167,56 @@ class Metrics(Box):
         for x in self.scales:
             self.add(x)
 
-        # Update the widget every second
-        GLib.timeout_add_seconds(1, self.update_status)
+        # Recent history under each scale, drawn straight from the history buffers
+        self.history = MetricsHistory.get_initial()
+        self.sparklines = {}
+        for series, box in (("cpu", self.cpu), ("mem", self.ram), ("disk", self.disk)):
+            buffer = self.history.series.get(series)
+            if buffer is None:
+                continue
+            sparkline = Sparkline(
+                buffer,
+                name="metrics-sparkline",
+                style_classes=series,
+                h_align="center",
+                size=(28, 24),
+            )
+            box.add(sparkline)
+            box.reorder_child(sparkline, 1)
+            self.sparklines[series] = sparkline
+        self.history.connect("updated", self.on_history_updated)
+
+        # Saturation of every core, with temperature and frequency in the tooltip
+        self.core_bars = LevelBars(
+            name="metrics-cores",
+            h_align="center",
+            size=(28, 16),
+        )
+        self.cpu.add(self.core_bars)
+        self.cpu.reorder_child(self.core_bars, len(self.cpu.get_children()) - 2)
+        self.cpu_details = {"cpu": 0.0, "cores": (), "temp": None, "freq": None}
 
-    def update_status(self):
-        # Retrieve centralized data
-        cpu, mem, disk = shared_provider.get_metrics()
+        # Only sampled while the dashboard is shown
+        self.subscription = MetricsSampler.get_initial().subscribe(
+            ("cpu", "cores", "temp", "freq", "mem", "disk"), 1000, self.update_status, widget=self
+        )
 
+    def update_status(self, metric, value):
+        if metric in self.cpu_details:
+            self.cpu_details[metric] = value
+            self.cpu.set_tooltip_text(format_cpu_details(self.cpu_details))
+            if metric == "cores":
+                self.core_bars.set_values(tuple(percent / 100.0 for percent in value))
+            if metric != "cpu":
+                return
         # Normalize to 0.0 - 1.0
-        self.cpu_usage.value = cpu / 100.0
-        self.ram_usage.value = mem / 100.0
-        self.disk_usage.value = disk / 100.0
+        scale = {"cpu": self.cpu_usage, "mem": self.ram_usage, "disk": self.disk_usage}[metric]
+        scale.value = value / 100.0
 
-        return True  # Continue calling this function
+    def on_history_updated(self, history, series):
+        sparkline = self.sparklines.get(series)
+        if sparkline is not None and sparkline.get_mapped():
+            sparkline.queue_draw()
 
     def update_battery(self, sender, battery_data):
         value, charging, icon = battery_data
@@ -334,8 +349,18 @@ class MetricsSmall(Overlay):
             overlays=[event_box]
         )
 
-        # Actualización de métricas cada segundo
-        GLib.timeout_add_seconds(1, self.update_metrics)
+        self.circles = {"cpu": self.cpu_circle, "mem": self.ram_circle, "disk": self.disk_circle}
+        self.levels = {"cpu": self.cpu_level, "mem": self.ram_level, "disk": self.disk_level}
+        sampler = MetricsSampler.get_initial()
+        self.subscription = sampler.subscribe(
+            ("cpu", "mem", "disk"), SMALL_INTERVAL_MS, self.update_metrics, widget=self
+        )
+        # Per-core usage, temperature and frequency are only shown while hovering
+        self.cpu_details = {"cpu": 0.0, "cores": (), "temp": None, "freq": None}
+        self.details_subscription = sampler.subscribe(
+            ("cores", "temp", "freq"), REVEALED_INTERVAL_MS, self.update_cpu_details, widget=self
+        )
+        self.details_subscription.set_enabled(False)
 
         # Estado inicial de los revealers y variables para la gestión del hover
         self.hide_timer = None
@@ -354,6 +379,8 @@ class MetricsSmall(Overlay):
         self.cpu_revealer.set_reveal_child(True)
         self.ram_revealer.set_reveal_child(True)
         self.disk_revealer.set_reveal_child(True)
+        self.subscription.set_interval(REVEALED_INTERVAL_MS)
+        self.details_subscription.set_enabled(True)
         return False
 
     def on_mouse_leave(self, widget, event):
@@ -369,20 +396,21 @@ class MetricsSmall(Overlay):
         self.cpu_revealer.set_reveal_child(False)
         self.ram_revealer.set_reveal_child(False)
         self.disk_revealer.set_reveal_child(False)
+        self.subscription.set_interval(SMALL_INTERVAL_MS)
+        self.details_subscription.set_enabled(False)
         self.hide_timer = None
         return False
 
-    def update_metrics(self):
-        # Recuperar datos centralizados
-        cpu, mem, disk = shared_provider.get_metrics()
-        self.cpu_circle.set_value(cpu / 100.0)
-        self.ram_circle.set_value(mem / 100.0)
-        self.disk_circle.set_value(disk / 100.0)
+    def update_metrics(self, metric, value):
+        self.circles[metric].set_value(value / 100.0)
         # Actualizar etiquetas con el porcentaje formateado
-        self.cpu_level.set_label(self._format_percentage(int(cpu)))
-        self.ram_level.set_label(self._format_percentage(int(mem)))
-        self.disk_level.set_label(self._format_percentage(int(disk)))
-        return True
+        self.levels[metric].set_label(self._format_percentage(int(value)))
+        if metric == "cpu":
+            self.update_cpu_details(metric, value)
+
+    def update_cpu_details(self, metric, value):
+        self.cpu_details[metric] = value
+        self.cpu_box.set_tooltip_text(format_cpu_details(self.cpu_details))
 
 
 class Battery(Overlay):
@@ -442,16 +470,10 @@ class Battery(Overlay):
             overlays=[event_box]
         )
 
-        # Actualización de la batería cada segundo
-        self.batt_fabricator = Fabricator(
-            poll_from=lambda v: shared_provider.get_battery(),
-            on_changed=lambda f, v: self.update_battery,
-            interval=1000,
-            stream=False,
-            default_value=0
+        # Not tied to visibility: the widget hides itself while there is no battery
+        self.subscription = MetricsSampler.get_initial().subscribe(
+            ("battery",), BATTERY_INTERVAL_MS, self.update_battery
         )
-        self.batt_fabricator.changed.connect(self.update_battery)
-        GLib.idle_add(self.update_battery, None, shared_provider.get_battery())
 
         # Estado inicial de los revealers y variables para la gestión del hover
         self.hide_timer = None
@@ -468,6 +490,7 @@ class Battery(Overlay):
             self.hide_timer = None
         # Revelar niveles en hover para todas las métricas
         self.bat_revealer.set_reveal_child(True)
+        self.subscription.set_interval(REVEALED_INTERVAL_MS)
         return False
 
     def on_mouse_leave(self, widget, event):
@@ -481,10 +504,11 @@ class Battery(Overlay):
 
     def hide_revealer(self):
         self.bat_revealer.set_reveal_child(False)
+        self.subscription.set_interval(BATTERY_INTERVAL_MS)
         self.hide_timer = None
         return False
 
-    def update_battery(self, sender, battery_data):
+    def update_battery(self, metric, battery_data):
         value, charging = battery_data
         if value == 0:
             self.set_visible(False)
@@ -543,22 +567,41 @@ class NetworkApplet(Button):
         self.children = Box(
             children=[self.upload_revealer, self.wifi_label, self.download_revealer],
         )
-        self.last_counters = psutil.net_io_counters()
-        self.last_time = time.time()
-        invoke_repeater(3000, self.update_network)
+        self.downloading = False
+        self.uploading = False
+        self.sampler = MetricsSampler.get_initial()
+        self.subscription = self.sampler.subscribe(
+            ("net",), NETWORK_INTERVAL_MS, self.update_network, widget=self
+        )
+        # The per-interface breakdown is only needed for the tooltip while hovering
+        self.tooltip_header = "Disconnected"
+        self.interfaces = ()
+        self.interfaces_subscription = self.sampler.subscribe(
+            ("interfaces",), REVEALED_INTERVAL_MS, self.update_interfaces, widget=self
+        )
+        self.interfaces_subscription.set_enabled(False)
+        # Show the rate of the interface that carries the traffic, not a sum that
+        # also counts docker bridges and other virtual interfaces
+        self.network_client.connect(
+            "notify::primary-interface",
+            lambda *_: self.sampler.set_primary_interface(self.network_client.primary_interface),
+        )
+        # The client may have settled on an interface before this widget existed
+        self.sampler.set_primary_interface(self.network_client.primary_interface)
+
+        self.wifi_signal = None
+        self.network_client.connect("device-ready", self.on_device_ready)
+        self.on_device_ready()
 
         self.connect("enter-notify-event", self.on_mouse_enter)
         self.connect("leave-notify-event", self.on_mouse_leave)
 
-    def update_network(self):
-        current_time = time.time()
-        elapsed = current_time - self.last_time
-        current_counters = psutil.net_io_counters()
-        download_speed = (current_counters.bytes_recv - self.last_counters.bytes_recv) / elapsed
-        upload_speed = (current_counters.bytes_sent - self.last_counters.bytes_sent) / elapsed
+    def update_network(self, metric, rates):
+        download_speed, upload_speed = rates
         self.download_label.set_markup(self.format_speed(download_speed))
         self.upload_label.set_markup(self.format_speed(upload_speed))
 
+        # The rates are smoothed, so a single burst doesn't toggle the urgent state
         self.downloading = (download_speed >= 2e6)
         self.uploading = (upload_speed >= 1e6)
 
@@ -573,6 +616,14 @@ class NetworkApplet(Button):
         if not self.downloading and not self.uploading:
             self.remove_urgent()
 
+    def on_device_ready(self, *_):
+        wifi = self.network_client.wifi_device
+        if wifi is not None and self.wifi_signal is None:
+            # Strength and SSID changes are pushed by NetworkManager, no need to poll them
+            self.wifi_signal = wifi.connect("changed", lambda *_: self.update_wifi())
+        self.update_wifi()
+
+    def update_wifi(self):
         if self.network_client and self.network_client.wifi_device:
             if self.network_client.wifi_device.ssid != "Disconnected":
                 strength = self.network_client.wifi_device.strength
@@ -586,18 +637,25 @@ class NetworkApplet(Button):
                 else:
                     self.wifi_label.set_markup(icons.wifi_0)
 
-                self.set_tooltip_text(self.network_client.wifi_device.ssid)
+                self.tooltip_header = self.network_client.wifi_device.ssid
 
             else:
                 self.wifi_label.set_markup(icons.world_off)
-                self.set_tooltip_text("Disconnected")
+                self.tooltip_header = "Disconnected"
         else:
             self.wifi_label.set_markup(icons.world_off)
-            self.set_tooltip_text("Disconnected")
+            self.tooltip_header = "Disconnected"
+        self.update_tooltip()
+
+    def update_interfaces(self, metric, interfaces):
+        self.interfaces = interfaces
+        self.update_tooltip()
 
-        self.last_counters = current_counters
-        self.last_time = current_time
-        return True
+    def update_tooltip(self):
+        lines = [self.tooltip_header]
+        for name, download, upload in self.interfaces:
+            lines.append(f"{name}  ↓ {self.format_speed(download)}  ↑ {self.format_speed(upload)}")
+        self.set_tooltip_text("\n".join(lines))
 
     def format_speed(self, speed):
         if speed < 1024:
@@ -612,6 +670,8 @@ class NetworkApplet(Button):
         self.remove_urgent()
         self.download_revealer.set_reveal_child(True)
         self.upload_revealer.set_reveal_child(True)
+        self.subscription.set_interval(REVEALED_INTERVAL_MS)
+        self.interfaces_subscription.set_enabled(True)
         return
     
     def on_mouse_leave(self, *_):
@@ -619,6 +679,8 @@ class NetworkApplet(Button):
         self.remove_urgent()
         self.download_revealer.set_reveal_child(False)
         self.upload_revealer.set_reveal_child(False)
+        self.subscription.set_interval(NETWORK_INTERVAL_MS)
+        self.interfaces_subscription.set_enabled(False)
         return
 
     def upload_urgent(self):
@@ -23,6 +23,7 @@ import modules.icons as icons
 import config.data as data
 from modules.player import PlayerSmall
 from modules.tools import Toolbox
+from utils.startup_profiler import StartupProfiler
 
 
 class Notch(Window):
@@ -41,12 +42,17 @@ class Notch(Window):
         self.notif_win = kwargs["notif_win"]
 
         # Luego inicializamos el resto de componentes que dependen de notification_history
-        self.dashboard = Dashboard(notch=self, notif_win=self.notif_win)
-        self.launcher = AppLauncher(notch=self)
-        self.overview = Overview()
-        self.emoji = EmojiPicker(notch=self)
-        self.power = PowerMenu(notch=self)
-        self.clipboard = Clipboard(notch=self)
+        with StartupProfiler.get_initial().measure("Notch: Dashboard"):
+            self.dashboard = Dashboard(notch=self, notif_win=self.notif_win)
+
+        # Rarely used panels are only built the first time they are opened
+        self._panel_factories = {
+            "launcher": lambda: AppLauncher(notch=self),
+            "overview": lambda: Overview(),
+            "emoji": lambda: EmojiPicker(notch=self),
+            "power": lambda: PowerMenu(notch=self),
+            "clipboard": lambda: Clipboard(notch=self),
+        }
 
         self.applet_stack = self.dashboard.widgets.applet_stack
         self.nhistory = self.applet_stack.get_children()[0]
@@ -123,15 +129,11 @@ class Notch(Window):
             transition_duration=100,
             children=[
                 self.compact,
-                self.launcher,
                 self.dashboard,
-                self.overview,
-                self.emoji,
-                self.power,
                 self.tools,
-                self.clipboard,
             ]
         )
+        self._panels = {"dashboard": self.dashboard, "tools": self.tools}
 
         self.stack.connect("notify::visible-child", self.on_visible_child_changed)
         self.compact_stack.connect("notify::visible-child", self.on_visible_child_changed_compact)
@@ -207,12 +209,42 @@ class Notch(Window):
         self.add(self.notch_complete)
         self.show_all()
 
-        self._show_overview_children(False)
-
         self.add_keybinding("Escape", lambda *_: self.force_close_notch())
         self.add_keybinding("Ctrl Tab", lambda *_: self.dashboard.go_to_next_child())
         self.add_keybinding("Ctrl Shift ISO_Left_Tab", lambda *_: self.dashboard.go_to_previous_child())
 
+    def get_panel(self, name):
+        """Return the notch panel called name, building it on first use."""
+        panel = self._panels.get(name)
+        if panel is None:
+            panel = self._panel_factories[name]()
+            self._panels[name] = panel
+            self.stack.add(panel)
+            panel.show_all()
+            if name == "overview":
+                self._show_overview_children(False)
+        return panel
+
+    @property
+    def launcher(self):
+        return self.get_panel("launcher")
+
+    @property
+    def overview(self):
+        return self.get_panel("overview")
+
+    @property
+    def emoji(self):
+        return self.get_panel("emoji")
+
+    @property
+    def power(self):
+        return self.get_panel("power")
+
+    @property
+    def clipboard(self):
+        return self.get_panel("clipboard")
+
     def on_visible_child_changed(self, stack, param):
         self.visible = stack.get_visible_child()
 
@@ -258,7 +290,7 @@ class Notch(Window):
             self.notch_box.remove_style_class("hideshow")
             self.notch_box.add_style_class("hidden")
 
-        for widget in [self.launcher, self.dashboard, self.overview, self.emoji, self.power, self.tools, self.clipboard]:
+        for widget in self._panels.values():
             widget.remove_style_class("open")
         for style in ["launcher", "dashboard", "notification", "overview", "emoji", "power", "tools", "clipboard"]:
             self.stack.remove_style_class(style)
@@ -298,7 +330,7 @@ class Notch(Window):
 
                 for style in ["launcher", "dashboard", "notification", "overview", "emoji", "power", "tools", "clipboard"]:
                     self.stack.remove_style_class(style)
-                for w in [self.launcher, self.dashboard, self.overview, self.emoji, self.power, self.tools, self.clipboard]:
+                for w in self._panels.values():
                     w.remove_style_class("open")
 
                 self.stack.add_style_class("dashboard")
@@ -337,7 +369,7 @@ class Notch(Window):
 
                 for style in ["launcher", "dashboard", "notification", "overview", "emoji", "power", "tools", "clipboard"]:
                     self.stack.remove_style_class(style)
-                for w in [self.launcher, self.dashboard, self.overview, self.emoji, self.power, self.tools, self.clipboard]:
+                for w in self._panels.values():
                     w.remove_style_class("open")
 
                 self.stack.add_style_class("dashboard")
@@ -371,7 +403,7 @@ class Notch(Window):
 
                 for style in ["launcher", "dashboard", "notification", "overview", "emoji", "power", "tools", "clipboard"]:
                     self.stack.remove_style_class(style)
-                for w in [self.launcher, self.dashboard, self.overview, self.emoji, self.power, self.tools, self.clipboard]:
+                for w in self._panels.values():
                     w.remove_style_class("open")
 
                 self.stack.add_style_class("dashboard")
@@ -402,7 +434,7 @@ class Notch(Window):
 
                 for style in ["launcher", "dashboard", "notification", "overview", "emoji", "power", "tools", "clipboard"]:
                     self.stack.remove_style_class(style)
-                for w in [self.launcher, self.dashboard, self.overview, self.emoji, self.power, self.tools, self.clipboard]:
+                for w in self._panels.values():
                     w.remove_style_class("open")
 
                 self.stack.add_style_class("dashboard")
@@ -418,16 +450,8 @@ class Notch(Window):
                 return
 
         # Handle other widgets (launcher, overview, power, tools)
-        widgets = {
-            "launcher": self.launcher,
-            "overview": self.overview,
-            "emoji": self.emoji,
-            "power": self.power,
-            "tools": self.tools,
-            "dashboard": self.dashboard, # Add dashboard here to ensure its style class is removed
-            "clipboard": self.clipboard,
-        }
-        target_widget = widgets.get(widget, self.dashboard)
+        widgets = ["launcher", "overview", "emoji", "power", "tools", "dashboard", "clipboard"]
+        target_widget = self.get_panel(widget) if widget in widgets else self.dashboard
         # If already showing the requested widget, close the notch.
         if self.stack.get_visible_child() == target_widget:
             self.close_notch()
@@ -440,17 +464,17 @@ class Notch(Window):
             self.notch_box.add_style_class("hideshow")
 
         # Clear previous style classes and states
-        for style in widgets.keys():
+        for style in widgets:
             self.stack.remove_style_class(style)
-        for w in widgets.values():
+        for w in self._panels.values():
             w.remove_style_class("open")
 
         # Configure according to the requested widget.
         if widget in widgets:
             if widget != "dashboard": # Avoid adding dashboard class again if switching from bluetooth
                 self.stack.add_style_class(widget)
-            self.stack.set_visible_child(widgets[widget])
-            widgets[widget].add_style_class("open")
+            self.stack.set_visible_child(target_widget)
+            target_widget.add_style_class("open")
 
             if widget == "launcher":
                 self.launcher.open_launcher()
@@ -481,13 +505,16 @@ class Notch(Window):
         self._is_notch_open = True # Set notch state to open
 
     def _show_overview_children(self, show_children):
-        for child in self.overview.get_children():
+        overview = self._panels.get("overview")
+        if overview is None:
+            return False
+        for child in overview.get_children():
             if show_children:
                 child.set_visible(show_children)
-                self.overview.add_style_class("show")
+                overview.add_style_class("show")
             else:
                 child.set_visible(show_children)
-                self.overview.remove_style_class("show")
+                overview.remove_style_class("show")
         return False  # Esto evita que el timeout se repita
 
     def toggle_hidden(self):
@@ -496,6 +523,8 @@ class Notch(Window):
             self.notch_box.add_style_class("hidden")
         else:
             self.notch_box.remove_style_class("hidden")
+        # Nothing of the visualizer can be seen while the notch is hidden
+        self.player_small.cavalcade.set_paused("hidden", self.hidden)
 
     def _on_compact_scroll(self, widget, event):
         if self._scrolling:
@@ -1,5 +1,5 @@
 import os
-import json
+import time
 import uuid
 import locale
 from datetime import datetime, timedelta
@@ -18,81 +18,74 @@ from fabric.widgets.image import Image
 from fabric.widgets.label import Label
 from fabric.widgets.scrolledwindow import ScrolledWindow
 import modules.icons as icons
+from utils.notification_images import IMAGE_DIR, NotificationImages
+from utils.notification_store import HISTORY_LIMIT, NotificationStore
+from utils.notification_throttle import NotificationThrottle
+from config.data import (
+    NOTIFICATION_BURST,
+    NOTIFICATION_COALESCE_SECONDS,
+    NOTIFICATION_RATE_LIMIT,
+    NOTIFICATION_REPLACE_APPS,
+)
 
-import config.data as data
-
-# Persistence directory and file (history)
-PERSISTENT_DIR = f"/tmp/{data.APP_NAME}/notifications"
-PERSISTENT_HISTORY_FILE = os.path.join(PERSISTENT_DIR, "notification_history.json")
+# Stored notifications built when the history is created; older ones follow while scrolling
+HISTORY_PAGE_SIZE = 10
+# Distance in pixels from the end of the history at which the next page is built
+LOAD_MORE_THRESHOLD = 200
 
 def cache_notification_pixbuf(notification_box):
     """
-    Saves a scaled pixbuf (48x48) in the cache directory and returns the cache file path.
+    Keeps a 48x48 thumbnail of the notification image in memory and queues its PNG
+    for the history. Returns the path the PNG is written to.
     """
     notification = notification_box.notification
-    if notification.image_pixbuf:
-        os.makedirs(PERSISTENT_DIR, exist_ok=True)
-        cache_file = os.path.join(PERSISTENT_DIR, f"notification_{notification_box.uuid}.png")
-        logger.debug(f"Caching image for notification {notification.id} to: {cache_file}")
-        try:
-            scaled = notification.image_pixbuf.scale_simple(48, 48, GdkPixbuf.InterpType.BILINEAR)
-            scaled.savev(cache_file, "png", [], [])
-            logger.info(f"Successfully cached image for notification {notification.id} to: {cache_file}")
-            return cache_file
-        except Exception as e:
-            logger.error(f"Error caching image for notification {notification.id}: {e}")
-            return None
-    else:
+    image_pixbuf = notification.image_pixbuf
+    if not image_pixbuf:
         logger.debug(f"Notification {notification.id} has no image_pixbuf to cache.")
         return None
+    return NotificationImages.get_initial().store(notification_box.uuid, image_pixbuf)
 
 def load_scaled_pixbuf(notification_box, width, height):
     """
-    Loads and scales a pixbuf for a notification_box, prioritizing cached images.
+    Returns the scaled image of a notification_box, from the in-memory thumbnails or the
+    cached PNG, falling back to the app icon.
     """
     notification = notification_box.notification
     if not hasattr(notification_box, 'notification') or notification is None:
         logger.error("load_scaled_pixbuf: notification_box.notification is None or not set!")
         return None
 
-    pixbuf = None
-    if hasattr(notification_box, "cached_image_path") and notification_box.cached_image_path and os.path.exists(notification_box.cached_image_path):
-        try:
-            logger.debug(f"Attempting to load cached image from: {notification_box.cached_image_path} for notification {notification.id}")
-            pixbuf = GdkPixbuf.Pixbuf.new_from_file(notification_box.cached_image_path)
-            if pixbuf:
-                pixbuf = pixbuf.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
-                logger.info(f"Successfully loaded cached image from: {notification_box.cached_image_path} for notification {notification.id}")
-            return pixbuf
-        except Exception as e:
-            logger.error(f"Error loading cached image from {notification_box.cached_image_path} for notification {notification.id}: {e}")
-            logger.warning(f"Falling back to notification.image_pixbuf for notification {notification.id}")
+    images = NotificationImages.get_initial()
+    pixbuf = images.thumbnail(notification_box.uuid, notification_box.cached_image_path, width, height)
+    if pixbuf:
+        return pixbuf
 
     if notification.image_pixbuf:
         logger.debug(f"Loading image directly from notification.image_pixbuf for notification {notification.id}")
-        pixbuf = notification.image_pixbuf.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
-        return pixbuf
+        return notification.image_pixbuf.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
 
     logger.debug(f"No image_pixbuf or cached image found, trying app icon for notification {notification.id}")
     return get_app_icon_pixbuf(notification.app_icon, width, height)
 
 def get_app_icon_pixbuf(icon_path, width, height):
     """
-    Loads and scales a pixbuf from an app icon path.
+    Loads and scales a pixbuf from an app icon path, once per path and size.
     """
-    if not icon_path:
-        return None
-    if icon_path.startswith("file://"):
-        icon_path = icon_path[7:]
-    if not os.path.exists(icon_path):
-        logger.warning(f"Icon path does not exist: {icon_path}")
-        return None
-    try:
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file(icon_path)
-        return pixbuf.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
-    except Exception as e:
-        logger.error(f"Failed to load or scale icon: {e}")
-        return None
+    return NotificationImages.get_initial().app_icon(icon_path, width, height)
+
+def create_count_label(count):
+    """
+    Badge with the number of notifications grouped into one entry, hidden while there
+    is only one.
+    """
+    label = Label(name="notification-count", label=f"×{count}")
+    label.set_no_show_all(True)
+    label.set_visible(count > 1)
+    return label
+
+def update_count_label(label, count):
+    label.set_label(f"×{count}")
+    label.set_visible(count > 1)
 
 class ActionButton(Button):
     def __init__(self, action: NotificationAction, index: int, total: int, notification_box):
@@ -132,6 +125,10 @@ class NotificationBox(Box):
         self._timeout_id = None
         self._container = None
         self.cached_image_path = None
+        # Notifications with the same app and summary folded into this one
+        self.merged_notifications = []
+        self.count = 1
+        self.last_update = time.monotonic()
 
         self.start_timeout()
 
@@ -158,6 +155,25 @@ class NotificationBox(Box):
         self._is_history = False
         logger.debug(f"NotificationBox {self.uuid} created for notification {notification.id}")
 
+    def merge(self, notification):
+        """Folds a notification with the same app and summary into this one, showing its body."""
+        self.merged_notifications.append(notification)
+        self.count += 1
+        self.last_update = time.monotonic()
+        update_count_label(self.notification_count_label, self.count)
+        if notification.body and isinstance(self.notification_body_label, Label):
+            self.notification_body_label.set_markup(notification.body)
+        self.start_timeout()
+
+    def close_merged(self, reason):
+        """Closes the notifications folded into this one, which have no popup of their own."""
+        for notification in self.merged_notifications:
+            try:
+                notification.close(reason)
+            except Exception as e:
+                logger.error(f"Error closing merged notification {notification.id}: {e}")
+        self.merged_notifications = []
+
     def set_is_history(self, is_history):
         self._is_history = is_history
 
@@ -224,6 +240,7 @@ class NotificationBox(Box):
             max_chars_width=16,
             ellipsization="end",
         )
+        self.notification_count_label = create_count_label(self.count)
         self.notification_body_label = Label(
             markup=notification.body,
             h_align="start",
@@ -244,6 +261,7 @@ class NotificationBox(Box):
                         self.notification_summary_label,
                         Box(name="notif-sep", h_expand=False, v_expand=False, h_align="center", v_align="center"),
                         self.notification_app_name_label_content,
+                        self.notification_count_label,
                     ],
                 ),
                 self.notification_body_label,
@@ -314,6 +332,7 @@ class NotificationBox(Box):
         if not self._destroyed:
             try:
                 logger.debug(f"Notification {self.notification.id} timeout expired, closing notification.")
+                self.close_merged("expired")
                 self.notification.close("expired")
                 self.stop_timeout()
             except Exception as e:
@@ -322,12 +341,8 @@ class NotificationBox(Box):
 
     def destroy(self, from_history_delete=False):
         logger.debug(f"NotificationBox destroy called for notification: {self.notification.id}, from_history_delete: {from_history_delete}, is_history: {self._is_history}")
-        if hasattr(self, "cached_image_path") and self.cached_image_path and os.path.exists(self.cached_image_path) and (not self._is_history or from_history_delete):
-            try:
-                os.remove(self.cached_image_path)
-                logger.info(f"Deleted cached image: {self.cached_image_path}")
-            except Exception as e:
-                logger.error(f"Error deleting cached image {self.cached_image_path}: {e}")
+        if self.cached_image_path and (not self._is_history or from_history_delete):
+            NotificationImages.get_initial().forget(self.uuid, self.cached_image_path)
         self._destroyed = True
         self.stop_timeout()
         super().destroy()
@@ -341,7 +356,7 @@ class NotificationBox(Box):
             self._container.resume_all_timeouts()
 
 class HistoricalNotification(object):
-    def __init__(self, id, app_icon, summary, body, app_name, timestamp, cached_image_path=None):
+    def __init__(self, id, app_icon, summary, body, app_name, timestamp, cached_image_path=None, count=1):
         self.id = id
         self.app_icon = app_icon
         self.summary = summary
@@ -349,10 +364,32 @@ class HistoricalNotification(object):
         self.app_name = app_name
         self.timestamp = timestamp
         self.cached_image_path = cached_image_path
+        self.count = count
         self.image_pixbuf = None
         self.actions = []
         self.cached_scaled_pixbuf = None
 
+class HistoricalNotificationBox(object):
+    """
+    Takes the place of a NotificationBox for notifications that never show up as a popup
+    and don't need its widgets or timeout: those restored from the history, and live
+    ones sent straight to it, which are given a box_uuid and have their image cached.
+    """
+    def __init__(self, notification, box_uuid=None):
+        self.notification = notification
+        if box_uuid is None:
+            self.uuid = notification.id
+            self.cached_image_path = notification.cached_image_path
+            self.count = notification.count
+        else:
+            self.uuid = box_uuid
+            self.cached_image_path = cache_notification_pixbuf(self)
+            self.count = 1
+
+    def destroy(self, from_history_delete=False):
+        if from_history_delete and self.cached_image_path:
+            NotificationImages.get_initial().forget(self.uuid, self.cached_image_path)
+
 class NotificationHistory(Box):
     def __init__(self, **kwargs):
         super().__init__(
@@ -361,7 +398,12 @@ class NotificationHistory(Box):
             **kwargs
         )
         self.notif_win = kwargs["notif_win"]
-        self.containers = []
+        self.containers = [] # Newest first, only the pages built so far
+        self.date_separators = {} # Date -> separator above the containers of that day
+        self._groups = {} # (app, summary) -> newest container to group into
+        self._oldest_seq = None # Store position of the oldest built notification
+        self._has_more = True
+        self._load_page_id = 0
         self.header_label = Label(
             name="nhh",
             label="Notifications",
@@ -425,7 +467,11 @@ class NotificationHistory(Box):
         )
         self.scrolled_window_viewport_box = Box(orientation="v", children=[self.notifications_list, self.no_notifications_box])
         self.scrolled_window.add_with_viewport(self.scrolled_window_viewport_box)
-        self.persistent_notifications = []
+        vadjustment = self.scrolled_window.get_vadjustment()
+        vadjustment.connect("value-changed", self.on_scrolled)
+        vadjustment.connect("changed", self.on_scrolled)
+        self.connect("map", lambda *_: self.on_scrolled(vadjustment))
+        self.store = NotificationStore()
         self.add(self.history_header)
         self.add(self.scrolled_window)
         self._load_persistent_history()
@@ -433,7 +479,7 @@ class NotificationHistory(Box):
         self.schedule_midnight_update()
 
         # List of apps for which notifications should be limited to one in history too
-        self.LIMITED_APPS_HISTORY = ["Spotify"] # Add your list of apps here, same as NotificationContainer if needed
+        self.LIMITED_APPS_HISTORY = NOTIFICATION_REPLACE_APPS
 
     def get_ordinal(self, n):
         if 11 <= (n % 100) <= 13:
@@ -474,107 +520,116 @@ class NotificationHistory(Box):
         GLib.timeout_add_seconds(int(delta_seconds), self.on_midnight)
 
     def on_midnight(self):
-        self.rebuild_with_separators()
+        # Days keep their separators, only "Today" and "Yesterday" move on
+        for date, separator in self.date_separators.items():
+            separator.label.set_label(self.get_date_header(datetime.combine(date, datetime.min.time())))
         self.schedule_midnight_update()
         return GLib.SOURCE_REMOVE
 
     def create_date_separator(self, date_header):
-        return Box(
-            name="notif-date-sep",
-            children=[
-                Label(
-                    name="notif-date-sep-label",
-                    label=date_header,
-                    h_align="center",
-                    h_expand=True,
-                )
-            ]
+        label = Label(
+            name="notif-date-sep-label",
+            label=date_header,
+            h_align="center",
+            h_expand=True,
         )
+        separator = Box(name="notif-date-sep", children=[label])
+        separator.label = label
+        separator.count = 0
+        return separator
+
+    def _get_date_separator(self, arrival_time, at_top):
+        date = arrival_time.date()
+        separator = self.date_separators.get(date)
+        if separator is None:
+            separator = self.create_date_separator(self.get_date_header(arrival_time))
+            self.date_separators[date] = separator
+            self.notifications_list.add(separator)
+            if at_top:
+                self.notifications_list.reorder_child(separator, 0)
+            separator.show_all()
+        return separator
+
+    def _place_container(self, container, at_top):
+        """Adds a container below the separator of its day, creating the separator if needed."""
+        separator = self._get_date_separator(container.arrival_time, at_top)
+        separator.count += 1
+        self.notifications_list.add(container)
+        if at_top:
+            position = self.notifications_list.child_get_property(separator, "position")
+            self.notifications_list.reorder_child(container, position + 1)
+        container.show_all()
+
+    def _remove_container(self, container):
+        """Removes a container, and the separator of its day if it was the last one."""
+        if container not in self.containers:
+            return False
+        self.containers.remove(container)
+        for key in [key for key, grouped in self._groups.items() if grouped is container]:
+            del self._groups[key]
+        date = container.arrival_time.date()
+        separator = self.date_separators.get(date)
+        if separator is not None:
+            separator.count -= 1
+            if separator.count <= 0:
+                del self.date_separators[date]
+                separator.destroy()
+        container.destroy()
+        return True
 
-    def rebuild_with_separators(self):
-        GLib.idle_add(self._do_rebuild_with_separators)
-
-    def _do_rebuild_with_separators(self):
-        children = list(self.notifications_list.get_children()) # Create a copy to avoid issues during removal
-        for child in children:
-            self.notifications_list.remove(child)
-
-        current_date_header = None
-        last_date_header = None # Keep track of the last date header added
-        for container in sorted(self.containers, key=lambda x: x.arrival_time, reverse=True):
-            arrival_time = container.arrival_time
-            date_header = self.get_date_header(arrival_time)
-            if date_header != current_date_header:
-                sep = self.create_date_separator(date_header)
-                self.notifications_list.add(sep)
-                current_date_header = date_header
-                last_date_header = date_header # Update last_date_header
-            self.notifications_list.add(container)
-
-        # Remove the last date separator if there are no notifications left
-        if not self.containers and last_date_header:
-            for child in list(self.notifications_list.get_children()): # Iterate over a copy
-                if child.get_name() == "notif-date-sep":
-                    self.notifications_list.remove(child)
-
-        self.notifications_list.show_all()
+    def on_scrolled(self, adjustment):
+        if not self._has_more or self._load_page_id or not self.get_mapped():
+            return
+        if adjustment.get_value() + adjustment.get_page_size() >= adjustment.get_upper() - LOAD_MORE_THRESHOLD:
+            # Deferred, since building the page changes the adjustment being handled
+            self._load_page_id = GLib.idle_add(self._load_next_page)
+
+    def _load_next_page(self):
+        self._load_page_id = 0
+        notes = self.store.recent(HISTORY_PAGE_SIZE, before=self._oldest_seq)
+        self._has_more = len(notes) == HISTORY_PAGE_SIZE
+        for note in notes:
+            self._oldest_seq = note["seq"]
+            self._add_historical_notification(note)
         self.update_no_notifications_label_visibility()
+        return False
 
     def on_do_not_disturb_changed(self, switch, pspec):
         self.do_not_disturb_enabled = switch.get_active()
         logger.info(f"Do Not Disturb mode {'enabled' if self.do_not_disturb_enabled else 'disabled'}")
 
     def clear_history(self, *args):
-        for child in self.notifications_list.get_children()[:]:
-            container = child
+        for container in self.containers:
             notif_box = container.notification_box if hasattr(container, "notification_box") else None
             if notif_box:
                 notif_box.destroy(from_history_delete=True)
-            self.notifications_list.remove(child)
+        for child in self.notifications_list.get_children()[:]:
             child.destroy()
 
-        if os.path.exists(PERSISTENT_HISTORY_FILE):
-            try:
-                os.remove(PERSISTENT_HISTORY_FILE)
-                logger.info("Notification history cleared and persistent file deleted.")
-            except Exception as e:
-                logger.error(f"Error deleting persistent history file: {e}")
-        self.persistent_notifications = []
+        self.store.clear()
+        logger.info("Notification history cleared.")
         self.containers = []
-        self.rebuild_with_separators() # Call rebuild after clearing to remove any stray separators
+        self.date_separators = {}
+        self._groups = {}
+        self._has_more = False
+        self.update_no_notifications_label_visibility()
 
     def _load_persistent_history(self):
-        if not os.path.exists(PERSISTENT_DIR):
-            os.makedirs(PERSISTENT_DIR, exist_ok=True)
-        if os.path.exists(PERSISTENT_HISTORY_FILE):
-            try:
-                with open(PERSISTENT_HISTORY_FILE, "r") as f:
-                    self.persistent_notifications = json.load(f)
-                for note in reversed(self.persistent_notifications):
-                    self._add_historical_notification(note)
-            except Exception as e:
-                logger.error(f"Error loading persistent history: {e}")
-        GLib.idle_add(self.update_no_notifications_label_visibility)
-
-    def _save_persistent_history(self):
-        try:
-            with open(PERSISTENT_HISTORY_FILE, "w") as f:
-                json.dump(self.persistent_notifications, f)
-        except Exception as e:
-            logger.error(f"Error saving persistent history: {e}")
+        if not os.path.exists(IMAGE_DIR):
+            os.makedirs(IMAGE_DIR, exist_ok=True)
+        # Only the newest page, the rest is built when scrolled into view
+        self._load_next_page()
 
     def delete_historical_notification(self, note_id, container):
+        if container not in self.containers:
+            return
         if hasattr(container, "notification_box"):
             notif_box = container.notification_box
             notif_box.destroy(from_history_delete=True)
 
-        self.persistent_notifications = [
-            note for note in self.persistent_notifications if note.get("id") != note_id
-        ]
-        self._save_persistent_history()
-        container.destroy()
-        self.containers = [c for c in self.containers if c != container]
-        self.rebuild_with_separators() # Call rebuild after deleting to adjust separators
+        self.store.remove(note_id)
+        self._remove_container(container)
+        self.update_no_notifications_label_visibility()
 
     def _add_historical_notification(self, note):
         hist_notif = HistoricalNotification(
@@ -585,15 +640,10 @@ class NotificationHistory(Box):
             app_name=note.get("app_name"),
             timestamp=note.get("timestamp"),
             cached_image_path=note.get("cached_image_path"),
+            count=note.get("count") or 1,
         )
 
-        hist_box = NotificationBox(hist_notif, timeout_ms=0)
-        hist_box.uuid = hist_notif.id
-        hist_box.cached_image_path = hist_notif.cached_image_path
-        hist_box.set_is_history(True)
-        for child in hist_box.get_children():
-            if child.get_name() == "notification-action-buttons":
-                hist_box.remove(child)
+        hist_box = HistoricalNotificationBox(hist_notif)
         container = Box(
             name="notification-container",
             orientation="v",
@@ -606,6 +656,7 @@ class NotificationHistory(Box):
         except Exception:
             arrival = datetime.now()
         container.arrival_time = arrival
+        container.note = note
 
         def compute_time_label(arrival_time):
             return arrival_time.strftime("%H:%M")
@@ -647,6 +698,9 @@ class NotificationHistory(Box):
         ) if hist_notif.body else Box()
         if hist_notif.body:
             self.hist_notif_body_label.set_single_line_mode(False)
+        container.summary_label = self.hist_notif_summary_label
+        container.body_label = self.hist_notif_body_label
+        container.count_label = create_count_label(hist_notif.count)
         self.hist_notif_summary_box = Box(
             name="notification-summary-box",
             orientation="h",
@@ -657,6 +711,7 @@ class NotificationHistory(Box):
                 self.hist_notif_app_name_label,
                 Box(name="notif-sep", h_expand=False, v_expand=False, h_align="center", v_align="center"),
                 self.hist_time_label,
+                container.count_label,
             ],
         )
         self.hist_notif_text_box = Box(
@@ -691,34 +746,27 @@ class NotificationHistory(Box):
             ],
         )
         container.add(content_box)
-        self.containers.insert(0, container)
-        self.rebuild_with_separators()
-        self.update_no_notifications_label_visibility()
+        # Pages are built from newest to oldest, so each one goes below the others
+        self.containers.append(container)
+        self._place_container(container, at_top=False)
 
     def add_notification(self, notification_box):
         app_name = notification_box.notification.app_name
         if app_name in self.LIMITED_APPS_HISTORY:
             self.clear_history_for_app(app_name) # Immediately clear history for this app
 
-        if len(self.containers) >= 50:
-            oldest_container = self.containers.pop()
-            if hasattr(oldest_container, "notification_box") and hasattr(oldest_container.notification_box, "cached_image_path") and oldest_container.notification_box.cached_image_path and os.path.exists(oldest_container.notification_box.cached_image_path):
-                try:
-                    os.remove(oldest_container.notification_box.cached_image_path)
-                    logger.info(f"Deleted cached image of oldest notification due to history limit: {oldest_container.notification_box.cached_image_path}")
-                except Exception as e:
-                    logger.error(f"Error deleting cached image of oldest notification: {e}")
-            oldest_container.destroy()
+        if len(self.containers) >= HISTORY_LIMIT:
+            oldest_container = self.containers[-1]
+            if hasattr(oldest_container, "notification_box"):
+                oldest_container.notification_box.destroy(from_history_delete=True)
+            self._remove_container(oldest_container)
+            # Anything older is past the retention limit and trimmed from the store
+            self._has_more = False
 
         def on_container_destroy(container):
             if hasattr(container, "_timestamp_timer_id") and container._timestamp_timer_id:
                 GLib.source_remove(container._timestamp_timer_id)
-            if hasattr(container, "notification_box"):
-                notif_box = container.notification_box
-            container.destroy()
-            self.containers.remove(container) # Ensure container is removed from list
-            self.rebuild_with_separators() # Rebuild separators after removing a notification
-            self.update_no_notifications_label_visibility()
+            self.delete_historical_notification(container.notification_box.uuid, container)
 
         container = Box(
             name="notification-container",
@@ -761,6 +809,9 @@ class NotificationHistory(Box):
         ) if notification_box.notification.body else Box()
         if notification_box.notification.body:
             self.current_notif_body_label.set_single_line_mode(False)
+        container.summary_label = self.current_notif_summary_label
+        container.body_label = self.current_notif_body_label
+        container.count_label = create_count_label(notification_box.count)
         self.current_notif_summary_box = Box(
             name="notification-summary-box",
             orientation="h",
@@ -770,6 +821,7 @@ class NotificationHistory(Box):
                 self.current_notif_app_name_label,
                 Box(name="notif-sep", h_expand=False, v_expand=False, h_align="center", v_align="center"),
                 self.current_time_label,
+                container.count_label,
             ],
         )
         self.current_notif_text_box = Box(
@@ -782,6 +834,7 @@ class NotificationHistory(Box):
                 self.current_notif_body_label,
             ],
         )
+        container.text_box = self.current_notif_text_box
         self.current_notif_close_button = Button(
             name="notif-close-button",
             child=Label(name="notif-close-label", markup=icons.cancel),
@@ -811,16 +864,49 @@ class NotificationHistory(Box):
             h_expand=True,
         )
         hist_box.add(content_box)
-        content_box.get_children()[2].get_children()[0].connect(
-            "clicked",
-            lambda *_: on_container_destroy(container)
-        )
         container.add(hist_box)
         self.containers.insert(0, container)
-        self.rebuild_with_separators()
-        self._append_persistent_notification(notification_box, container.arrival_time)
+        self._place_container(container, at_top=True)
+        container.note = self._append_persistent_notification(notification_box, container.arrival_time)
+        self._groups[(app_name, notification_box.notification.summary)] = container
         self.update_no_notifications_label_visibility()
 
+    def merge_notification(self, notification):
+        """
+        Folds a notification into the newest entry with the same app and summary, if that
+        entry arrived within the coalescing window, adding its body below the others.
+        Returns False if there was no such entry.
+        """
+        container = self._groups.get((notification.app_name, notification.summary))
+        if container is None or container not in self.containers:
+            return False
+        # Measured from the first notification of the group, so a steady stream still
+        # starts a new entry every window
+        if (datetime.now() - container.arrival_time).total_seconds() > NOTIFICATION_COALESCE_SECONDS:
+            return False
+
+        note = container.note
+        note["count"] = (note.get("count") or 1) + 1
+        if notification.body:
+            note["body"] = "\n".join(filter(None, (note.get("body"), notification.body)))
+            if not isinstance(container.body_label, Label):
+                # The entry had no body so far
+                container.body_label.destroy()
+                container.body_label = Label(
+                    name="notification-body",
+                    h_align="start",
+                    ellipsization="end",
+                    line_wrap="word-char",
+                )
+                container.body_label.set_single_line_mode(False)
+                container.text_box.add(container.body_label)
+                container.body_label.show()
+            container.body_label.set_markup(note["body"])
+        update_count_label(container.count_label, note["count"])
+        # Replacing the stored entry keeps one row per group
+        self.store.append(note)
+        return True
+
     def _append_persistent_notification(self, notification_box, arrival_time):
         note = {
             "id": notification_box.uuid,
@@ -829,30 +915,30 @@ class NotificationHistory(Box):
             "body": notification_box.notification.body,
             "app_name": notification_box.notification.app_name,
             "timestamp": arrival_time.isoformat(),
-            "cached_image_path": notification_box.cached_image_path
+            "cached_image_path": notification_box.cached_image_path,
+            "count": notification_box.count,
         }
-        self.persistent_notifications.insert(0, note)
-        self.persistent_notifications = self.persistent_notifications[:50]
-        self._save_persistent_history()
+        self.store.append(note)
+        return note
 
     def _cleanup_orphan_cached_images(self):
         logger.debug("Starting orphan cached image cleanup.")
-        if not os.path.exists(PERSISTENT_DIR):
+        if not os.path.exists(IMAGE_DIR):
             logger.debug("Cache directory does not exist, skipping cleanup.")
             return
 
-        cached_files = [f for f in os.listdir(PERSISTENT_DIR) if f.startswith("notification_") and f.endswith(".png")]
+        cached_files = [f for f in os.listdir(IMAGE_DIR) if f.startswith("notification_") and f.endswith(".png")]
         if not cached_files:
             logger.debug("No cached image files found, skipping cleanup.")
             return
 
-        history_uuids = {note.get("id") for note in self.persistent_notifications if note.get("id")}
+        history_uuids = self.store.ids()
         deleted_count = 0
         for cached_file in cached_files:
             try:
                 uuid_from_filename = cached_file[len("notification_"):-len(".png")]
                 if uuid_from_filename not in history_uuids:
-                    cache_file_path = os.path.join(PERSISTENT_DIR, cached_file)
+                    cache_file_path = os.path.join(IMAGE_DIR, cached_file)
                     os.remove(cache_file_path)
                     logger.info(f"Deleted orphan cached image: {cache_file_path}")
                     deleted_count += 1
@@ -874,52 +960,69 @@ class NotificationHistory(Box):
     def clear_history_for_app(self, app_name):
         """Clears all notifications in history for a specific app."""
         containers_to_remove = []
-        persistent_notes_to_remove_ids = set()
         for container in list(self.containers): # Iterate over a copy
             if hasattr(container, "notification_box") and container.notification_box.notification.app_name == app_name:
                 containers_to_remove.append(container)
-                persistent_notes_to_remove_ids.add(container.notification_box.uuid)
 
         for container in containers_to_remove:
-            if hasattr(container, "notification_box") and hasattr(container.notification_box, "cached_image_path") and container.notification_box.cached_image_path and os.path.exists(container.notification_box.cached_image_path):
-                try:
-                    os.remove(container.notification_box.cached_image_path)
-                    logger.info(f"Deleted cached image of replaced history notification: {container.notification_box.cached_image_path}")
-                except Exception as e:
-                    logger.error(f"Error deleting cached image of replaced history notification: {e}")
-            self.containers.remove(container)
-            self.notifications_list.remove(container)
             container.notification_box.destroy(from_history_delete=True)
-            container.destroy()
-
-        # Update persistent history
-        self.persistent_notifications = [
-            note for note in self.persistent_notifications
-            if note.get("id") not in persistent_notes_to_remove_ids
-        ]
-        self._save_persistent_history()
-        self.rebuild_with_separators()
+            self._remove_container(container)
+
+        # Update persistent history, through the app name index
+        self.store.remove_app(app_name)
         self.update_no_notifications_label_visibility()
 
 class NotificationContainer(Box):
-    LIMITED_APPS = ["Spotify"] # Add your list of apps here
+    LIMITED_APPS = NOTIFICATION_REPLACE_APPS # Apps whose new notification replaces the previous one
+
+    def find_coalescable(self, notification):
+        """The popup with the same app and summary updated within the coalescing window, if any."""
+        if self._is_destroying:
+            return None
+        now = time.monotonic()
+        for notification_box in reversed(self.notifications):
+            existing = notification_box.notification
+            if existing.id in self._destroyed_notifications:
+                continue
+            if (existing.app_name == notification.app_name
+                    and existing.summary == notification.summary
+                    and now - notification_box.last_update <= NOTIFICATION_COALESCE_SECONDS):
+                return notification_box
+        return None
+
+    def add_to_history(self, notification):
+        """Adds a notification to the history without a popup, grouping it if possible."""
+        history = self.notif_win.notification_history
+        if not history.merge_notification(notification):
+            history.add_notification(HistoricalNotificationBox(notification, str(uuid.uuid4())))
+        # Never shown as a popup, so the sender is told it expired right away
+        notification.close("expired")
 
     def on_new_notification(self, fabric_notif, id):
+        notification = fabric_notif.get_notification_from_id(id)
         if self.notif_win.notification_history.do_not_disturb_enabled:
             logger.info("Do Not Disturb mode enabled: adding notification directly to history.")
-            notification = fabric_notif.get_notification_from_id(id)
-            new_box = NotificationBox(notification)
-            if notification.image_pixbuf:
-                cache_notification_pixbuf(new_box)
-            self.notif_win.notification_history.add_notification(new_box)
+            self.add_to_history(notification)
             return
 
-        notification = fabric_notif.get_notification_from_id(id)
+        app_name = notification.app_name
+        if app_name not in self.LIMITED_APPS:
+            existing_box = self.find_coalescable(notification)
+            if existing_box is not None:
+                existing_box.merge(notification)
+                self.current_index = self.notifications.index(existing_box)
+                self.stack.set_visible_child(existing_box)
+                self.update_navigation_buttons()
+                return
+            if not self.throttle.allow(app_name):
+                logger.info(f"Rate limit reached for {app_name}: adding notification directly to history.")
+                self.add_to_history(notification)
+                return
+
         new_box = NotificationBox(notification)
         new_box.set_container(self)
         notification.connect("closed", self.on_notification_closed)
 
-        app_name = notification.app_name
         if app_name in self.LIMITED_APPS:
             self.notif_win.notification_history.clear_history_for_app(app_name) # Clear history immediately
 
@@ -981,6 +1084,7 @@ class NotificationContainer(Box):
         self.notif_win = kwargs["notif_win"]
         self._server = Notifications()
         self._server.connect("notification-added", self.on_new_notification)
+        self.throttle = NotificationThrottle(NOTIFICATION_RATE_LIMIT, NOTIFICATION_BURST)
         self._pending_removal = False
         self._is_destroying = False
 
@@ -1072,16 +1176,19 @@ class NotificationContainer(Box):
             reason_str = str(reason)
             if reason_str == "NotificationCloseReason.DISMISSED_BY_USER":
                 logger.info(f"Cleaning up resources for dismissed notification {notification.id}")
+                notif_box.close_merged("dismissed-by-user")
                 notif_box.destroy()
             elif (reason_str == "NotificationCloseReason.EXPIRED" or
                   reason_str == "NotificationCloseReason.CLOSED" or
                   reason_str == "NotificationCloseReason.UNDEFINED"):
                 logger.info(f"Adding notification {notification.id} to history (reason: {reason_str})")
                 notif_box.set_is_history(True)
+                notif_box.close_merged("expired")
                 self.notif_win.notification_history.add_notification(notif_box)
                 notif_box.stop_timeout()
             else:
                 logger.warning(f"Unknown close reason: {reason_str} for notification {notification.id}. Defaulting to destroy.")
+                notif_box.close_merged("dismissed-by-user")
                 notif_box.destroy()
 
             if len(self.notifications) == 1:
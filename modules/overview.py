@@ -1,6 +1,4 @@
 # Thanks to https://github.com/muhchaudhary for the original code. You are a legend.
-import json
-
 import cairo
 import gi
 from loguru import logger
@@ -16,9 +14,10 @@ import modules.icons as icons
 # WIP icon resolver (app_id to guessing the icon name)
 from utils.icon_resolver import IconResolver
 from fabric.utils.helpers import get_desktop_applications
+from services.hyprland_state import HyprlandState
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gdk, Gtk
+from gi.repository import Gdk, GLib, Gtk
 
 screen = Gdk.Screen.get_default()
 CURRENT_WIDTH = screen.get_width()
@@ -193,6 +192,8 @@ class Overview(Box):
         super().__init__(name="overview", orientation="v", spacing=8, **kwargs)
         self.workspace_boxes: dict[int, Box] = {}
         self.clients: dict[str, HyprlandWindowButton] = {}
+        self.state = HyprlandState.get_initial()
+        self._update_id = 0
         
         # Initialize app registry for better icon resolution
         self._all_apps = get_desktop_applications()
@@ -200,9 +201,9 @@ class Overview(Box):
         
         # Remove the window_class_aliases dictionary completely
 
-        connection.connect("event::openwindow", self.do_update)
-        connection.connect("event::closewindow", self.do_update)
-        connection.connect("event::movewindow", self.do_update)
+        # Coalesce membership and geometry updates from the shared state into one rebuild
+        self.state.connect("clients-changed", self.do_update)
+        self.state.connect("geometry-changed", self.do_update)
         self.update()
         
     def _normalize_window_class(self, class_name):
@@ -319,17 +320,13 @@ class Overview(Box):
         self.children = [Box(spacing=8), Box(spacing=8)]
 
         monitors = {
-            monitor["id"]: (monitor["x"], monitor["y"], monitor["transform"])
-            for monitor in json.loads(
-                connection.send_command("j/monitors").reply.decode()
-            )
+            monitor_id: (monitor["x"], monitor["y"], monitor["transform"])
+            for monitor_id, monitor in self.state.monitors.items()
         }
 
-        for client in json.loads(
-            str(connection.send_command("j/clients").reply.decode())
-        ):
-            # Exclude special workspaces.
-            if client["workspace"]["id"] > 0:
+        for client in self.state.clients:
+            # Exclude special workspaces and clients whose monitor is not known yet.
+            if client["workspace"]["id"] > 0 and client["monitor"] in monitors:
                 self.clients[client["address"]] = HyprlandWindowButton(
                     window=self,
                     title=client["title"],
@@ -369,5 +366,11 @@ class Overview(Box):
             )
 
     def do_update(self, *_):
-        logger.info(f"[Overview] Updating for :{_[1].name}")
+        if not self._update_id:
+            self._update_id = GLib.idle_add(self._do_update_idle)
+
+    def _do_update_idle(self):
+        self._update_id = 0
+        logger.info("[Overview] Updating from Hyprland state")
         self.update(signal_update=True)
+        return False
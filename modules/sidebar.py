@@ -1,4 +1,3 @@
-from fabric.core.fabricator import Fabricator
 from fabric.widgets.box import Box
 from fabric.widgets.label import Label
 from fabric.widgets.datetime import DateTime
@@ -28,7 +27,7 @@ class SideBar(Window):
         )
         self.main_bar = kwargs.get("main_bar", None)
 
-        # self.aria_provider = AriaProvider()
+        self.aria_provider = AriaProvider.get_initial()
 
         self.workspaces = Workspaces(
             name="workspaces",
@@ -69,18 +68,9 @@ class SideBar(Window):
             child=self.downloads_label
         )
 
-        # i honestly have no idea what these all do
-        # if someone stumbles across this and can tell me which ones i can leave out, please do
-        # self.downloads_fabricator = Fabricator(
-        #     poll_from=lambda v: self.aria_provider.fetch_from_aria(),
-        #     on_changed=lambda f, v: self.update_downloads_circle,
-        #     interval=3000,
-        #     stream=False,
-        #     default_value=0
-        # )
-        # self.downloads_fabricator.changed.connect(self.update_downloads_circle)
-        # GLib.idle_add(self.update_downloads_circle, None, self.aria_provider.progress)
-
+        # aria2 is queried off the main loop; progress arrives as a signal
+        self.aria_provider.connect("progress-changed", self.update_downloads_circle)
+        self.update_downloads_circle(self.aria_provider, self.aria_provider.progress)
 
         self.downloads_button = Button(
             name="downloads-button",
@@ -146,10 +136,7 @@ class SideBar(Window):
             self.bar_inner.remove_style_class("hidden")
 
     def switch_vpn(self):
-        # should still be converted to python code
         self.main_bar.vpn_status.vpn_provider.cycle_wireguard_vpn()
-        self.main_bar.vpn_status.update_button()
-        
 
     def open_aria(self):
         exec_shell_command_async("xdg-open http://localhost:6801/")
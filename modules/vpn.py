@@ -1,7 +1,6 @@
-from gi.repository import GLib, Gdk
+from gi.repository import Gdk
 from fabric.widgets.label import Label
 from fabric.widgets.button import Button
-from fabric.core.fabricator import Fabricator
 
 from services.vpn import VPNProvider
 import modules.icons as icons
@@ -15,7 +14,7 @@ class VPNStatus(Button):
             **kwargs
         )
         
-        self.vpn_provider = VPNProvider()
+        self.vpn_provider = VPNProvider.get_initial()
 
         self.label = Label(name="vpn-label", markup=icons.loader)
         self.add(self.label)
@@ -23,15 +22,9 @@ class VPNStatus(Button):
         self.connect("enter-notify-event", self.on_button_enter)
         self.connect("leave-notify-event", self.on_button_leave)
 
-        self.fabricator = Fabricator(
-            poll_from=lambda v: self.vpn_provider.fetch_connections(),
-            on_changed=lambda f, v: self.update_vpn_display,
-            interval=5000,
-            stream=False,
-            default_value=""
-        )
-        self.fabricator.changed.connect(self.update_vpn_display)
-        GLib.idle_add(self.update_vpn_display, None, self.vpn_provider.name)
+        # NetworkManager pushes every change, nothing is polled
+        self.vpn_provider.connect("changed", self.update_button)
+        self.update_button()
 
     def on_button_enter(self, widget, event):
         window = widget.get_window()
@@ -53,8 +46,8 @@ class VPNStatus(Button):
         self.label.set_label(data)
         
     def disconnect_vpn(self):
-        self.vpn_provider.disconnect()
-        self.update_button()
+        # The label follows once NetworkManager reports the connection as gone
+        self.vpn_provider.disconnect_vpn()
 
-    def update_button(self):
-        self.update_vpn_display("manual update", self.vpn_provider.fetch_connections())
+    def update_button(self, *_):
+        self.update_vpn_display(self.vpn_provider, self.vpn_provider.name)
@@ -1,5 +1,4 @@
 import os
-import hashlib
 import shutil
 import requests
 from gi.repository import GdkPixbuf, Gtk, GLib, Gio, Gdk
@@ -13,10 +12,15 @@ from fabric.utils.helpers import exec_shell_command_async
 import modules.icons as icons
 import config.data as data
 from PIL import Image
-import concurrent.futures
 from concurrent.futures import ThreadPoolExecutor
 from thefuzz import fuzz
 from config.data import FUZZY_THRESHOLD
+from utils.thumbnail_cache import ThumbnailCache
+
+THUMBNAIL_SIZE = 96
+PRELOAD_ROWS = 2  # Rows above and below the visible ones that are decoded ahead of time
+KEEP_ROWS = 6  # Rows further away than this from the visible ones drop their pixbufs
+MAX_LOADS_IN_FLIGHT = 4
 
 class WallpaperSelector(Box):
     CACHE_DIR = f"{data.CACHE_DIR}/thumbs"  # Changed from wallpapers to thumbs
@@ -28,7 +32,7 @@ class WallpaperSelector(Box):
             shutil.rmtree(old_cache_dir)
         
         super().__init__(name="wallpapers", spacing=4, orientation="v", h_expand=False, v_expand=False, **kwargs)
-        os.makedirs(self.CACHE_DIR, exist_ok=True)
+        self.thumbnail_cache = ThumbnailCache(self.CACHE_DIR, data.THUMBNAIL_CACHE_SIZE_MB * 1024 * 1024)
 
         # Process old wallpapers: use os.scandir for efficiency and only loop
         # over image files that actually need renaming (they're not already lowercase
@@ -49,9 +53,15 @@ class WallpaperSelector(Box):
 
         # Refresh the file list after potential renaming
         self.files = sorted([f for f in os.listdir(data.WALLPAPERS_DIR) if self._is_image(f)])
-        self.thumbnails = []
-        self.thumbnail_queue = []
-        self.executor = ThreadPoolExecutor(max_workers=4)  # Shared executor
+        # Thumbnails are only decoded for rows near the visible part of the grid
+        self.pixbufs: dict[str, GdkPixbuf.Pixbuf] = {}
+        self.placeholder = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, True, 8, THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        self.placeholder.fill(0)
+        self._row_by_name: dict[str, int] = {}
+        self._load_queue: list[str] = []
+        self._loads_in_flight: set[str] = set()
+        self._update_loads_id = 0
+        self.executor = ThreadPoolExecutor(max_workers=MAX_LOADS_IN_FLIGHT)  # Shared executor
 
         # Variable to control the selection (similar to AppLauncher)
         self.selected_index = -1
@@ -127,7 +137,12 @@ class WallpaperSelector(Box):
 
         self.add(self.header_box)
         self.add(self.scrolled_window)
-        self._start_thumbnail_thread()
+        self.arrange_viewport()
+        self.connect("map", lambda *_: self.schedule_thumbnail_loads())
+        vadjustment = self.scrolled_window.get_vadjustment()
+        vadjustment.connect("value-changed", lambda *_: self.schedule_thumbnail_loads())
+        vadjustment.connect("notify::page-size", lambda *_: self.schedule_thumbnail_loads())
+        self.executor.submit(self._maintain_cache)
         self.setup_file_monitor()  # Initialize file monitoring
         self.show_all()
         # Ensure the search entry gets focus when starting
@@ -143,13 +158,8 @@ class WallpaperSelector(Box):
         if event_type == Gio.FileMonitorEvent.DELETED:
             if file_name in self.files:
                 self.files.remove(file_name)
-                cache_path = self._get_cache_path(file_name)
-                if os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception as e:
-                        print(f"Error deleting cache {cache_path}: {e}")
-                self.thumbnails = [(p, n) for p, n in self.thumbnails if n != file_name]
+                self.thumbnail_cache.invalidate(os.path.join(data.WALLPAPERS_DIR, file_name))
+                self.pixbufs.pop(file_name, None)
                 GLib.idle_add(self.arrange_viewport, self.search_entry.get_text())
         elif event_type == Gio.FileMonitorEvent.CREATED:
             if self._is_image(file_name):
@@ -167,28 +177,29 @@ class WallpaperSelector(Box):
                 if file_name not in self.files:
                     self.files.append(file_name)
                     self.files.sort()
-                    self.executor.submit(self._process_file, file_name)
+                    GLib.idle_add(self.arrange_viewport, self.search_entry.get_text())
         elif event_type == Gio.FileMonitorEvent.CHANGED:
             if self._is_image(file_name) and file_name in self.files:
-                cache_path = self._get_cache_path(file_name)
-                if os.path.exists(cache_path):
-                    try:
-                        os.remove(cache_path)
-                    except Exception as e:
-                        print(f"Error deleting cache for changed file {file_name}: {e}")
-                self.executor.submit(self._process_file, file_name)
+                # The new contents get a new cache key; drop the thumbnail of the old ones
+                self.thumbnail_cache.invalidate(os.path.join(data.WALLPAPERS_DIR, file_name))
+                if self.pixbufs.pop(file_name, None) is not None:
+                    self._set_row_pixbuf(file_name, self.placeholder)
+                self.schedule_thumbnail_loads()
 
     def arrange_viewport(self, query: str = ""):
         model = self.viewport.get_model()
         model.clear()
-        filtered_thumbnails = [
-            (thumb, name)
-            for thumb, name in self.thumbnails
+        filtered_files = [
+            name
+            for name in self.files
             if fuzz.partial_ratio(query.casefold(), name.casefold()) >= FUZZY_THRESHOLD or query == ""
         ]
-        filtered_thumbnails.sort(key=lambda x: x[1].lower())
-        for pixbuf, file_name in filtered_thumbnails:
-            model.append([pixbuf, file_name])
+        filtered_files.sort(key=str.lower)
+        self._row_by_name = {}
+        for file_name in filtered_files:
+            self._row_by_name[file_name] = len(model)
+            model.append([self.pixbufs.get(file_name, self.placeholder), file_name])
+        self.schedule_thumbnail_loads()
         # If the search entry is empty, no icon is selected; otherwise, select the first one.
         if query.strip() == "":
             self.viewport.unselect_all()
@@ -258,9 +269,7 @@ class WallpaperSelector(Box):
             new_index = 0 if keyval in (Gdk.KEY_Down, Gdk.KEY_Right) else total_items - 1
         else:
             current_index = self.selected_index
-            allocation = self.viewport.get_allocation()
-            item_width = 108  # Approximate item width including margins
-            columns = max(1, allocation.width // item_width)
+            columns = self._columns()
             if keyval == Gdk.KEY_Right:
                 new_index = current_index + 1
             elif keyval == Gdk.KEY_Left:
@@ -283,52 +292,109 @@ class WallpaperSelector(Box):
         self.viewport.scroll_to_path(path, False, 0.5, 0.5)  # Ensure the selected icon is visible
         self.selected_index = new_index
 
-    def _start_thumbnail_thread(self):
-        thread = GLib.Thread.new("thumbnail-loader", self._preload_thumbnails, None)
+    def _columns(self) -> int:
+        allocation = self.viewport.get_allocation()
+        item_width = 108  # Approximate item width including margins
+        return max(1, allocation.width // item_width)
 
-    def _preload_thumbnails(self, _data):
-        futures = [self.executor.submit(self._process_file, file_name) for file_name in self.files]
-        concurrent.futures.wait(futures)
-        GLib.idle_add(self._process_batch)
+    def schedule_thumbnail_loads(self):
+        # Scrolling emits many events per frame; work out what to load once they settle
+        if not self._update_loads_id:
+            self._update_loads_id = GLib.idle_add(self._update_thumbnail_loads)
 
-    def _process_file(self, file_name):
+    def _update_thumbnail_loads(self):
+        self._update_loads_id = 0
+        model = self.viewport.get_model()
+        if not self.get_mapped() or len(model) == 0:
+            return False
+
+        columns = self._columns()
+        visible_range = self.viewport.get_visible_range()
+        if visible_range:
+            first, last = visible_range[0].get_indices()[0], visible_range[1].get_indices()[0]
+        else:
+            first, last = 0, columns * 4 - 1
+        center = (first + last) / 2
+
+        # Drop pixbufs of rows far away from the visible ones
+        keep_start = first - KEEP_ROWS * columns
+        keep_end = last + KEEP_ROWS * columns
+        for file_name in list(self.pixbufs):
+            row = self._row_by_name.get(file_name)
+            if row is None or not keep_start <= row <= keep_end:
+                del self.pixbufs[file_name]
+                if row is not None:
+                    model[row][0] = self.placeholder
+
+        # Queue the visible rows and a few around them, nearest to the middle first
+        load_start = max(0, first - PRELOAD_ROWS * columns)
+        load_end = min(len(model) - 1, last + PRELOAD_ROWS * columns)
+        wanted = sorted(range(load_start, load_end + 1), key=lambda row: abs(row - center))
+        self._load_queue = [
+            name for name in (model[row][1] for row in wanted)
+            if name not in self.pixbufs and name not in self._loads_in_flight
+        ]
+        self._start_thumbnail_loads()
+        return False
+
+    def _start_thumbnail_loads(self):
+        while self._load_queue and len(self._loads_in_flight) < MAX_LOADS_IN_FLIGHT:
+            file_name = self._load_queue.pop(0)
+            self._loads_in_flight.add(file_name)
+            self.executor.submit(self._load_thumbnail, file_name)
+        if not self._load_queue and not self._loads_in_flight:
+            # Thumbnails rendered by this batch may have pushed the cache over its budget
+            self.thumbnail_cache.evict()
+            self.thumbnail_cache.save()
+
+    def _load_thumbnail(self, file_name):
+        # Runs on the executor: render the thumbnail if needed and decode it
         full_path = os.path.join(data.WALLPAPERS_DIR, file_name)
-        cache_path = self._get_cache_path(file_name)
-        if not os.path.exists(cache_path):
-            try:
-                with Image.open(full_path) as img:
-                    width, height = img.size
-                    side = min(width, height)
-                    left = (width - side) // 2
-                    top = (height - side) // 2
-                    right = left + side
-                    bottom = top + side
-                    img_cropped = img.crop((left, top, right, bottom))
-                    img_cropped.thumbnail((96, 96), Image.Resampling.LANCZOS)
-                    img_cropped.save(cache_path, "PNG")
-            except Exception as e:
-                print(f"Error processing {file_name}: {e}")
-                return
-        self.thumbnail_queue.append((cache_path, file_name))
-        GLib.idle_add(self._process_batch)
-
-    def _process_batch(self):
-        batch = self.thumbnail_queue[:10]
-        del self.thumbnail_queue[:10]
-        for cache_path, file_name in batch:
+        # Valid thumbnails are found from the manifest without opening the image
+        cache_path = self.thumbnail_cache.get_or_create(full_path, self._create_thumbnail)
+        pixbuf = None
+        if cache_path is None:
+            print(f"Error processing {file_name}")
+        else:
             try:
                 pixbuf = GdkPixbuf.Pixbuf.new_from_file(cache_path)
-                self.thumbnails.append((pixbuf, file_name))
-                self.viewport.get_model().append([pixbuf, file_name])
             except Exception as e:
                 print(f"Error loading thumbnail {cache_path}: {e}")
-        if self.thumbnail_queue:
-            GLib.idle_add(self._process_batch)
+                # Regenerate it next time instead of trusting the manifest
+                self.thumbnail_cache.invalidate(full_path)
+        GLib.idle_add(self._on_thumbnail_loaded, file_name, pixbuf)
+
+    def _on_thumbnail_loaded(self, file_name, pixbuf):
+        self._loads_in_flight.discard(file_name)
+        if pixbuf is not None and file_name in self._row_by_name:
+            self.pixbufs[file_name] = pixbuf
+            self._set_row_pixbuf(file_name, pixbuf)
+        self._start_thumbnail_loads()
         return False
 
-    def _get_cache_path(self, file_name: str) -> str:
-        file_hash = hashlib.md5(file_name.encode("utf-8")).hexdigest()
-        return os.path.join(self.CACHE_DIR, f"{file_hash}.png")
+    def _set_row_pixbuf(self, file_name, pixbuf):
+        row = self._row_by_name.get(file_name)
+        if row is not None:
+            self.viewport.get_model()[row][0] = pixbuf
+
+    def _maintain_cache(self):
+        # Stale and orphaned thumbnails are removed in the background at startup
+        self.thumbnail_cache.evict()
+        self.thumbnail_cache.collect_garbage()
+        self.thumbnail_cache.save()
+
+    @staticmethod
+    def _create_thumbnail(full_path: str, cache_path: str):
+        with Image.open(full_path) as img:
+            width, height = img.size
+            side = min(width, height)
+            left = (width - side) // 2
+            top = (height - side) // 2
+            right = left + side
+            bottom = top + side
+            img_cropped = img.crop((left, top, right, bottom))
+            img_cropped.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.LANCZOS)
+            img_cropped.save(cache_path, "PNG")
 
     @staticmethod
     def _is_image(file_name: str) -> bool:
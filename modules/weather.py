@@ -1,13 +1,12 @@
 import gi
-import urllib.parse
-import requests
-from gi.repository import GLib
+import time
 
 from fabric.widgets.label import Label
 from fabric.widgets.box import Box
 
 gi.require_version("Gtk", "3.0")
 import modules.icons as icons
+from services.weather import WeatherService
 
 class Weather(Box):
     def __init__(self, **kwargs) -> None:
@@ -15,45 +14,24 @@ class Weather(Box):
         self.label = Label(name="weather-label", markup=icons.loader)
         self.add(self.label)
         self.show_all()
-        self.session = requests.Session()  # Reuse HTTP connection
-        # Update every 10 minutes
-        GLib.timeout_add_seconds(600, self.fetch_weather)
-        self.fetch_weather()
+        # The service refreshes on its own schedule and starts from its disk cache
+        self.service = WeatherService.get_initial()
+        self.service.connect("changed", lambda *_: self.update_weather())
+        self.update_weather()
 
-    def get_location(self):
-        try:
-            response = self.session.get("https://ipinfo.io/json", timeout=5)
-            if response.ok:
-                return response.json().get("city", "")
-            else:
-                print("Error getting location from ipinfo.")
-        except Exception as e:
-            print(f"Error getting location: {e}")
-        return ""
+    def update_weather(self):
+        text = self.service.text
+        if not text:
+            # Nothing fetched yet: keep the loader until the first reading, hide on failure
+            self.set_visible(not self.service.offline)
+            return
 
-    def fetch_weather(self):
-        GLib.Thread.new("weather-fetch", self._fetch_weather_thread, None)
-        return True
-
-    def _fetch_weather_thread(self, data):
-        location = self.get_location()
-        if location:
-            url = f"https://wttr.in/{urllib.parse.quote(location)}?format=%c+%t"
+        self.set_visible(True)
+        self.label.set_label(text)
+        updated = time.strftime("%H:%M", time.localtime(self.service.fetched_at))
+        if self.service.offline:
+            self.label.add_style_class("offline")
+            self.set_tooltip_text(f"Offline, last updated at {updated}")
         else:
-            url = "https://wttr.in/?format=%c+%t"
-        try:
-            response = self.session.get(url, timeout=5)
-            if response.ok:
-                weather_data = response.text.strip()
-                if "Unknown" in weather_data:
-                    GLib.idle_add(self.set_visible, False)
-                else:
-                    GLib.idle_add(self.set_visible, True)
-                    GLib.idle_add(self.label.set_label, weather_data.replace(" ", ""))
-            else:
-                GLib.idle_add(self.label.set_markup, f"{icons.cloud_off} Unavailable")
-                GLib.idle_add(self.set_visible, False)
-        except Exception as e:
-            print(f"Error fetching weather: {e}")
-            GLib.idle_add(self.label.set_markup, f"{icons.cloud_off} Error")
-            GLib.idle_add(self.set_visible, False)
+            self.label.remove_style_class("offline")
+            self.set_tooltip_text(f"Updated at {updated}")
@@ -1,51 +1,188 @@
-import requests
+import json
 import os
+import threading
+import time
+
+import requests
+from fabric.core.service import Property, Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+from utils.colors import Colors
+
+try:
+    # Optional: lets aria2 push download events instead of being polled while idle
+    import websocket
+except ImportError:
+    websocket = None
+
+RPC_URL = "http://localhost:6800/jsonrpc"
+RPC_WS_URL = "ws://localhost:6800/jsonrpc"
+RPC_TOKEN_PATH = os.path.expanduser("~/.config/sops-nix/secrets/ariarpc")
+
+# (connect, read) timeouts in seconds, so a hung aria2 never stalls the poller for long
+RPC_TIMEOUT = (1, 2)
+# Poll intervals in seconds while downloads are running and while idle without push events
+ACTIVE_POLL_S = 2
+IDLE_POLL_S = 15
+# Longest wait between attempts while aria2 is not reachable
+MAX_BACKOFF_S = 120
+
+# Push notifications that change the set of active downloads
+ARIA_EVENTS = {
+    "aria2.onDownloadStart",
+    "aria2.onDownloadPause",
+    "aria2.onDownloadStop",
+    "aria2.onDownloadComplete",
+    "aria2.onDownloadError",
+    "aria2.onBtDownloadComplete",
+}
+
+
+class AriaProvider(Service):
+    """
+    Average progress of aria2's active downloads.
+
+    All RPC traffic runs on a background thread through one pooled HTTP session with
+    short timeouts. aria2 is only polled while downloads are active; when the optional
+    websocket-client module is installed, new downloads are noticed through aria2's push
+    notifications instead of an idle poll. Unreachable servers are retried with
+    exponential backoff.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if AriaProvider.instance is None:
+            AriaProvider.instance = AriaProvider()
+
+        return AriaProvider.instance
 
-class AriaProvider():
-    def __init__(self):
-        self.progress = 0
+    @Signal
+    def progress_changed(self, progress: float) -> None:
+        """Emitted on the main loop when the average progress in percent changes."""
 
-    def fetch_from_aria(self):
-        RPC_URL = "http://localhost:6800/jsonrpc"
-        RPC_TOKEN_PATH = os.path.expanduser(f"~/.config/sops-nix/secrets/ariarpc")
+    @Property(float, "readable")
+    def progress(self) -> float:
+        return self._progress
 
-        # Read the RPC token from the file
-        with open(RPC_TOKEN_PATH, "r") as f:
-            RPC_TOKEN = f.read().strip()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._progress = 0.0
+        self._token = self._read_token()
+        self._session = requests.Session()
+        self._wake = threading.Event()
+        self._push_connected = False
+        # Last value handed to the main loop, only touched by the poll thread
+        self._published = 0.0
 
-        # JSON payload for the request
+        threading.Thread(target=self._poll_loop, name="aria2-poll", daemon=True).start()
+        if websocket is not None:
+            threading.Thread(target=self._push_loop, name="aria2-push", daemon=True).start()
+
+    @staticmethod
+    def _read_token() -> str | None:
+        try:
+            with open(RPC_TOKEN_PATH, "r") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _params(self) -> list:
+        return [f"token:{self._token}"] if self._token else []
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    def _poll_loop(self):
+        backoff = ACTIVE_POLL_S
+        while True:
+            # Cleared before the request, so an event that arrives during it isn't lost
+            self._wake.clear()
+            try:
+                active = self._fetch_active()
+            except (requests.RequestException, ValueError) as e:
+                if backoff == ACTIVE_POLL_S:
+                    logger.warning(f"{Colors.WARNING}[Aria2] RPC unavailable: {e}")
+                self._publish(0.0)
+                self._wake.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_S)
+                continue
+
+            backoff = ACTIVE_POLL_S
+            self._publish(self._average_progress(active))
+            if active:
+                timeout = ACTIVE_POLL_S
+            elif self._push_connected:
+                # Nothing to poll until aria2 announces a download
+                timeout = None
+            else:
+                timeout = IDLE_POLL_S
+            self._wake.wait(timeout)
+
+    def _fetch_active(self) -> list[dict]:
         payload = {
             "jsonrpc": "2.0",
-            "id": "qwer",
+            "id": "ax-shell",
             "method": "aria2.tellActive",
-            "params": [f"token:{RPC_TOKEN}"]
+            "params": self._params() + [["completedLength", "totalLength"]],
         }
+        response = self._session.post(RPC_URL, json=payload, timeout=RPC_TIMEOUT)
+        response.raise_for_status()
+        return response.json().get("result", [])
 
-        # Send the request
-        response = requests.post(RPC_URL, json=payload, headers={"Content-Type": "application/json"})
-
-        if response.status_code == 200:
-            data = response.json()
-    
-            # Extract progress progressages, avoiding division by zero
+    @staticmethod
+    def _average_progress(active: list[dict]) -> float:
+        progress_values = []
+        for item in active:
             try:
-                progress_values = [
-                    (int(item["completedLength"]) / int(item["totalLength"])) * 100
-                    for item in data.get("result", [])
-                    if int(item.get("totalLength", 0)) > 0
-                ]
-                progress = sum(progress_values) / len(progress_values) if progress_values else None
-            except (KeyError, ValueError, ZeroDivisionError):
-                progress = None
-
-            # If no active downloads, output 0
-            if progress is None:
-                self.progress = 0
-            else:
-                self.progress = progress
+                total = int(item.get("totalLength", 0))
+                if total > 0:
+                    progress_values.append(int(item["completedLength"]) / total * 100)
+            except (KeyError, ValueError):
+                continue
+        return sum(progress_values) / len(progress_values) if progress_values else 0.0
+
+    def _publish(self, progress: float):
+        if progress != self._published:
+            self._published = progress
+            GLib.idle_add(self._set_progress, progress)
 
-        else:
-            print("Error fetching data")
-        return self.progress
+    def _set_progress(self, progress: float):
+        self._progress = progress
+        self.notify("progress")
+        self.emit("progress-changed", progress)
+        return False
 
+    # ------------------------------------------------------------------
+    # Push notifications
+    # ------------------------------------------------------------------
 
+    def _push_loop(self):
+        backoff = ACTIVE_POLL_S
+        while True:
+            try:
+                ws = websocket.create_connection(RPC_WS_URL, timeout=RPC_TIMEOUT[0])
+            except (OSError, websocket.WebSocketException):
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_S)
+                continue
+
+            backoff = ACTIVE_POLL_S
+            # Notifications may arrive at any time, only the connect is bounded
+            ws.settimeout(None)
+            self._push_connected = True
+            try:
+                while True:
+                    message = json.loads(ws.recv())
+                    if message.get("method") in ARIA_EVENTS:
+                        self._wake.set()
+            except (OSError, ValueError, websocket.WebSocketException):
+                pass
+            finally:
+                self._push_connected = False
+                ws.close()
+                # Fall back to idle polling until the socket is back
+                self._wake.set()
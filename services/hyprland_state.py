@@ -0,0 +1,390 @@
+import json
+
+from fabric.core.service import Property, Service, Signal
+from fabric.hyprland.widgets import get_hyprland_connection
+from gi.repository import GLib
+from loguru import logger
+
+from utils.colors import Colors
+
+# Delay used to coalesce bursts of geometry-affecting events into one j/clients query
+RESYNC_DELAY_MS = 50
+
+
+def normalize_address(address: str) -> str:
+    """Hyprland events send window addresses without the 0x prefix used by j/clients."""
+    if not address:
+        return ""
+    return address if address.startswith("0x") else f"0x{address}"
+
+
+class HyprlandState(Service):
+    """
+    In-memory model of Hyprland clients, workspaces and monitors.
+
+    The model is loaded once and then kept up to date from the event socket, so
+    widgets can look clients up by address, workspace or class without sending
+    their own IPC requests and parsing the whole client list every time.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if HyprlandState.instance is None:
+            HyprlandState.instance = HyprlandState()
+
+        return HyprlandState.instance
+
+    @Signal
+    def clients_changed(self) -> None:
+        """Emitted when a client is added, removed or changes workspace, class or state."""
+
+    @Signal
+    def geometry_changed(self) -> None:
+        """Emitted when the position or size of any mapped client changes."""
+
+    @Signal
+    def focus_changed(self, old_address: str, new_address: str) -> None:
+        """Emitted when the focused window changes."""
+
+    @Signal
+    def workspace_changed(self, workspace_id: int) -> None:
+        """Emitted when the active workspace changes."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._conn = get_hyprland_connection()
+
+        self._clients: dict[str, dict] = {}
+        self._by_workspace: dict[int, set[str]] = {}
+        self._by_class: dict[str, set[str]] = {}
+        self._workspaces: dict[int, dict] = {}
+        self._monitors: dict[int, dict] = {}
+        self._active_workspace: int = 0
+        self._active_address: str = ""
+        self._resync_id: int = 0
+        self.is_ready = False
+
+        for event, handler in {
+            "openwindow": self._on_open_window,
+            "closewindow": self._on_close_window,
+            "movewindowv2": self._on_move_window,
+            "activewindowv2": self._on_active_window,
+            "workspacev2": self._on_workspace,
+            "focusedmon": self._on_focused_monitor,
+            "createworkspacev2": self._on_create_workspace,
+            "destroyworkspacev2": self._on_destroy_workspace,
+            "changefloatingmode": self._on_change_floating_mode,
+            "fullscreen": self._on_fullscreen,
+            "windowtitlev2": self._on_window_title,
+            "monitoradded": lambda *_: self.reload(),
+            "monitorremoved": lambda *_: self.reload(),
+            "configreloaded": lambda *_: self.reload(),
+        }.items():
+            self._conn.connect(f"event::{event}", handler)
+
+        if self._conn.ready:
+            self.reload()
+        else:
+            self._conn.connect("event::ready", lambda *_: self.reload())
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    @property
+    def clients(self) -> list[dict]:
+        return list(self._clients.values())
+
+    @property
+    def monitors(self) -> dict[int, dict]:
+        return self._monitors
+
+    @property
+    def workspaces(self) -> dict[int, dict]:
+        return self._workspaces
+
+    @Property(int, "readable")
+    def active_workspace(self) -> int:
+        return self._active_workspace
+
+    @Property(str, "readable")
+    def active_address(self) -> str:
+        return self._active_address
+
+    def get_client(self, address: str) -> dict | None:
+        return self._clients.get(normalize_address(address))
+
+    def get_active_client(self) -> dict | None:
+        return self._clients.get(self._active_address)
+
+    def get_clients_on_workspace(self, workspace_id: int) -> list[dict]:
+        return [self._clients[a] for a in self._by_workspace.get(workspace_id, ())]
+
+    def get_clients_by_class(self, class_name: str) -> list[dict]:
+        return [self._clients[a] for a in self._by_class.get(class_name.lower(), ())]
+
+    def get_monitor(self, monitor_id: int) -> dict | None:
+        return self._monitors.get(monitor_id)
+
+    # ------------------------------------------------------------------
+    # Full (re)load
+    # ------------------------------------------------------------------
+
+    def _query(self, command: str, default):
+        try:
+            return json.loads(self._conn.send_command(command).reply.decode())
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.warning(f"{Colors.WARNING}[HyprlandState] Failed to query {command}: {e}")
+            return default
+
+    def reload(self):
+        """Load the complete model from Hyprland. Only needed at startup and on monitor changes."""
+        self._monitors = {m["id"]: m for m in self._query("j/monitors", [])}
+        self._workspaces = {w["id"]: w for w in self._query("j/workspaces", [])}
+        self._set_clients(self._query("j/clients", []))
+
+        active_workspace = self._query("j/activeworkspace", {})
+        self._active_workspace = active_workspace.get("id", 0)
+        active_window = self._query("j/activewindow", {})
+        self._active_address = active_window.get("address", "") if isinstance(active_window, dict) else ""
+
+        self.is_ready = True
+        self.emit("clients-changed")
+        self.emit("geometry-changed")
+        self.emit("workspace-changed", self._active_workspace)
+        self.emit("focus-changed", "", self._active_address)
+        return False
+
+    def _set_clients(self, clients: list[dict]):
+        self._clients = {}
+        self._by_workspace = {}
+        self._by_class = {}
+        for client in clients:
+            self._index_client(client)
+
+    def _index_client(self, client: dict):
+        address = client["address"]
+        self._clients[address] = client
+        self._by_workspace.setdefault(client["workspace"]["id"], set()).add(address)
+        for key in {client.get("initialClass", "").lower(), client.get("class", "").lower()}:
+            if key:
+                self._by_class.setdefault(key, set()).add(address)
+
+    def _unindex_client(self, address: str) -> dict | None:
+        client = self._clients.pop(address, None)
+        if client is None:
+            return None
+        workspace_clients = self._by_workspace.get(client["workspace"]["id"])
+        if workspace_clients is not None:
+            workspace_clients.discard(address)
+            if not workspace_clients:
+                del self._by_workspace[client["workspace"]["id"]]
+        for key in {client.get("initialClass", "").lower(), client.get("class", "").lower()}:
+            class_clients = self._by_class.get(key)
+            if class_clients is not None:
+                class_clients.discard(address)
+                if not class_clients:
+                    del self._by_class[key]
+        return client
+
+    # ------------------------------------------------------------------
+    # Geometry resync
+    # ------------------------------------------------------------------
+
+    def schedule_resync(self):
+        """Events carry no geometry, so refresh it once after a burst of layout-changing events."""
+        if not self._resync_id:
+            self._resync_id = GLib.timeout_add(RESYNC_DELAY_MS, self._resync_clients)
+
+    @staticmethod
+    def _client_signature(client: dict) -> tuple:
+        return (
+            client["workspace"]["id"],
+            client.get("initialClass", ""),
+            client.get("class", ""),
+            bool(client.get("floating")),
+            bool(client.get("fullscreen")),
+        )
+
+    @staticmethod
+    def _geometry_signature(client: dict) -> tuple:
+        return (
+            client["workspace"]["id"],
+            client.get("mapped", False),
+            tuple(client.get("at") or ()),
+            tuple(client.get("size") or ()),
+        )
+
+    def _resync_clients(self):
+        self._resync_id = 0
+        old_clients = self._clients
+        self._set_clients(self._query("j/clients", list(old_clients.values())))
+
+        clients_changed = old_clients.keys() != self._clients.keys() or any(
+            self._client_signature(old_clients[a]) != self._client_signature(c)
+            for a, c in self._clients.items()
+        )
+        geometry_changed = clients_changed or any(
+            self._geometry_signature(old_clients[a]) != self._geometry_signature(c)
+            for a, c in self._clients.items()
+        )
+
+        if clients_changed:
+            self.emit("clients-changed")
+        if geometry_changed:
+            self.emit("geometry-changed")
+        return False
+
+    # ------------------------------------------------------------------
+    # Event handlers
+    # ------------------------------------------------------------------
+
+    def _workspace_id_from_name(self, name: str) -> int:
+        for workspace in self._workspaces.values():
+            if workspace.get("name") == name:
+                return workspace["id"]
+        try:
+            return int(name)
+        except ValueError:
+            return 0
+
+    def _on_open_window(self, _, event):
+        # ADDRESS,WORKSPACENAME,WINDOWCLASS,WINDOWTITLE
+        if len(event.data) < 3:
+            return self.schedule_resync()
+        address = normalize_address(event.data[0])
+        workspace_name = event.data[1]
+        window_class = event.data[2]
+        title = ",".join(event.data[3:])
+        workspace_id = self._workspace_id_from_name(workspace_name)
+        workspace = self._workspaces.get(workspace_id, {})
+
+        self._unindex_client(address)
+        self._index_client({
+            "address": address,
+            "mapped": True,
+            "hidden": False,
+            "at": [0, 0],
+            "size": [0, 0],
+            "workspace": {"id": workspace_id, "name": workspace_name},
+            "floating": False,
+            "fullscreen": False,
+            "monitor": workspace.get("monitorID", -1),
+            "class": window_class,
+            "title": title,
+            "initialClass": window_class,
+            "initialTitle": title,
+        })
+        self.emit("clients-changed")
+        self.schedule_resync()
+
+    def _on_close_window(self, _, event):
+        # ADDRESS
+        address = normalize_address(event.data[0] if event.data else "")
+        if self._unindex_client(address) is not None:
+            if address == self._active_address:
+                self._active_address = ""
+                self.notify("active-address")
+            self.emit("clients-changed")
+        self.schedule_resync()
+
+    def _on_move_window(self, _, event):
+        # ADDRESS,WORKSPACEID,WORKSPACENAME
+        if len(event.data) < 3:
+            return self.schedule_resync()
+        address = normalize_address(event.data[0])
+        client = self._unindex_client(address)
+        if client is not None:
+            try:
+                workspace_id = int(event.data[1])
+            except ValueError:
+                workspace_id = self._workspace_id_from_name(event.data[2])
+            client["workspace"] = {"id": workspace_id, "name": event.data[2]}
+            self._index_client(client)
+            self.emit("clients-changed")
+        self.schedule_resync()
+
+    def _on_active_window(self, _, event):
+        # ADDRESS (empty when nothing is focused)
+        address = normalize_address(event.data[0] if event.data else "")
+        if address == self._active_address:
+            return
+        old_address = self._active_address
+        self._active_address = address
+        self.notify("active-address")
+        self.emit("focus-changed", old_address, address)
+
+    def _on_workspace(self, _, event):
+        # WORKSPACEID,WORKSPACENAME
+        try:
+            workspace_id = int(event.data[0])
+        except (IndexError, ValueError):
+            return
+        self._set_active_workspace(workspace_id)
+
+    def _on_focused_monitor(self, _, event):
+        # MONNAME,WORKSPACENAME
+        if len(event.data) < 2:
+            return
+        self._set_active_workspace(self._workspace_id_from_name(event.data[1]))
+
+    def _set_active_workspace(self, workspace_id: int):
+        if workspace_id == self._active_workspace:
+            return
+        self._active_workspace = workspace_id
+        self.notify("active-workspace")
+        self.emit("workspace-changed", workspace_id)
+
+    def _on_create_workspace(self, _, event):
+        # WORKSPACEID,WORKSPACENAME
+        try:
+            workspace_id = int(event.data[0])
+        except (IndexError, ValueError):
+            return
+        name = event.data[1] if len(event.data) > 1 else str(workspace_id)
+        monitor = self._monitors.get(self._focused_monitor_id(), {})
+        self._workspaces.setdefault(workspace_id, {
+            "id": workspace_id,
+            "name": name,
+            "monitor": monitor.get("name", ""),
+            "monitorID": monitor.get("id", -1),
+        })
+
+    def _on_destroy_workspace(self, _, event):
+        # WORKSPACEID,WORKSPACENAME
+        try:
+            self._workspaces.pop(int(event.data[0]), None)
+        except (IndexError, ValueError):
+            return
+
+    def _focused_monitor_id(self) -> int:
+        workspace = self._workspaces.get(self._active_workspace, {})
+        return workspace.get("monitorID", -1)
+
+    def _on_change_floating_mode(self, _, event):
+        # ADDRESS,FLOATING
+        if len(event.data) < 2:
+            return
+        client = self._clients.get(normalize_address(event.data[0]))
+        if client is not None:
+            client["floating"] = event.data[1] == "1"
+            self.emit("clients-changed")
+        self.schedule_resync()
+
+    def _on_fullscreen(self, _, event):
+        # 0/1, applies to the focused window
+        client = self.get_active_client()
+        if client is not None and event.data:
+            client["fullscreen"] = event.data[0] == "1"
+            self.emit("clients-changed")
+        self.schedule_resync()
+
+    def _on_window_title(self, _, event):
+        # ADDRESS,TITLE
+        if not event.data:
+            return
+        client = self._clients.get(normalize_address(event.data[0]))
+        if client is not None:
+            client["title"] = ",".join(event.data[1:])
@@ -0,0 +1,316 @@
+import time
+from collections.abc import Callable, Iterable
+
+from fabric.core.service import Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+from config.data import METRICS_HISTORY_MINUTES
+from utils.colors import Colors
+from utils.metrics_readers import create_reader
+from utils.ring_buffer import RingBuffer
+
+# Marks metrics that were never pushed to a subscription, since None is a valid value
+_UNSET = object()
+
+
+class MetricsSubscription:
+    """
+    Handle returned by MetricsSampler.subscribe().
+
+    The subscription is served while it is enabled and, if it was created for a
+    widget, while that widget is mapped. Widgets lower the interval while they show
+    more detail (e.g. a revealed label) and raise it again afterwards.
+    """
+
+    def __init__(
+        self,
+        sampler: "MetricsSampler",
+        metrics: tuple[str, ...],
+        interval_ms: int,
+        callback: Callable[[str, object], None],
+        widget=None,
+        every_sample: bool = False,
+    ):
+        self.metrics = metrics
+        self.interval_ms = interval_ms
+        self.callback = callback
+        self.every_sample = every_sample
+        # Last value pushed per metric, used to drop changes below the threshold
+        self.last: dict[str, object] = {}
+        self.due = 0.0
+        self._sampler = sampler
+        self._enabled = True
+        self._mapped = widget is None
+        self._handlers = []
+        self._widget = widget
+        if widget is not None:
+            self._mapped = widget.get_mapped()
+            self._handlers = [
+                widget.connect("map", lambda *_: self._set_mapped(True)),
+                widget.connect("unmap", lambda *_: self._set_mapped(False)),
+            ]
+
+    @property
+    def active(self) -> bool:
+        return self._enabled and self._mapped
+
+    def set_enabled(self, enabled: bool):
+        if enabled != self._enabled:
+            self._enabled = enabled
+            self._sampler._subscription_changed(self)
+
+    def set_interval(self, interval_ms: int):
+        if interval_ms != self.interval_ms:
+            self.interval_ms = interval_ms
+            # Serve a finer interval right away instead of at the end of the old one
+            self.due = min(self.due, time.monotonic() + interval_ms / 1000)
+            self._sampler._subscription_changed(self)
+
+    def cancel(self):
+        for handler in self._handlers:
+            self._widget.disconnect(handler)
+        self._handlers = []
+        self._sampler._unsubscribe(self)
+
+    def _set_mapped(self, mapped: bool):
+        if mapped != self._mapped:
+            self._mapped = mapped
+            self._sampler._subscription_changed(self)
+
+
+class MetricsSampler:
+    """
+    Samples system metrics for every widget from a single timer.
+
+    Widgets subscribe to the metrics they display with the resolution they need. On
+    each tick only the metrics of the subscriptions that are due are read, each of them
+    once, and a subscriber is only called for values that moved past the metric's
+    threshold since it was last called. The timer runs at the finest interval among
+    active subscriptions and is removed entirely while nothing that shows a metric is
+    visible.
+
+    Metrics that come from the same file are read together, so asking for both cpu
+    and cores costs a single read of /proc/stat.
+
+    Metrics and their values:
+      cpu, mem, disk: usage percent
+      cores: tuple of usage percent per core
+      temp: CPU package temperature in °C, or None without a sensor
+      freq: (average, maximum) core frequency in MHz, or None without cpufreq
+      battery: (percent, charging), percent is 0.0 and charging None without a battery
+      net: smoothed (download, upload) of the primary interface in bytes per second
+      interfaces: (name, download, upload) of every interface but loopback
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if MetricsSampler.instance is None:
+            MetricsSampler.instance = MetricsSampler()
+
+        return MetricsSampler.instance
+
+    def __init__(self):
+        # Reads /proc and /sys directly, or goes through psutil where they are missing
+        self.reader = create_reader()
+        # source -> (reader, metrics it returns, minimum ms between reads). Readers
+        # of several metrics return a tuple with one value per metric.
+        self._sources: dict[str, tuple[Callable[[], object], tuple[str, ...], int]] = {
+            "cpu": (self.reader.cpu, ("cpu", "cores"), 0),
+            "mem": (self.reader.mem, ("mem",), 0),
+            # Filesystem usage moves slowly, a statvfs every few seconds is plenty
+            "disk": (self.reader.disk, ("disk",), 5000),
+            "sensors": (self.reader.sensors, ("temp", "freq"), 0),
+            "battery": (self.reader.battery, ("battery",), 0),
+            "net": (self.reader.net, ("net", "interfaces"), 0),
+        }
+        # metric -> (source, change threshold)
+        self._specs: dict[str, tuple[str, float]] = {
+            "cpu": ("cpu", 1.0),
+            "cores": ("cpu", 2.0),
+            "mem": ("mem", 0.5),
+            "disk": ("disk", 0.1),
+            "temp": ("sensors", 1.0),
+            "freq": ("sensors", 50.0),
+            "battery": ("battery", 1.0),
+            "net": ("net", 512.0),
+            "interfaces": ("net", 512.0),
+        }
+        self.values: dict[str, object] = {}
+        self._read_at: dict[str, float] = {}
+        self._subscriptions: list[MetricsSubscription] = []
+        self._timer_id = 0
+        self._timer_interval = 0
+        self._wake_id = 0
+
+    def set_primary_interface(self, interface: str | None):
+        """Report net for this interface; None sums the physical interfaces."""
+        self.reader.rates.primary_interface = interface
+
+    def subscribe(
+        self,
+        metrics: Iterable[str],
+        interval_ms: int,
+        callback: Callable[[str, object], None],
+        widget=None,
+        every_sample: bool = False,
+    ) -> MetricsSubscription:
+        """
+        Call callback(metric, value) when any of metrics changes, checking at most
+        every interval_ms. If widget is given, nothing is sampled for this subscription
+        while it is unmapped. The current values are delivered right away.
+        With every_sample, callback gets every sample, changed or not.
+        """
+        metrics = tuple(metrics)
+        for metric in metrics:
+            if metric not in self._specs:
+                raise ValueError(f"Unknown metric: {metric}")
+        subscription = MetricsSubscription(self, metrics, interval_ms, callback, widget, every_sample)
+        self._subscriptions.append(subscription)
+        self._subscription_changed(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: MetricsSubscription):
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        self._reschedule()
+
+    def _subscription_changed(self, subscription: MetricsSubscription):
+        if subscription.active and subscription.due <= time.monotonic():
+            # Deliver the current values to a subscription that just became visible
+            if not self._wake_id:
+                self._wake_id = GLib.idle_add(self._wake)
+        self._reschedule()
+
+    def _wake(self):
+        self._wake_id = 0
+        self._tick()
+        return False
+
+    def _reschedule(self):
+        intervals = [s.interval_ms for s in self._subscriptions if s.active]
+        interval = min(intervals) if intervals else 0
+        if interval == self._timer_interval:
+            return
+        if self._timer_id:
+            GLib.source_remove(self._timer_id)
+            self._timer_id = 0
+        self._timer_interval = interval
+        if not interval:
+            return
+        if interval % 1000 == 0:
+            # Whole seconds are batched with the other second timers of the process
+            self._timer_id = GLib.timeout_add_seconds(interval // 1000, self._tick)
+        else:
+            self._timer_id = GLib.timeout_add(interval, self._tick)
+
+    def _tick(self):
+        now = time.monotonic()
+        # Anything due before the next tick is served by this one, so subscriptions
+        # are never pushed back a whole interval by timer jitter
+        slack = self._timer_interval / 2000
+        due = [s for s in self._subscriptions if s.active and s.due <= now + slack]
+        if not due:
+            return True
+
+        wanted = {self._specs[metric][0] for s in due for metric in s.metrics}
+        for source in wanted:
+            reader, metrics, min_interval_ms = self._sources[source]
+            if source in self._read_at and now - self._read_at[source] < min_interval_ms / 1000 - slack:
+                continue
+            try:
+                value = reader()
+            except Exception as e:
+                logger.warning(f"{Colors.WARNING}[MetricsSampler] Failed to read {source}: {e}")
+                continue
+            self._read_at[source] = now
+            if len(metrics) == 1:
+                self.values[metrics[0]] = value
+            else:
+                self.values.update(zip(metrics, value))
+
+        for subscription in due:
+            subscription.due = now + subscription.interval_ms / 1000
+            for metric in subscription.metrics:
+                if metric not in self.values:
+                    continue
+                value = self.values[metric]
+                threshold = self._specs[metric][1]
+                if not subscription.every_sample and not self._moved(
+                    subscription.last.get(metric, _UNSET), value, threshold
+                ):
+                    continue
+                subscription.last[metric] = value
+                subscription.callback(metric, value)
+        return True
+
+    @staticmethod
+    def _moved(old, new, threshold: float) -> bool:
+        if old is _UNSET:
+            return True
+        if isinstance(new, tuple):
+            if not isinstance(old, tuple) or len(old) != len(new):
+                return True
+            return any(
+                MetricsSampler._moved(a, b, threshold) for a, b in zip(old, new)
+            )
+        if isinstance(new, bool) or not isinstance(new, (int, float)) or not isinstance(old, (int, float)):
+            return old != new
+        # Returning to exactly zero is always shown, e.g. a transfer that stopped
+        return abs(new - old) >= threshold or (new == 0) != (old == 0)
+
+
+class MetricsHistory(Service):
+    """
+    The last METRICS_HISTORY_MINUTES of CPU, memory, disk and network usage at one
+    sample per second, kept in fixed-size ring buffers for sparklines.
+
+    Series: cpu, core-0 ... core-N, mem, disk (percent), net-down, net-up (bytes per
+    second). Per-core series are added when the core count is first known. The history
+    keeps sampling while nothing is shown, so trends are there when the dashboard opens;
+    set metrics_history_minutes to 0 to turn it off.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if MetricsHistory.instance is None:
+            MetricsHistory.instance = MetricsHistory()
+
+        return MetricsHistory.instance
+
+    @Signal
+    def updated(self, series: str) -> None:
+        """Emitted after a value was appended to a series."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        capacity = max(int(METRICS_HISTORY_MINUTES * 60), 0)
+        self.capacity = capacity
+        self.series: dict[str, RingBuffer] = {}
+        if not capacity:
+            return
+        for name in ("cpu", "mem", "disk", "net-down", "net-up"):
+            self.series[name] = RingBuffer(capacity)
+        self._subscription = MetricsSampler.get_initial().subscribe(
+            ("cpu", "cores", "mem", "disk", "net"), 1000, self._record, every_sample=True
+        )
+
+    def _record(self, metric: str, value):
+        if metric == "net":
+            for name, rate in zip(("net-down", "net-up"), value):
+                self.series[name].append(rate)
+                self.emit("updated", name)
+        elif metric == "cores":
+            for core, percent in enumerate(value):
+                name = f"core-{core}"
+                if name not in self.series:
+                    self.series[name] = RingBuffer(self.capacity)
+                self.series[name].append(percent)
+            self.emit("updated", metric)
+        else:
+            self.series[metric].append(value)
+            self.emit("updated", metric)
@@ -1,4 +1,4 @@
-from typing import Any, List, Literal
+from typing import Any, Callable, List, Literal
 
 import gi
 from fabric.core.service import Property, Service, Signal
@@ -253,6 +253,34 @@ class Ethernet(Service):
         self.emit("changed")
 
 
+_nm_client: NM.Client | None = None
+_nm_client_waiters: list[Callable[[NM.Client], None]] | None = None
+
+
+def get_nm_client(callback: Callable[[NM.Client], None]):
+    """
+    Call callback with the NM.Client shared by all network services, creating it
+    asynchronously on first use. Every NM.Client mirrors the whole NetworkManager
+    state over D-Bus, so the shell keeps just one.
+    """
+    global _nm_client_waiters
+    if _nm_client is not None:
+        callback(_nm_client)
+        return
+    if _nm_client_waiters is None:
+        _nm_client_waiters = []
+        NM.Client.new_async(cancellable=None, callback=_on_nm_client_ready)
+    _nm_client_waiters.append(callback)
+
+
+def _on_nm_client_ready(client: NM.Client, task: Gio.Task):
+    global _nm_client, _nm_client_waiters
+    _nm_client = client
+    waiters, _nm_client_waiters = _nm_client_waiters, None
+    for callback in waiters:
+        callback(client)
+
+
 class NetworkClient(Service):
     """A service to manage the network connections."""
 
@@ -264,13 +292,9 @@ class NetworkClient(Service):
         self.wifi_device: Wifi | None = None
         self.ethernet_device: Ethernet | None = None
         super().__init__(**kwargs)
-        NM.Client.new_async(
-            cancellable=None,
-            callback=self._init_network_client,
-            **kwargs,
-        )
+        get_nm_client(self._init_network_client)
 
-    def _init_network_client(self, client: NM.Client, task: Gio.Task, **kwargs):
+    def _init_network_client(self, client: NM.Client):
         self._client = client
         wifi_device: NM.DeviceWifi | None = self._get_device(NM.DeviceType.WIFI)  # type: ignore
         ethernet_device: NM.DeviceEthernet | None = self._get_device(
@@ -285,7 +309,12 @@ class NetworkClient(Service):
             self.ethernet_device = Ethernet(client=self._client, device=ethernet_device)
             self.emit("device-ready")
 
+        self._client.connect("notify::primary-connection", lambda *_: self._primary_changed())
+        self._primary_changed()
+
+    def _primary_changed(self):
         self.notify("primary-device")
+        self.notify("primary-interface")
 
     def _get_device(self, device_type) -> Any:
         devices: List[NM.Device] = self._client.get_devices()  # type: ignore
@@ -300,7 +329,7 @@ class NetworkClient(Service):
         )
 
     def _get_primary_device(self) -> Literal["wifi", "wired"] | None:
-        if not self._client:
+        if not self._client or not self._client.get_primary_connection():
             return None
         return (
             "wifi"
@@ -321,3 +350,14 @@ class NetworkClient(Service):
     @Property(str, "readable")
     def primary_device(self) -> Literal["wifi", "wired"] | None:
         return self._get_primary_device()
+
+    @Property(str, "readable")
+    def primary_interface(self) -> str | None:
+        """Kernel name of the primary device's interface, e.g. wlan0."""
+        device = {
+            "wifi": self.wifi_device,
+            "wired": self.ethernet_device,
+        }.get(self._get_primary_device())
+        if device is None or device._device is None:
+            return None
+        return device._device.get_iface()
@@ -1,116 +1,137 @@
-import subprocess
-import re
-
-class VPNProvider():
-    def __init__(self):
-        self.is_connected = False
-        self.name = ""
-        
-    def fetch_connections(self):
-        try:
-            # Run nmcli command
-            result = subprocess.run(
-                ["nmcli", "-g", "name,type,active", "connection", "show", "--order", "name"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            # Filter lines that match 'wireguard:yes' and extract connection name
-            connections = [
-                re.sub(r":wireguard:yes$", "", line)
-                for line in result.stdout.splitlines()
-                if re.search(r":wireguard:yes$", line)
-            ]
-
-            self.is_connected = False if connections.__len__() == 0 or connections[0] == "" else True
-            self.name = connections[0] if self.is_connected else ""
-            return self.name if self.is_connected else ""
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error running nmcli: {e}")
-            return ""
-
-    def get_only_active_wireguard(self):
-        """Finds the currently active WireGuard VPN."""
-        try:
-            result = subprocess.run(
-                ["nmcli", "-g", "name,type", "connection", "show", "--active"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            for line in result.stdout.splitlines():
-                if line.endswith(":wireguard"):
-                    return line.replace(":wireguard", "")
-            return None
-        except subprocess.CalledProcessError:
-            return None
-
-    def get_all_wireguard_connections(self):
-        """Retrieves a list of all WireGuard VPN connections sorted by name."""
-        try:
-            result = subprocess.run(
-                ["nmcli", "-g", "name,type", "connection", "show", "--order", "name"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            return [re.sub(r":wireguard$", "", line) for line in result.stdout.splitlines() if ":wireguard" in line]
-        except subprocess.CalledProcessError:
+from fabric.core.service import Property, Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+from services.network import NM, get_nm_client
+from utils.colors import Colors
+
+VPN_TYPE = "wireguard"
+
+# Active connections in these states are on their way out and no longer shown
+_ENDING_STATES = (
+    NM.ActiveConnectionState.DEACTIVATING,
+    NM.ActiveConnectionState.DEACTIVATED,
+)
+
+
+class VPNProvider(Service):
+    """
+    Tracks the active WireGuard connection through NetworkManager.
+
+    State changes arrive as NM.Client signals, so nothing is polled, and connections
+    are brought up and down with NetworkManager's asynchronous D-Bus calls.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if VPNProvider.instance is None:
+            VPNProvider.instance = VPNProvider()
+
+        return VPNProvider.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Emitted when a WireGuard connection goes up or down."""
+
+    @Property(str, "readable")
+    def name(self) -> str:
+        """Name of the active WireGuard connection, or an empty string."""
+        return self._name
+
+    @Property(bool, "readable", default_value=False)
+    def is_connected(self) -> bool:
+        return bool(self._name)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._client: NM.Client | None = None
+        self._name = ""
+        # Active connection -> handler of its state signal
+        self._watched: dict[NM.ActiveConnection, int] = {}
+        get_nm_client(self._on_client_ready)
+
+    def _on_client_ready(self, client: NM.Client):
+        self._client = client
+        client.connect("active-connection-added", self._on_active_added)
+        client.connect("active-connection-removed", self._on_active_removed)
+        for active in client.get_active_connections():
+            self._on_active_added(client, active)
+        self._update()
+
+    def _on_active_added(self, client, active: NM.ActiveConnection):
+        if active.get_connection_type() != VPN_TYPE or active in self._watched:
+            return
+        self._watched[active] = active.connect("notify::state", lambda *_: self._update())
+        self._update()
+
+    def _on_active_removed(self, client, active: NM.ActiveConnection):
+        handler = self._watched.pop(active, None)
+        if handler is not None:
+            active.disconnect(handler)
+        self._update()
+
+    def _active_vpns(self) -> list[NM.ActiveConnection]:
+        return [active for active in self._watched if active.get_state() not in _ENDING_STATES]
+
+    def _update(self):
+        active = self._active_vpns()
+        name = min((a.get_id() for a in active), default="")
+        if name == self._name:
+            return
+        self._name = name
+        self.notify("name")
+        self.notify("is-connected")
+        self.emit("changed")
+
+    def get_all_wireguard_connections(self) -> list[NM.RemoteConnection]:
+        """All WireGuard connection profiles, sorted by name."""
+        if self._client is None:
             return []
+        connections = [
+            c for c in self._client.get_connections() if c.get_connection_type() == VPN_TYPE
+        ]
+        return sorted(connections, key=lambda c: c.get_id())
 
     def cycle_wireguard_vpn(self):
-        """Cycles to the next WireGuard VPN connection."""
-        active_vpn = self.get_only_active_wireguard()
-        all_vpns = self.get_all_wireguard_connections()
-
-        activate_next = False
-
-        for vpn in all_vpns:
-            if active_vpn is None:
-                # No active VPN, activate the first one
-                subprocess.run(["nmcli", "connection", "up", vpn], check=True)
-                print(f"Activated: {vpn}")
-                break
-            elif active_vpn == vpn:
-                # Found the active VPN, deactivate it
-                activate_next = True
-                subprocess.run(["nmcli", "connection", "down", vpn], check=True)
-                print(f"Deactivated: {vpn}")
-            elif activate_next:
-                # Activate the next VPN in the list
-                subprocess.run(["nmcli", "connection", "up", vpn], check=True)
-                print(f"Activated: {vpn}")
-                break
-
-    def disconnect(self):
-        try:
-            # Get active connections
-            result = subprocess.run(
-                ["nmcli", "-g", "name,type", "connection", "show", "--active"],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            # Extract active WireGuard VPN name
-            active_vpn = [
-                re.sub(r":wireguard$", "", line)
-                for line in result.stdout.splitlines()
-                if ":wireguard" in line
-            ]
-
-            if not active_vpn:
-                print("No active WireGuard VPN found.")
-                return
-
-            # Bring down the active WireGuard VPN connections
-            for vpn in active_vpn:
-                subprocess.run(["nmcli", "connection", "down", vpn], check=True)
-                print(f"Disconnected: {vpn}")
-
-        except subprocess.CalledProcessError as e:
-            print(f"Error running nmcli: {e}")
+        """Deactivate the active WireGuard connection and activate the next one by name."""
+        connections = self.get_all_wireguard_connections()
+        if not connections:
+            return
+        active = self._active_vpns()
+        if not active:
+            self._activate(connections[0])
+            return
+
+        current = min(active, key=lambda a: a.get_id())
+        self._deactivate(current)
+        ids = [c.get_id() for c in connections]
+        if current.get_id() in ids:
+            index = ids.index(current.get_id()) + 1
+            # The last connection just turns the VPN off, like before
+            if index < len(connections):
+                self._activate(connections[index])
+
+    def disconnect_vpn(self):
+        """Deactivate every active WireGuard connection."""
+        for active in self._active_vpns():
+            self._deactivate(active)
+
+    def _activate(self, connection: NM.RemoteConnection):
+        def on_done(client, result):
+            try:
+                client.activate_connection_finish(result)
+            except GLib.Error as e:
+                logger.error(f"{Colors.ERROR}[VPN] Failed to activate {connection.get_id()}: {e.message}")
+
+        self._client.activate_connection_async(connection, None, None, None, on_done)
+
+    def _deactivate(self, active: NM.ActiveConnection):
+        def on_done(client, result):
+            try:
+                client.deactivate_connection_finish(result)
+            except GLib.Error as e:
+                logger.error(f"{Colors.ERROR}[VPN] Failed to deactivate {active.get_id()}: {e.message}")
+
+        self._client.deactivate_connection_async(active, None, on_done)
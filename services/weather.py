@@ -0,0 +1,210 @@
+import json
+import os
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from fabric.core.service import Property, Service, Signal
+from gi.repository import GLib
+from loguru import logger
+
+from config.data import CACHE_DIR
+from utils.colors import Colors
+
+WEATHER_CACHE_FILE = f"{CACHE_DIR}/weather.json"
+LOCATION_URL = "https://ipinfo.io/json"
+WEATHER_URL = "https://wttr.in/{location}?format=%c+%t"
+
+# A reading is refreshed after WEATHER_TTL_S, the city the IP resolves to after LOCATION_TTL_S
+WEATHER_TTL_S = 600
+LOCATION_TTL_S = 6 * 3600
+REQUEST_TIMEOUT_S = 5
+# Retry delays after failed refreshes double from MIN_BACKOFF_S up to MAX_BACKOFF_S
+MIN_BACKOFF_S = 60
+MAX_BACKOFF_S = 3600
+
+
+class WeatherService(Service):
+    """
+    Current weather for the bar, resolved from the IP's city through wttr.in.
+
+    The location, the last reading and the backoff state are persisted with their
+    timestamps, so a restart shows the cached reading at once and only fetches what
+    expired. Failed refreshes are retried with exponential backoff while the last
+    reading is still served, with `offline` set. Requests run on a single worker thread.
+
+    The URLs and the cache file can be passed in to run against a local stand-in.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if WeatherService.instance is None:
+            WeatherService.instance = WeatherService()
+
+        return WeatherService.instance
+
+    @Signal
+    def changed(self) -> None:
+        """Emitted when the reading or the offline state changes."""
+
+    @Property(str, "readable")
+    def text(self) -> str:
+        """Last reading, e.g. "☀️+21°C", or an empty string if there never was one."""
+        return self._weather.get("text", "")
+
+    @Property(float, "readable")
+    def fetched_at(self) -> float:
+        return self._weather.get("fetched_at", 0.0)
+
+    @Property(bool, "readable", default_value=False)
+    def offline(self) -> bool:
+        """True while the last refresh failed and an older reading is served."""
+        return self._failures > 0
+
+    def __init__(
+        self,
+        cache_file: str = WEATHER_CACHE_FILE,
+        location_url: str = LOCATION_URL,
+        weather_url: str = WEATHER_URL,
+        start: bool = True,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.cache_file = cache_file
+        self.location_url = location_url
+        self.weather_url = weather_url
+        self._session = requests.Session()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="weather")
+        self._location: dict = {}
+        self._weather: dict = {}
+        self._failures = 0
+        self._attempted_at = 0.0
+        self._timer_id = 0
+        self._refreshing = False
+        self._load_cache()
+        if start:
+            self._schedule(self.next_refresh_delay())
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                cache = json.load(f)
+            self._location = cache.get("location") or {}
+            self._weather = cache.get("weather") or {}
+            self._failures = int(cache.get("failures", 0))
+            self._attempted_at = float(cache.get("attempted_at", 0.0))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"{Colors.WARNING}[Weather] Ignoring unreadable cache: {e}")
+
+    def _save_cache(self):
+        tmp_path = f"{self.cache_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "location": self._location,
+                        "weather": self._weather,
+                        "failures": self._failures,
+                        "attempted_at": self._attempted_at,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Weather] Failed to write cache: {e}")
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def next_refresh_delay(self) -> float:
+        """Seconds until the next refresh is due, 0 if it is due now."""
+        now = time.time()
+        if self._failures:
+            backoff = min(MIN_BACKOFF_S * 2 ** (self._failures - 1), MAX_BACKOFF_S)
+            return max(backoff - (now - self._attempted_at), 0)
+        age = now - self._weather.get("fetched_at", 0.0)
+        return max(WEATHER_TTL_S - age, 0)
+
+    def _schedule(self, delay: float):
+        if self._timer_id:
+            GLib.source_remove(self._timer_id)
+        self._timer_id = GLib.timeout_add_seconds(max(int(delay), 1), self._on_timer)
+
+    def _on_timer(self):
+        self._timer_id = 0
+        self.refresh()
+        return False
+
+    def refresh(self):
+        """Start a refresh on the worker thread; the result is applied on the main loop."""
+        if self._refreshing:
+            return
+        self._refreshing = True
+        future = self._executor.submit(self.fetch)
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_fetched, f))
+
+    def _on_fetched(self, future):
+        self._refreshing = False
+        if future.exception() is not None:
+            logger.error(f"{Colors.ERROR}[Weather] Refresh crashed: {future.exception()}")
+            self._failures += 1
+        self._schedule(self.next_refresh_delay())
+        self.notify("text")
+        self.notify("offline")
+        self.emit("changed")
+        return False
+
+    def fetch(self) -> bool:
+        """
+        Refresh what expired, blocking. Returns False if the reading couldn't be updated;
+        the previous reading is kept in that case. Safe to call without a main loop.
+        """
+        now = time.time()
+        self._attempted_at = now
+        if now - self._location.get("fetched_at", 0.0) >= LOCATION_TTL_S:
+            city = self._fetch_location()
+            if city is not None:
+                self._location = {"city": city, "fetched_at": now}
+
+        # An expired city is still better than wttr.in's own IP lookup
+        city = self._location.get("city", "")
+        url = self.weather_url.format(location=urllib.parse.quote(city))
+        try:
+            response = self._session.get(url, timeout=REQUEST_TIMEOUT_S)
+            response.raise_for_status()
+            text = response.text.strip()
+            if not text or "Unknown" in text:
+                raise ValueError(f"no reading for {city or 'this IP'}: {text!r}")
+        except (requests.RequestException, ValueError) as e:
+            self._failures += 1
+            logger.warning(
+                f"{Colors.WARNING}[Weather] Refresh failed ({e}), "
+                f"retrying in {self.next_refresh_delay():.0f}s"
+            )
+            self._save_cache()
+            return False
+
+        self._failures = 0
+        self._weather = {"text": text.replace(" ", ""), "location": city, "fetched_at": now}
+        self._save_cache()
+        return True
+
+    def _fetch_location(self) -> str | None:
+        try:
+            response = self._session.get(self.location_url, timeout=REQUEST_TIMEOUT_S)
+            response.raise_for_status()
+            return response.json().get("city", "")
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"{Colors.WARNING}[Weather] Failed to resolve location: {e}")
+            return None
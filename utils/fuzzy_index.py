@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Callable, Iterable
+
+# thefuzz is a thin wrapper around rapidfuzz; batch scoring goes through rapidfuzz directly
+from rapidfuzz import fuzz, process
+
+from config.data import FUZZY_THRESHOLD
+
+
+class FuzzyIndex:
+    """
+    Precomputed fuzzy search over a fixed list of items.
+
+    Haystacks are casefolded once when the index is built, and every query scores
+    each item at most once. Results are the same as filtering with thefuzz's
+    partial_ratio >= threshold, but:
+      - a query that is a substring of the haystack scores 100 without calling fuzz,
+        and typing forward only rechecks the previous substring matches,
+      - the remaining items are scored in one batch in C,
+      - results of recent queries are cached, so deleting characters is free.
+    """
+
+    def __init__(
+        self,
+        items: Iterable,
+        haystack: Callable[[object], str],
+        threshold: int = FUZZY_THRESHOLD,
+        cache_size: int = 32,
+    ):
+        self.items = list(items)
+        self._haystacks = [haystack(item).casefold() for item in self.items]
+        self._threshold = threshold
+        self._cache_size = cache_size
+        self._cache: OrderedDict[str, list[tuple[int, int]]] = OrderedDict()
+        self._last_query = ""
+        self._last_exact: list[int] = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, query: str) -> list[tuple[object, int]]:
+        """Return (item, score) for every item matching the query, in index order."""
+        query = query.casefold()
+        if not query:
+            return [(item, 0) for item in self.items]
+
+        matches = self._cache.get(query)
+        if matches is None:
+            matches = self._search(query)
+            self._cache[query] = matches
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(query)
+
+        return [(self.items[i], score) for i, score in matches]
+
+    def _search(self, query: str) -> list[tuple[int, int]]:
+        # Substring matches can only shrink while the query grows, so typing
+        # forward only rechecks what matched the previous query exactly.
+        if self._last_query and query.startswith(self._last_query):
+            exact_candidates = self._last_exact
+        else:
+            exact_candidates = range(len(self.items))
+        exact = [i for i in exact_candidates if query in self._haystacks[i]]
+        self._last_query = query
+        self._last_exact = exact
+
+        scores = dict.fromkeys(exact, 100)
+        remaining = {i: hay for i, hay in enumerate(self._haystacks) if i not in scores}
+        # thefuzz rounds scores to ints, so nothing below threshold - 0.5 can pass
+        for _, score, i in process.extract(
+            query,
+            remaining,
+            scorer=fuzz.partial_ratio,
+            score_cutoff=self._threshold - 0.5,
+            limit=None,
+        ):
+            score = int(round(score))
+            if score >= self._threshold:
+                scores[i] = score
+
+        return sorted(scores.items())
@@ -1,3 +1,4 @@
+import atexit
 import json
 import os
 import re
@@ -9,34 +10,316 @@ from gi.repository import GLib, Gtk
 from loguru import logger
 
 import config.data as data
+from utils.colors import Colors
+
+ICON_INDEX_FILE = data.CACHE_DIR + "/icon_index.json"
+# Replaced by ICON_INDEX_FILE, removed when the index is first built
+LEGACY_ICON_CACHE_FILE = data.CACHE_DIR + "/icons.json"
+ICON_INDEX_VERSION = 2
+# Newly resolved icons are written together, this long after the first of them
+SAVE_DELAY_S = 5
+# Programs that run something else; their name says nothing about the app
+GENERIC_LAUNCHERS = {
+    "sh", "bash", "dash", "zsh", "fish", "flatpak", "snap", "python", "python3",
+    "perl", "ruby", "node", "java", "mono", "wine", "sudo", "pkexec", "xdg-open",
+    "gtk-launch", "gio", "steam",
+}
+# env options followed by a separate argument
+ENV_OPTIONS_WITH_ARGUMENT = {"-u", "--unset", "-C", "--chdir", "-S", "--split-string"}
 
-ICON_CACHE_FILE = data.CACHE_DIR + "/icons.json"
 if not os.path.exists(data.CACHE_DIR):
     os.makedirs(data.CACHE_DIR)
 
 
-class IconResolver:
-    def __init__(self, default_applicaiton_icon: str = "application-x-executable-symbolic"):
-        if os.path.exists(ICON_CACHE_FILE):
-            with open(ICON_CACHE_FILE) as f:
+def normalize(name: str) -> str:
+    return "".join(name.lower().split())
+
+
+def _data_dirs() -> list[str]:
+    # User data first, so its desktop entries override the system ones
+    return [GLib.get_user_data_dir(), *GLib.get_system_data_dirs()]
+
+
+def _application_dirs() -> list[str]:
+    return [os.path.join(d, "applications") for d in _data_dirs()]
+
+
+def _directory_stamp() -> dict[str, int]:
+    """
+    Modification times of the applications directories and all their subdirectories,
+    which is where desktop entries are added or removed; missing directories are 0.
+    """
+    stamp = {}
+    for app_dir in _application_dirs():
+        try:
+            stamp[app_dir] = os.stat(app_dir).st_mtime_ns
+        except OSError:
+            stamp[app_dir] = 0
+            continue
+        for root, dirs, _ in os.walk(app_dir):
+            for name in dirs:
+                path = os.path.join(root, name)
                 try:
-                    self._icon_dict = json.load(f)
-                except json.JSONDecodeError:
-                    logger.info("[ICONS] Cache file does not exist or is corrupted")
-                    self._icon_dict = {}
-        else:
-            self._icon_dict = {}
+                    stamp[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+    return stamp
+
+
+def _read_desktop_entry(path: str) -> dict[str, str]:
+    """The keys of the [Desktop Entry] group of a desktop file."""
+    entry = {}
+    in_group = False
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    if in_group:
+                        break
+                    in_group = line == "[Desktop Entry]"
+                elif in_group and "=" in line:
+                    key, value = line.split("=", 1)
+                    entry.setdefault(key.strip(), value.strip())
+    except OSError:
+        pass
+    return entry
+
+
+def _executable(exec_line: str) -> str | None:
+    """
+    Base name of the program an Exec line runs, skipping env with its options and
+    assignments. None if the line runs a generic launcher such as a shell or flatpak.
+    """
+    after_env = False
+    skip_argument = False
+    for token in exec_line.split():
+        token = token.strip("\"'")
+        name = os.path.basename(token)
+        if skip_argument:
+            skip_argument = False
+            continue
+        if name == "env":
+            after_env = True
+            continue
+        if after_env and token.startswith("-"):
+            skip_argument = token in ENV_OPTIONS_WITH_ARGUMENT
+            continue
+        if "=" in token:
+            continue
+        if not name or name in GENERIC_LAUNCHERS:
+            return None
+        return name
+    return None
 
+
+class IconIndex:
+    """
+    Icon names for app ids, shared by every IconResolver.
+
+    Desktop entries are scanned once into a dictionary keyed on normalized desktop ids,
+    StartupWMClass values and executables, so resolving an unknown app id is a few dict
+    lookups instead of a directory listing per data dir. The index and every resolved
+    app id are kept in a compact JSON file, which is rebuilt when any applications
+    directory has changed since. New resolutions are written in batches, SAVE_DELAY_S
+    after the first unsaved one.
+
+    Icon themes aren't indexed: whether a name exists in the theme is asked of
+    Gtk.IconTheme, which follows theme changes itself. App ids that fell back to the
+    default icon are only remembered for the session, so an icon installed later is
+    found on the next start.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if IconIndex.instance is None:
+            IconIndex.instance = IconIndex()
+
+        return IconIndex.instance
+
+    def __init__(self, index_file: str = ICON_INDEX_FILE):
+        self.index_file = index_file
+        # Normalized key -> icon name
+        self.entries: dict[str, str] = {}
+        # Normalized desktop ids, for substring matching of unknown app ids
+        self.desktop_ids: list[str] = []
+        # App id -> resolved icon name
+        self.resolved: dict[str, str] = {}
+        # App ids without an icon, not saved
+        self.unresolved: set[str] = set()
+        self._save_id = 0
+        self._dirty = False
+
+        stamp = _directory_stamp()
+        if not self._load(stamp):
+            self._scan(stamp)
+            self._dirty = True
+            self.save()
+        atexit.register(self.save)
+
+    # ------------------------------------------------------------------
+    # Index file
+    # ------------------------------------------------------------------
+
+    def _load(self, stamp: dict[str, int]) -> bool:
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+            if index.get("version") != ICON_INDEX_VERSION or index.get("stamp") != stamp:
+                return False
+            self.entries = index["entries"]
+            self.desktop_ids = index["desktop_ids"]
+            self.resolved = index["resolved"]
+            self._stamp = stamp
+            return True
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.info(f"[ICONS] Rebuilding unreadable icon index: {e}")
+            return False
+
+    def save(self):
+        """Write the index if anything changed since the last write."""
+        if self._save_id:
+            GLib.source_remove(self._save_id)
+            self._save_id = 0
+        if not self._dirty:
+            return False
+        self._dirty = False
+        tmp_path = f"{self.index_file}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": ICON_INDEX_VERSION,
+                        "stamp": self._stamp,
+                        "entries": self.entries,
+                        "desktop_ids": self.desktop_ids,
+                        "resolved": self.resolved,
+                    },
+                    f,
+                    separators=(",", ":"),
+                )
+            os.replace(tmp_path, self.index_file)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[ICONS] Failed to write icon index: {e}")
+        return False
+
+    def _schedule_save(self):
+        self._dirty = True
+        if not self._save_id:
+            self._save_id = GLib.timeout_add_seconds(SAVE_DELAY_S, self.save)
+
+    # ------------------------------------------------------------------
+    # Scanning
+    # ------------------------------------------------------------------
+
+    def _scan(self, stamp: dict[str, int]):
+        self._stamp = stamp
+        ids: dict[str, str] = {}
+        wm_classes: dict[str, str] = {}
+        executables: dict[str, str] = {}
+        short_ids: dict[str, str] = {}
+        count = 0
+        for app_dir in _application_dirs():
+            if not stamp.get(app_dir):
+                continue
+            for root, _, files in os.walk(app_dir):
+                for name in files:
+                    if not name.endswith(".desktop"):
+                        continue
+                    path = os.path.join(root, name)
+                    # Desktop ids of entries in subdirectories are joined with dashes
+                    desktop_id = normalize(os.path.relpath(path, app_dir)[:-len(".desktop")].replace(os.sep, "-"))
+                    if desktop_id in ids:
+                        continue
+                    entry = _read_desktop_entry(path)
+                    icon = "".join(entry.get("Icon", "").split())
+                    if not icon:
+                        continue
+                    count += 1
+                    ids[desktop_id] = icon
+                    if entry.get("StartupWMClass"):
+                        wm_classes.setdefault(normalize(entry["StartupWMClass"]), icon)
+                    executable = _executable(entry.get("Exec", ""))
+                    if executable:
+                        executables.setdefault(normalize(executable), icon)
+                    # org.gnome.Nautilus is often reported as just nautilus
+                    short_ids.setdefault(desktop_id.rsplit(".", 1)[-1], icon)
+
+        # Keys found in several maps resolve through the most specific one: ids, then
+        # window classes, executables and finally the last part of reverse-DNS ids
+        self.entries = {**short_ids, **executables, **wm_classes, **ids}
+        self.desktop_ids = list(ids)
+        self.resolved = {}
+        logger.info(f"[ICONS] Indexed {count} desktop entries")
+
+        if os.path.exists(LEGACY_ICON_CACHE_FILE):
+            try:
+                os.remove(LEGACY_ICON_CACHE_FILE)
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def lookup(self, app_id: str) -> str | None:
+        """Icon of the desktop entry matching app_id, or None if there is none."""
+        key = normalize(app_id)
+        if not key:
+            return None
+        icon = self.entries.get(key)
+        if icon is not None:
+            return icon
+        if key.endswith(".desktop"):
+            icon = self.entries.get(key[:-len(".desktop")])
+            if icon is not None:
+                return icon
+
+        # Looser matches, as before: the whole id, then any of its words, within a desktop id
+        for needle in [key, *filter(None, re.split(r"-|\.|_|\s", app_id.lower()))]:
+            for desktop_id in self.desktop_ids:
+                if needle in desktop_id:
+                    return self.entries[desktop_id]
+        return None
+
+    def get_resolved(self, app_id: str) -> str | None:
+        return self.resolved.get(app_id)
+
+    def store_resolved(self, app_id: str, icon: str):
+        self.resolved[app_id] = icon
+        self._schedule_save()
+
+    def is_unresolved(self, app_id: str) -> bool:
+        return app_id in self.unresolved
+
+    def store_unresolved(self, app_id: str):
+        self.unresolved.add(app_id)
+
+
+class IconResolver:
+    def __init__(self, default_applicaiton_icon: str = "application-x-executable-symbolic"):
+        self._index = IconIndex.get_initial()
         self.default_applicaiton_icon = default_applicaiton_icon
 
     def get_icon_name(self, app_id: str):
-        if app_id in self._icon_dict:
-            return self._icon_dict[app_id]
+        icon = self._index.get_resolved(app_id)
+        if icon is not None:
+            return icon
+        if self._index.is_unresolved(app_id):
+            return self.default_applicaiton_icon
         new_icon = self._compositor_find_icon(app_id)
+        if new_icon is None:
+            logger.info(f"[ICONS] no icon for app id: '{app_id}', using the default")
+            self._index.store_unresolved(app_id)
+            return self.default_applicaiton_icon
         logger.info(
             f"[ICONS] found new icon: '{new_icon}' for app id: '{app_id}', storing..."
         )
-        self._store_new_icon(app_id, new_icon)
+        self._index.store_resolved(app_id, new_icon)
         return new_icon
 
     def get_icon_pixbuf(self, app_id: str, size: int = 16):
@@ -60,43 +343,10 @@ class IconResolver:
                 )
                 return None
 
-    def _store_new_icon(self, app_id: str, icon: str):
-        self._icon_dict[app_id] = icon
-        with open(ICON_CACHE_FILE, "w") as f:
-            json.dump(self._icon_dict, f)
-
-    def _get_icon_from_desktop_file(self, desktop_file_path: str):
-        # Retrieve the icon specified in the [Desktop Entry] section.
-        with open(desktop_file_path) as f:
-            for line in f.readlines():
-                if "Icon=" in line:
-                    return "".join(line[5:].split())
-            return self.default_applicaiton_icon
-
-    def _get_desktop_file(self, app_id: str) -> str | None:
-        data_dirs = GLib.get_system_data_dirs()
-        for data_dir in data_dirs:
-            data_dir = os.path.join(data_dir, "applications")
-            if os.path.exists(data_dir):
-                files = os.listdir(data_dir)
-                matching = [s for s in files if "".join(app_id.lower().split()) in s.lower()]
-                if matching:
-                    return os.path.join(data_dir, matching[0])
-                for word in list(filter(None, re.split(r"-|\.|_|\s", app_id))):
-                    matching = [s for s in files if word.lower() in s.lower()]
-                    if matching:
-                        return os.path.join(data_dir, matching[0])
-        return None
-
     def _compositor_find_icon(self, app_id: str):
         icon_theme = Gtk.IconTheme.get_default()
         if icon_theme.has_icon(app_id):
             return app_id
         if icon_theme.has_icon(app_id + "-desktop"):
             return app_id + "-desktop"
-        desktop_file = self._get_desktop_file(app_id)
-        return (
-            self._get_icon_from_desktop_file(desktop_file)
-            if desktop_file
-            else self.default_applicaiton_icon
-        )
+        return self._index.lookup(app_id)
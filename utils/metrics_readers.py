@@ -0,0 +1,445 @@
+"""
+Backends that read CPU, memory, disk, battery, sensor and network metrics for the
+metrics sampler.
+
+ProcReader reads /proc and /sys directly: the files stay open and are re-read with
+pread() into buffers allocated once, and only the fields that are needed are parsed.
+PsutilReader gives the same values through psutil and is used where /proc is not
+available. Compare both with:
+
+    python -m utils.metrics_readers
+"""
+
+import glob
+import math
+import os
+import time
+
+import psutil
+
+POWER_SUPPLY_DIR = "/sys/class/power_supply"
+HWMON_DIR = "/sys/class/hwmon"
+CPUFREQ_DIR = "/sys/devices/system/cpu/cpufreq"
+NET_DIR = "/sys/class/net"
+
+# Time constant of the network rate smoothing, in seconds
+NET_SMOOTHING_S = 3.0
+
+# hwmon drivers reporting the CPU package, with the label of the package sensor
+CPU_HWMON_SENSORS = {
+    "coretemp": ("Package id 0",),
+    "k10temp": ("Tctl", "Tdie"),
+    "zenpower": ("Tctl", "Tdie"),
+    "cpu_thermal": (),
+}
+
+
+class _PinnedFile:
+    """A file kept open and re-read from offset 0 into a reused buffer."""
+
+    def __init__(self, path: str, buffer_size: int = 4096):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self._buffer = bytearray(buffer_size)
+
+    def read(self) -> tuple[bytearray, int]:
+        """
+        Return the buffer and the length of the current contents. The buffer is reused
+        by the next read, and bytes past the length are left over from earlier reads.
+        """
+        n = os.preadv(self._fd, [self._buffer], 0)
+        while n == len(self._buffer):
+            # Grows at most a few times, the first time the file outgrows the buffer
+            self._buffer = bytearray(len(self._buffer) * 2)
+            n = os.preadv(self._fd, [self._buffer], 0)
+        return self._buffer, n
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _field(buffer: bytearray, length: int, key: bytes) -> int | None:
+    """Integer value of `key` in a "key value" or "KEY=value" listing, or None."""
+    start = buffer.find(key, 0, length)
+    if start == -1:
+        return None
+    start += len(key)
+    end = buffer.find(b"\n", start, length)
+    if end == -1:
+        end = length
+    # int() skips surrounding whitespace; meminfo values carry a " kB" suffix
+    if buffer[end - 3:end] == b" kB":
+        end -= 3
+    return int(buffer[start:end])
+
+
+def _read_text(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _find_cpu_temperature() -> str | None:
+    """Path of the temp*_input file of the CPU package sensor, if there is one."""
+    for hwmon in sorted(glob.glob(f"{HWMON_DIR}/hwmon*")):
+        labels = CPU_HWMON_SENSORS.get(_read_text(f"{hwmon}/name"))
+        if labels is None:
+            continue
+        inputs = sorted(glob.glob(f"{hwmon}/temp*_input"))
+        for label in labels:
+            for path in inputs:
+                if _read_text(path.replace("_input", "_label")) == label:
+                    return path
+        if inputs:
+            return inputs[0]
+    return None
+
+
+def _cpu_percent(busy: int, total: int, last_busy: int, last_total: int) -> float:
+    delta_total = total - last_total
+    if delta_total <= 0:
+        return 0.0
+    return round(min(max((busy - last_busy) / delta_total * 100, 0.0), 100.0), 1)
+
+
+def _is_physical_interface(name: str) -> bool:
+    # Loopback, bridges, veths, tunnels and the like live under /sys/devices/virtual
+    return os.path.exists(f"{NET_DIR}/{name}/device")
+
+
+class InterfaceRates:
+    """
+    Turns cumulative per-interface byte counters into smoothed rates.
+
+    Rates are exponentially weighted moving averages with a time constant of
+    NET_SMOOTHING_S, weighted by the actual time between samples. The primary rate is
+    the one of primary_interface when it is set and present, otherwise the sum of the
+    physical interfaces, so docker bridges and loopback are never counted twice.
+    """
+
+    def __init__(self):
+        self.primary_interface: str | None = None
+        # name -> [rx bytes, tx bytes, download rate, upload rate, physical]
+        self._state: dict[str, list] = {}
+        self._last_time = time.monotonic()
+
+    def update(
+        self, counters: dict[str, tuple[int, int, bool]]
+    ) -> tuple[tuple[float, float], tuple[tuple[str, float, float], ...]]:
+        """
+        Take {name: (rx bytes, tx bytes, physical)} and return the primary
+        (download, upload) rate and (name, download, upload) for every interface.
+        """
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-3)
+        self._last_time = now
+        weight = 1 - math.exp(-elapsed / NET_SMOOTHING_S)
+
+        for name in self._state.keys() - counters.keys():
+            del self._state[name]
+        for name, (rx, tx, physical) in counters.items():
+            state = self._state.get(name)
+            if state is None:
+                # Rates start at zero for interfaces seen for the first time
+                self._state[name] = [rx, tx, 0.0, 0.0, physical]
+                continue
+            # Counters restart from zero when a driver is reloaded
+            down = max(rx - state[0], 0) / elapsed
+            up = max(tx - state[1], 0) / elapsed
+            state[0] = rx
+            state[1] = tx
+            state[2] += weight * (down - state[2])
+            state[3] += weight * (up - state[3])
+
+        primary = self._state.get(self.primary_interface)
+        if primary is not None:
+            rates = (primary[2], primary[3])
+        else:
+            rates = (
+                sum(state[2] for state in self._state.values() if state[4]),
+                sum(state[3] for state in self._state.values() if state[4]),
+            )
+        interfaces = tuple(
+            (name, state[2], state[3]) for name, state in sorted(self._state.items()) if name != "lo"
+        )
+        return (rates, interfaces)
+
+
+def _disk_percent(path: str = "/") -> float:
+    # Same formula as psutil.disk_usage(): space reserved for root is not counted
+    st = os.statvfs(path)
+    used = st.f_blocks - st.f_bfree
+    usable = used + st.f_bavail
+    return round(used / usable * 100, 1) if usable else 0.0
+
+
+class ProcReader:
+    """Reads the metrics from /proc and /sys. Raises OSError where they don't exist."""
+
+    def __init__(self):
+        self._stat = _PinnedFile("/proc/stat", 4096)
+        self._meminfo = _PinnedFile("/proc/meminfo", 4096)
+        # Busy and total jiffies of the previous read: the aggregate first, then each core
+        self._last_busy: list[int] = []
+        self._last_total: list[int] = []
+        self._battery: _PinnedFile | None = None
+        self._mains: list[_PinnedFile] = []
+        self._open_power_supplies()
+        self._temperature: _PinnedFile | None = None
+        self._frequencies: list[_PinnedFile] = []
+        self._max_frequency = 0
+        self._open_sensors()
+        # name -> (rx_bytes, tx_bytes, physical)
+        self._interfaces: dict[str, tuple[_PinnedFile, _PinnedFile, bool]] = {}
+        self.rates = InterfaceRates()
+        self.cpu()
+        self.net()
+
+    def _open_power_supplies(self):
+        for path in sorted(glob.glob(f"{POWER_SUPPLY_DIR}/*/type")):
+            try:
+                with open(path) as f:
+                    kind = f.read().strip()
+                uevent = os.path.join(os.path.dirname(path), "uevent")
+                if kind == "Battery" and self._battery is None:
+                    self._battery = _PinnedFile(uevent, 1024)
+                elif kind == "Mains":
+                    self._mains.append(_PinnedFile(uevent, 1024))
+            except OSError:
+                continue
+
+    def _open_sensors(self):
+        path = _find_cpu_temperature()
+        if path is not None:
+            try:
+                self._temperature = _PinnedFile(path, 32)
+            except OSError:
+                pass
+        for policy in sorted(glob.glob(f"{CPUFREQ_DIR}/policy*")):
+            try:
+                self._frequencies.append(_PinnedFile(f"{policy}/scaling_cur_freq", 32))
+            except OSError:
+                continue
+            maximum = _read_text(f"{policy}/cpuinfo_max_freq")
+            if maximum and maximum.isdigit():
+                self._max_frequency = max(self._max_frequency, int(maximum))
+
+    def cpu(self) -> tuple[float, tuple[float, ...]]:
+        """Total and per-core usage percent, from a single read of /proc/stat."""
+        buffer, length = self._stat.read()
+        cores = []
+        total_percent = 0.0
+        # "cpu" sums all cores, followed by one "cpuN" line per core:
+        # cpuN user nice system idle iowait irq softirq steal guest guest_nice
+        start = 0
+        index = 0
+        while buffer.startswith(b"cpu", start):
+            end = buffer.find(b"\n", start, length)
+            user, nice, system, idle, iowait, irq, softirq, steal = map(
+                int, buffer[start:end].split()[1:9]
+            )
+            total = user + nice + system + idle + iowait + irq + softirq + steal
+            busy = total - idle - iowait
+            if index < len(self._last_total):
+                percent = _cpu_percent(busy, total, self._last_busy[index], self._last_total[index])
+                self._last_busy[index] = busy
+                self._last_total[index] = total
+            else:
+                # First read, or a core came online
+                percent = 0.0
+                self._last_busy.append(busy)
+                self._last_total.append(total)
+            if index == 0:
+                total_percent = percent
+            else:
+                cores.append(percent)
+            start = end + 1
+            index += 1
+        return (total_percent, tuple(cores))
+
+    def sensors(self) -> tuple[float | None, tuple[int, int] | None]:
+        """CPU package temperature in °C and (average, maximum) core frequency in MHz."""
+        temperature = None
+        if self._temperature is not None:
+            try:
+                buffer, length = self._temperature.read()
+                temperature = int(buffer[:length]) / 1000
+            except (OSError, ValueError):
+                pass
+
+        frequency = None
+        current = 0
+        count = 0
+        for policy in self._frequencies:
+            try:
+                buffer, length = policy.read()
+                current += int(buffer[:length])
+                count += 1
+            except (OSError, ValueError):
+                # Policies of offline cores can't be read
+                continue
+        if count:
+            # cpufreq reports kHz
+            frequency = (current // count // 1000, self._max_frequency // 1000)
+        return (temperature, frequency)
+
+    def net(self) -> tuple[tuple[float, float], tuple[tuple[str, float, float], ...]]:
+        """Smoothed rates of the primary interface and of each interface, see InterfaceRates."""
+        try:
+            names = os.listdir(NET_DIR)
+        except OSError:
+            names = []
+        for name in names:
+            if name in self._interfaces:
+                continue
+            statistics = f"{NET_DIR}/{name}/statistics"
+            try:
+                rx = _PinnedFile(f"{statistics}/rx_bytes", 32)
+                tx = _PinnedFile(f"{statistics}/tx_bytes", 32)
+            except OSError:
+                continue
+            self._interfaces[name] = (rx, tx, _is_physical_interface(name))
+
+        counters = {}
+        for name, (rx, tx, physical) in list(self._interfaces.items()):
+            try:
+                buffer, length = rx.read()
+                rx_bytes = int(buffer[:length])
+                buffer, length = tx.read()
+                tx_bytes = int(buffer[:length])
+            except (OSError, ValueError):
+                # The interface went away
+                rx.close()
+                tx.close()
+                del self._interfaces[name]
+                continue
+            counters[name] = (rx_bytes, tx_bytes, physical)
+        return self.rates.update(counters)
+
+    def mem(self) -> float:
+        buffer, length = self._meminfo.read()
+        total = _field(buffer, length, b"MemTotal:")
+        available = _field(buffer, length, b"MemAvailable:")
+        if not total or available is None:
+            return 0.0
+        return round((total - available) / total * 100, 1)
+
+    def disk(self) -> float:
+        return _disk_percent("/")
+
+    def battery(self) -> tuple[float, bool | None]:
+        if self._battery is None:
+            return (0.0, None)
+        try:
+            buffer, length = self._battery.read()
+        except OSError:
+            # The battery was removed
+            self._battery.close()
+            self._battery = None
+            return (0.0, None)
+
+        now = _field(buffer, length, b"POWER_SUPPLY_ENERGY_NOW=")
+        full = _field(buffer, length, b"POWER_SUPPLY_ENERGY_FULL=")
+        if now is None or not full:
+            now = _field(buffer, length, b"POWER_SUPPLY_CHARGE_NOW=")
+            full = _field(buffer, length, b"POWER_SUPPLY_CHARGE_FULL=")
+        if now is not None and full:
+            percent = min(now / full * 100, 100.0)
+        else:
+            percent = float(_field(buffer, length, b"POWER_SUPPLY_CAPACITY=") or 0)
+
+        for mains in self._mains:
+            try:
+                online = _field(*mains.read(), b"POWER_SUPPLY_ONLINE=")
+            except OSError:
+                continue
+            if online is not None:
+                return (percent, online == 1)
+
+        # Same fallback as psutil when no AC adapter is exposed
+        if buffer.find(b"POWER_SUPPLY_STATUS=Discharging", 0, length) != -1:
+            return (percent, False)
+        if (
+            buffer.find(b"POWER_SUPPLY_STATUS=Charging", 0, length) != -1
+            or buffer.find(b"POWER_SUPPLY_STATUS=Full", 0, length) != -1
+        ):
+            return (percent, True)
+        return (percent, None)
+
+
+class PsutilReader:
+    """Reads the metrics through psutil."""
+
+    def __init__(self):
+        # The first non-blocking cpu_percent() call has no reference and returns 0.0
+        psutil.cpu_percent(interval=0, percpu=True)
+        self.rates = InterfaceRates()
+        self._physical: dict[str, bool] = {}
+        self.net()
+
+    def cpu(self) -> tuple[float, tuple[float, ...]]:
+        cores = tuple(psutil.cpu_percent(interval=0, percpu=True))
+        return (round(sum(cores) / len(cores), 1) if cores else 0.0, cores)
+
+    def sensors(self) -> tuple[float | None, tuple[int, int] | None]:
+        temperature = None
+        readings = getattr(psutil, "sensors_temperatures", dict)()
+        for driver, labels in CPU_HWMON_SENSORS.items():
+            entries = readings.get(driver)
+            if not entries:
+                continue
+            package = next((e for e in entries if e.label in labels), entries[0])
+            temperature = package.current
+            break
+
+        frequency = None
+        freq = psutil.cpu_freq()
+        if freq is not None:
+            frequency = (int(freq.current), int(freq.max))
+        return (temperature, frequency)
+
+    def net(self) -> tuple[tuple[float, float], tuple[tuple[str, float, float], ...]]:
+        counters = {}
+        for name, io in psutil.net_io_counters(pernic=True).items():
+            physical = self._physical.get(name)
+            if physical is None:
+                physical = self._physical[name] = _is_physical_interface(name)
+            counters[name] = (io.bytes_recv, io.bytes_sent, physical)
+        return self.rates.update(counters)
+
+    def mem(self) -> float:
+        return psutil.virtual_memory().percent
+
+    def disk(self) -> float:
+        return psutil.disk_usage("/").percent
+
+    def battery(self) -> tuple[float, bool | None]:
+        battery = psutil.sensors_battery()
+        if battery is None:
+            return (0.0, None)
+        return (battery.percent, battery.power_plugged)
+
+
+def create_reader() -> ProcReader | PsutilReader:
+    try:
+        return ProcReader()
+    except (OSError, ValueError):
+        return PsutilReader()
+
+
+def _benchmark(samples: int = 2000):
+    for reader in (ProcReader(), PsutilReader()):
+        print(f"{type(reader).__name__}")
+        for name in ("cpu", "mem", "disk", "battery", "sensors", "net"):
+            read = getattr(reader, name)
+            start = time.perf_counter()
+            for _ in range(samples):
+                read()
+            elapsed_us = (time.perf_counter() - start) / samples * 1e6
+            print(f"  {name:<8} {elapsed_us:8.1f} us/sample  {read()}")
+
+
+if __name__ == "__main__":
+    _benchmark()
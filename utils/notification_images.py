@@ -0,0 +1,162 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from gi.repository import GdkPixbuf, GLib
+from loguru import logger
+
+from config.data import CACHE_DIR
+from utils.colors import Colors
+
+IMAGE_DIR = f"{CACHE_DIR}/notifications"
+THUMBNAIL_SIZE = 48
+# Decoded pixbufs kept in memory, thumbnails and app icons together
+CACHE_ENTRIES = 128
+ENCODE_WORKERS = 2
+
+
+class NotificationImages:
+    """
+    Thumbnails of notification images and app icons, shared by popups and the history.
+
+    A notification image is scaled once when the notification arrives and kept in an
+    LRU keyed by notification UUID and size. Its PNG copy for the persistent history is
+    encoded on a worker pool, so the GTK thread never waits on disk. History entries
+    restored at startup decode their PNG once, at the size they are drawn. App icons are
+    cached per path and size, including paths that failed to load.
+
+    All methods must be called from the main thread.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if NotificationImages.instance is None:
+            NotificationImages.instance = NotificationImages()
+
+        return NotificationImages.instance
+
+    def __init__(self, cache_dir: str = IMAGE_DIR, capacity: int = CACHE_ENTRIES):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self._pixbufs: OrderedDict[tuple, GdkPixbuf.Pixbuf | None] = OrderedDict()
+        # Notification UUID -> PNG encoding that hasn't finished yet
+        self._pending: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=ENCODE_WORKERS, thread_name_prefix="notif-images")
+
+    def path_for(self, uuid: str) -> str:
+        return os.path.join(self.cache_dir, f"notification_{uuid}.png")
+
+    def _get(self, key: tuple):
+        pixbuf = self._pixbufs.get(key)
+        if key in self._pixbufs:
+            self._pixbufs.move_to_end(key)
+        return pixbuf
+
+    def _put(self, key: tuple, pixbuf: GdkPixbuf.Pixbuf | None):
+        self._pixbufs[key] = pixbuf
+        self._pixbufs.move_to_end(key)
+        while len(self._pixbufs) > self.capacity:
+            self._pixbufs.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Notification images
+    # ------------------------------------------------------------------
+
+    def store(self, uuid: str, source: GdkPixbuf.Pixbuf) -> str | None:
+        """
+        Keep a thumbnail of source in memory and queue its PNG for the history.
+        Returns the path the PNG is written to, or None if the image couldn't be scaled.
+        """
+        scaled = source.scale_simple(THUMBNAIL_SIZE, THUMBNAIL_SIZE, GdkPixbuf.InterpType.BILINEAR)
+        if scaled is None:
+            return None
+        self._put(("image", uuid, THUMBNAIL_SIZE, THUMBNAIL_SIZE), scaled)
+
+        path = self.path_for(uuid)
+        future = self._executor.submit(self._encode, scaled, path)
+        self._pending[uuid] = future
+        future.add_done_callback(lambda f: GLib.idle_add(self._on_encoded, uuid, f))
+        return path
+
+    def _encode(self, pixbuf: GdkPixbuf.Pixbuf, path: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written aside and renamed, so a crash never leaves a truncated PNG behind
+        tmp_path = f"{path}.tmp"
+        pixbuf.savev(tmp_path, "png", [], [])
+        os.replace(tmp_path, path)
+
+    def _on_encoded(self, uuid: str, future: Future):
+        if self._pending.get(uuid) is future:
+            del self._pending[uuid]
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"{Colors.ERROR}[Notifications] Failed to cache image of {uuid}: {future.exception()}")
+        return False
+
+    def thumbnail(self, uuid: str, path: str | None, width: int, height: int) -> GdkPixbuf.Pixbuf | None:
+        """The image of a notification at the given size, from memory or its cached PNG."""
+        key = ("image", uuid, width, height)
+        pixbuf = self._get(key)
+        if pixbuf is not None:
+            return pixbuf
+
+        base = self._get(("image", uuid, THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        if base is not None:
+            pixbuf = base.scale_simple(width, height, GdkPixbuf.InterpType.BILINEAR)
+        elif path and os.path.exists(path):
+            try:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(path, width, height, False)
+            except GLib.Error as e:
+                logger.error(f"{Colors.ERROR}[Notifications] Failed to load cached image {path}: {e.message}")
+        if pixbuf is not None:
+            self._put(key, pixbuf)
+        return pixbuf
+
+    def forget(self, uuid: str, path: str | None = None):
+        """Drop the thumbnails of a notification and delete its PNG, once it is written."""
+        for key in [key for key in self._pixbufs if key[0] == "image" and key[1] == uuid]:
+            del self._pixbufs[key]
+
+        path = path or self.path_for(uuid)
+        future = self._pending.pop(uuid, None)
+        if future is not None and not future.cancel():
+            future.add_done_callback(lambda _: self._remove(path))
+        else:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+            logger.info(f"Deleted cached image: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Notifications] Failed to delete cached image {path}: {e}")
+
+    # ------------------------------------------------------------------
+    # App icons
+    # ------------------------------------------------------------------
+
+    def app_icon(self, icon_path: str | None, width: int, height: int) -> GdkPixbuf.Pixbuf | None:
+        """An app icon file scaled to the given size, loaded once per path and size."""
+        if not icon_path:
+            return None
+        if icon_path.startswith("file://"):
+            icon_path = icon_path[7:]
+        key = ("icon", icon_path, width, height)
+        if key in self._pixbufs:
+            return self._get(key)
+
+        pixbuf = None
+        if not os.path.exists(icon_path):
+            logger.warning(f"Icon path does not exist: {icon_path}")
+        else:
+            try:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_scale(icon_path, width, height, False)
+            except GLib.Error as e:
+                logger.error(f"Failed to load or scale icon: {e.message}")
+        # Failures are cached too, so a missing icon isn't looked up for every notification
+        self._put(key, pixbuf)
+        return pixbuf
@@ -0,0 +1,173 @@
+import json
+import os
+
+from loguru import logger
+
+from config.data import APP_NAME, CACHE_DIR
+from utils.colors import Colors
+from utils.storage import Database
+
+NOTIFICATION_DB = f"{CACHE_DIR}/notifications.db"
+# History used to be rewritten to this file in full on every change; imported once
+LEGACY_HISTORY_FILE = f"/tmp/{APP_NAME}/notifications/notification_history.json"
+
+# Entries kept once the history is compacted
+HISTORY_LIMIT = 50
+# Appends between two compactions
+COMPACT_EVERY = 25
+# Free pages left behind by deletes before the file is vacuumed
+VACUUM_FREE_PAGES = 64
+
+NOTIFICATION_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS notifications (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        id TEXT NOT NULL UNIQUE,
+        app_name TEXT,
+        app_icon TEXT,
+        summary TEXT,
+        body TEXT,
+        timestamp TEXT,
+        cached_image_path TEXT,
+        count INTEGER DEFAULT 1
+    )''',
+    "CREATE INDEX IF NOT EXISTS notifications_app_idx ON notifications (app_name)",
+)
+
+FIELDS = ("id", "app_name", "app_icon", "summary", "body", "timestamp", "cached_image_path", "count")
+_COLUMNS = ", ".join(("seq",) + FIELDS)
+
+
+class NotificationStore:
+    """
+    Notification history kept in SQLite under the cache dir.
+
+    A new notification is one INSERT and a deletion one indexed DELETE, both queued to
+    the database's writer thread, so their cost doesn't grow with the history. Every
+    COMPACT_EVERY appends the history is trimmed to its retention limit, deleting the
+    cached images of dropped entries, and the file is vacuumed once enough pages are
+    free. Entries are dicts with the keys in FIELDS plus "seq", which orders them by
+    arrival. Appending an entry with an existing id replaces it and moves it to the end,
+    which is how grouped notifications are updated.
+    """
+
+    def __init__(self, path: str = NOTIFICATION_DB, limit: int = HISTORY_LIMIT):
+        self.limit = limit
+        self.db = Database.get(path, NOTIFICATION_SCHEMA)
+        self._appends = 0
+        self._add_count_column()
+        self._import_legacy_history()
+        self.compact()
+
+    def _add_count_column(self):
+        # Databases created before notifications were grouped lack the count
+        columns = {row[1] for row in self.db.query("PRAGMA table_info(notifications)")}
+        if "count" not in columns:
+            self.db.write("ALTER TABLE notifications ADD COLUMN count INTEGER DEFAULT 1")
+            self.db.flush()
+
+    @staticmethod
+    def _to_note(row: tuple) -> dict:
+        return dict(zip(("seq",) + FIELDS, row))
+
+    def _import_legacy_history(self):
+        if not os.path.exists(LEGACY_HISTORY_FILE):
+            return
+        try:
+            with open(LEGACY_HISTORY_FILE, "r") as f:
+                notes = json.load(f)
+            # The old file lists the newest notification first
+            self.db.write_many(
+                (
+                    f"INSERT OR IGNORE INTO notifications ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                    tuple(note.get(field) for field in FIELDS),
+                )
+                for note in reversed(notes)
+                if note.get("id")
+            )
+            # The history is read right after this, so the import has to be visible
+            self.db.flush()
+            os.remove(LEGACY_HISTORY_FILE)
+            logger.info(f"[Notifications] Imported {len(notes)} entries from {LEGACY_HISTORY_FILE}")
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"{Colors.WARNING}[Notifications] Ignoring unreadable legacy history: {e}")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def recent(self, limit: int | None = None, before: int | None = None) -> list[dict]:
+        """The newest entries first, optionally only those older than the seq `before`."""
+        limit = self.limit if limit is None else limit
+        if before is None:
+            rows = self.db.query(
+                f"SELECT {_COLUMNS} FROM notifications ORDER BY seq DESC LIMIT ?", (limit,)
+            )
+        else:
+            rows = self.db.query(
+                f"SELECT {_COLUMNS} FROM notifications WHERE seq < ? ORDER BY seq DESC LIMIT ?",
+                (before, limit),
+            )
+        return [self._to_note(row) for row in rows]
+
+    def by_app(self, app_name: str) -> list[dict]:
+        rows = self.db.query(
+            f"SELECT {_COLUMNS} FROM notifications WHERE app_name = ? ORDER BY seq DESC", (app_name,)
+        )
+        return [self._to_note(row) for row in rows]
+
+    def count(self) -> int:
+        row = self.db.query_one("SELECT COUNT(*) FROM notifications")
+        return row[0] if row else 0
+
+    def ids(self) -> set[str]:
+        return {row[0] for row in self.db.query("SELECT id FROM notifications")}
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, note: dict):
+        self.db.write(
+            f"INSERT OR REPLACE INTO notifications ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+            tuple(note.get(field) for field in FIELDS),
+        )
+        self._appends += 1
+        if self._appends >= COMPACT_EVERY:
+            self.compact()
+
+    def remove(self, note_id: str):
+        self.db.write("DELETE FROM notifications WHERE id = ?", (note_id,))
+
+    def remove_app(self, app_name: str):
+        self.db.write("DELETE FROM notifications WHERE app_name = ?", (app_name,))
+
+    def clear(self):
+        self.db.write("DELETE FROM notifications")
+
+    def compact(self):
+        """Drop entries beyond the retention limit with their images, vacuuming if worthwhile."""
+        self._appends = 0
+        # Rows still queued for writing aren't visible here, which only makes the cut older
+        expired = self.db.query(
+            "SELECT seq, cached_image_path FROM notifications ORDER BY seq DESC LIMIT -1 OFFSET ?",
+            (self.limit,),
+        )
+        if expired:
+            self.db.write("DELETE FROM notifications WHERE seq <= ?", (expired[0][0],))
+            for _, image_path in expired:
+                if image_path:
+                    self._remove_image(image_path)
+
+        free_pages = self.db.query_one("PRAGMA freelist_count")
+        if free_pages and free_pages[0] >= VACUUM_FREE_PAGES:
+            # VACUUM can't share a transaction with other statements
+            self.db.write("VACUUM")
+
+    @staticmethod
+    def _remove_image(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[Notifications] Failed to delete cached image {path}: {e}")
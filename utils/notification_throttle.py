@@ -0,0 +1,40 @@
+import time
+from collections.abc import Callable
+
+
+class NotificationThrottle:
+    """
+    Per-app token buckets deciding which notifications may open a popup.
+
+    Every app starts with `burst` tokens and regains `rate_per_minute` tokens per
+    minute, up to `burst`. Each popup takes a token; an app without one is over its
+    limit. A rate of 0 turns the limit off.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate_per_minute / 60
+        self.burst = max(burst, 1)
+        self._clock = clock
+        # App name -> [tokens, time of the last refill]
+        self._buckets: dict[str, list[float]] = {}
+
+    def allow(self, app_name: str) -> bool:
+        """Take a token for app_name, returning False if it has none left."""
+        if self.rate <= 0:
+            return True
+        now = self._clock()
+        bucket = self._buckets.get(app_name)
+        if bucket is None:
+            bucket = self._buckets[app_name] = [float(self.burst), now]
+        else:
+            bucket[0] = min(bucket[0] + (now - bucket[1]) * self.rate, self.burst)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
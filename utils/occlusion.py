@@ -1,25 +1,97 @@
-import subprocess
-import json
+from services.hyprland_state import HyprlandState
+
+
+def _intersects(a, b):
+    """Check whether two (x1, y1, x2, y2) rectangles overlap."""
+    return not (a[2] <= b[0] or a[0] >= b[2] or a[3] <= b[1] or a[1] >= b[3])
+
+
+class OcclusionEngine:
+    """
+    Per-workspace index of mapped window rectangles, built from the shared Hyprland state.
+
+    Regions registered with watch() are re-evaluated in memory whenever the window
+    geometry or the active workspace changes, and their callbacks only fire when the
+    answer actually changes. Nothing is polled.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if OcclusionEngine.instance is None:
+            OcclusionEngine.instance = OcclusionEngine()
+
+        return OcclusionEngine.instance
+
+    def __init__(self):
+        self.state = HyprlandState.get_initial()
+        self._rects: dict[int, list[tuple[int, int, int, int]]] = {}
+        self._watchers = []  # [region, callback, last_result]
+
+        self._rebuild_index()
+        self.state.connect("geometry-changed", self._on_geometry_changed)
+        self.state.connect("workspace-changed", lambda *_: self._notify_watchers())
+        # Hyprland has no event for moving or resizing a floating window, but it
+        # focuses it first, so refresh the geometry once per focus change.
+        self.state.connect("focus-changed", lambda *_: self.state.schedule_resync())
+
+    def _rebuild_index(self):
+        rects = {}
+        for client in self.state.clients:
+            if not client.get("mapped", False):
+                continue
+            position = client.get("at")
+            size = client.get("size")
+            if not position or not size or not size[0] or not size[1]:
+                continue
+            x, y = position
+            width, height = size
+            rects.setdefault(client["workspace"]["id"], []).append((x, y, x + width, y + height))
+        self._rects = rects
+
+    def _on_geometry_changed(self, *_):
+        self._rebuild_index()
+        self._notify_watchers()
+
+    def _notify_watchers(self):
+        for watcher in self._watchers:
+            result = self.is_occluded(watcher[0])
+            if result != watcher[2]:
+                watcher[2] = result
+                watcher[1](result)
+
+    def is_occluded(self, occlusion_region, workspace=None) -> bool:
+        """
+        Check if a region is occupied by any window on a given workspace.
+
+        Parameters:
+            occlusion_region (tuple): A tuple (x, y, width, height) defining the region to check.
+            workspace (int, optional): The workspace ID to check. If None, the active workspace is used.
+        """
+        if workspace is None:
+            workspace = self.state.active_workspace
+
+        occ_x, occ_y, occ_width, occ_height = occlusion_region
+        region = (occ_x, occ_y, occ_x + occ_width, occ_y + occ_height)
+        return any(_intersects(rect, region) for rect in self._rects.get(workspace, ()))
+
+    def watch(self, occlusion_region, callback):
+        """
+        Call callback(occluded: bool) whenever the occupancy of the region on the active
+        workspace changes. The callback is invoked once immediately with the current value.
+        """
+        result = self.is_occluded(occlusion_region)
+        self._watchers.append([occlusion_region, callback, result])
+        callback(result)
+
 
 def get_current_workspace():
     """
-    Get the current workspace ID using hyprctl.
+    Get the current workspace ID from the shared Hyprland state.
     """
-    try:
-        result = subprocess.run(
-            ["hyprctl", "activeworkspace"],
-            capture_output=True,
-            text=True
-        )
-        # Assume the output similar to: "ID <number>"
-        # Extracting the number from the output
-        parts = result.stdout.split()
-        for i, part in enumerate(parts):
-            if part == "ID" and i + 1 < len(parts):
-                return int(parts[i+1])
-    except Exception as e:
-        print(f"Error getting current workspace: {e}")
-    return -1
+    return HyprlandState.get_initial().active_workspace
+
 
 def check_occlusion(occlusion_region, workspace=None):
     """
@@ -32,47 +104,4 @@ def check_occlusion(occlusion_region, workspace=None):
     Returns:
         bool: True if any window overlaps with the occlusion region, False otherwise.
     """
-    if workspace is None:
-        workspace = get_current_workspace()
-
-    try:
-        result = subprocess.run(
-            ["hyprctl", "-j", "clients"],
-            capture_output=True,
-            text=True
-        )
-        clients = json.loads(result.stdout)
-    except Exception as e:
-        print(f"Error retrieving client windows: {e}")
-        return False
-
-    occ_x, occ_y, occ_width, occ_height = occlusion_region
-    occ_x2 = occ_x + occ_width
-    occ_y2 = occ_y + occ_height
-
-    for client in clients:
-        # Check if client is mapped
-        if not client.get("mapped", False):
-            continue
-
-        # Ensure client has proper workspace information and matches the workspace
-        client_workspace = client.get("workspace", {})
-        if client_workspace.get("id") != workspace:
-            continue
-
-        # Ensure client has position and size info
-        position = client.get("at")
-        size = client.get("size")
-        if not position or not size:
-            continue
-
-        x, y = position
-        width, height = size
-        win_x1, win_y1 = x, y
-        win_x2, win_y2 = x + width, y + height
-
-        # Check for intersection between the window and occlusion region
-        if not (win_x2 <= occ_x or win_x1 >= occ_x2 or win_y2 <= occ_y or win_y1 >= occ_y2):
-            return True  # Occlusion region is occupied
-
-    return False  # No window overlaps the occlusion region
+    return OcclusionEngine.get_initial().is_occluded(occlusion_region, workspace)
@@ -0,0 +1,55 @@
+from array import array
+from itertools import islice
+
+
+class RingBuffer:
+    """
+    Fixed-size, array-backed history of floats that overwrites its oldest value once full.
+
+    The values live in `data` in storage order; segments() gives the index ranges that
+    read them oldest to newest, so consumers can walk the history without copying it.
+    """
+
+    def __init__(self, capacity: int, typecode: str = "d"):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.data = array(typecode, bytes(capacity * array(typecode).itemsize))
+        self._start = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def append(self, value: float):
+        end = self._start + self._length
+        if end >= self.capacity:
+            end -= self.capacity
+        self.data[end] = value
+        if self._length < self.capacity:
+            self._length += 1
+        else:
+            self._start = end + 1 if end + 1 < self.capacity else 0
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def segments(self) -> tuple[range, range]:
+        """Indices into data holding the values from oldest to newest, split at the wrap."""
+        end = self._start + self._length
+        if end <= self.capacity:
+            return range(self._start, end), range(0)
+        return range(self._start, self.capacity), range(0, end - self.capacity)
+
+    def latest(self) -> float | None:
+        if not self._length:
+            return None
+        end = self._start + self._length - 1
+        return self.data[end - self.capacity if end >= self.capacity else end]
+
+    def max(self) -> float:
+        if not self._length:
+            return 0.0
+        # Until the buffer is full the values start at index 0 and never wrap
+        return max(islice(self.data, self._length))
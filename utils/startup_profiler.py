@@ -0,0 +1,158 @@
+"""
+Startup profiler enabled with `python main.py --profile-startup`.
+
+Only the standard library is imported here, so the import hook can be installed
+before gi, fabric or any shell module is loaded.
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+REPORT_LIMIT = 40  # Slowest imports listed in the report
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module; everything else is delegated."""
+
+    def __init__(self, loader, fullname: str, profiler: "StartupProfiler"):
+        self._loader = loader
+        self._fullname = fullname
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self._profiler.import_timer(self._fullname):
+            self._loader.exec_module(module)
+
+
+class _ImportTimer:
+    """Meta path finder that asks the real finders for a spec and wraps its loader."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self._profiler = profiler
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(spec.loader, fullname, self._profiler)
+            return spec
+        return None
+
+
+class StartupProfiler:
+    """
+    Records how long each module takes to import and each top-level widget takes to
+    construct, and writes a report once the bar has been painted for the first time.
+    """
+
+    instance = None
+
+    @staticmethod
+    def get_initial():
+        if StartupProfiler.instance is None:
+            StartupProfiler.instance = StartupProfiler()
+
+        return StartupProfiler.instance
+
+    def __init__(self):
+        self.enabled = False
+        # name -> [cumulative ms, self ms]
+        self.imports: dict[str, list[float]] = {}
+        self.constructors: list[tuple[str, float]] = []
+        self.first_paint_ms: float | None = None
+        self._import_stack: list[list[float]] = []
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        sys.meta_path.insert(0, _ImportTimer(self))
+
+    @contextmanager
+    def import_timer(self, name: str):
+        # Child imports are subtracted from their parent to get its own cost
+        frame = [time.perf_counter(), 0.0]
+        self._import_stack.append(frame)
+        try:
+            yield
+        finally:
+            self._import_stack.pop()
+            elapsed = (time.perf_counter() - frame[0]) * 1000
+            self.imports[name] = [elapsed, elapsed - frame[1]]
+            if self._import_stack:
+                self._import_stack[-1][1] += elapsed
+
+    @contextmanager
+    def measure(self, label: str):
+        """Time a block such as a constructor. Does nothing unless profiling is enabled."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.constructors.append((label, (time.perf_counter() - start) * 1000))
+
+    def watch_first_paint(self, widget, report_path: str):
+        """Write the report right after the first frame of widget is drawn."""
+        if not self.enabled:
+            return
+
+        def on_draw(*_):
+            widget.disconnect(handler)
+            self.first_paint_ms = (time.perf_counter() - PROCESS_START) * 1000
+            self.write_report(report_path)
+            return False
+
+        handler = widget.connect_after("draw", on_draw)
+
+    def format_report(self) -> str:
+        lines = ["Ax-Shell startup profile", ""]
+        if self.first_paint_ms is not None:
+            lines.append(f"First bar paint: {self.first_paint_ms:.1f} ms after launch")
+            lines.append("")
+
+        lines.append(f"Slowest imports (cumulative / self, ms), {len(self.imports)} modules total")
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (cumulative, own) in slowest[:REPORT_LIMIT]:
+            lines.append(f"  {name:<48} {cumulative:9.1f} {own:9.1f}")
+        lines.append("")
+
+        lines.append("Constructors (ms)")
+        for label, elapsed in self.constructors:
+            lines.append(f"  {label:<48} {elapsed:9.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path: str):
+        report = self.format_report()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(report)
+        except OSError as e:
+            print(f"Failed to write startup profile to {path}: {e}")
+        print(report)
+        print(f"Startup profile written to {path}")
+
+
+def enable_from_argv() -> StartupProfiler:
+    """Enable profiling if --profile-startup was passed, and hide the flag from GTK."""
+    profiler = StartupProfiler.get_initial()
+    if "--profile-startup" in sys.argv:
+        sys.argv.remove("--profile-startup")
+        profiler.enable()
+    return profiler
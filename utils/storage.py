@@ -0,0 +1,150 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from collections.abc import Callable, Iterable
+
+from gi.repository import GLib
+from loguru import logger
+
+from utils.colors import Colors
+
+# How long to wait for queued writes when the shell exits
+FLUSH_TIMEOUT_S = 2
+
+_STOP = object()
+
+
+class Database:
+    """
+    One long-lived SQLite connection per database file.
+
+    The schema is applied once, when the database is first opened. Reads run on the
+    calling (main) thread through a cached connection. Writes are queued to a
+    background thread with its own connection; WAL mode lets both work at the same time.
+    Write callbacks are invoked on the GLib main loop once the write is committed.
+    Pass wal=False for files shared with other programs, which keep their journal mode.
+    attach maps schema names to further database files opened on both connections,
+    so data of our own can sit next to a file we don't control.
+    """
+
+    _instances: dict[str, "Database"] = {}
+
+    @staticmethod
+    def get(
+        path: str,
+        schema: Iterable[str] = (),
+        wal: bool = True,
+        attach: dict[str, str] | None = None,
+    ) -> "Database":
+        path = os.path.abspath(os.path.expanduser(path))
+        if path not in Database._instances:
+            Database._instances[path] = Database(path, schema, wal, attach)
+
+        return Database._instances[path]
+
+    def __init__(
+        self,
+        path: str,
+        schema: Iterable[str] = (),
+        wal: bool = True,
+        attach: dict[str, str] | None = None,
+    ):
+        self.path = path
+        self.wal = wal
+        self.attach = {
+            name: os.path.abspath(os.path.expanduser(attached_path))
+            for name, attached_path in (attach or {}).items()
+        }
+        for attached_path in [path, *self.attach.values()]:
+            os.makedirs(os.path.dirname(attached_path), exist_ok=True)
+        self._conn = self._connect()
+        with self._conn:
+            for statement in schema:
+                self._conn.execute(statement)
+
+        self._writes: queue.Queue = queue.Queue()
+        self._writer: threading.Thread | None = None
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=5,
+            check_same_thread=False,
+        )
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        for name, attached_path in self.attach.items():
+            conn.execute(f"ATTACH DATABASE ? AS {name}", (attached_path,))
+            # Attached files are always our own
+            conn.execute(f"PRAGMA {name}.journal_mode=WAL")
+            conn.execute(f"PRAGMA {name}.synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        try:
+            return self._conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"{Colors.ERROR}[Database] Query failed on {self.path}: {e}")
+            return []
+
+    def query_one(self, sql: str, params: tuple = ()) -> tuple | None:
+        try:
+            return self._conn.execute(sql, params).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"{Colors.ERROR}[Database] Query failed on {self.path}: {e}")
+            return None
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def write(self, sql: str, params: tuple = (), callback: Callable[[], None] | None = None):
+        """Queue a single statement; callback runs on the main loop after it is committed."""
+        self.write_many([(sql, params)], callback)
+
+    def write_many(
+        self,
+        statements: Iterable[tuple[str, tuple]],
+        callback: Callable[[], None] | None = None,
+    ):
+        """Queue several statements to be committed in one transaction."""
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="db-writer", daemon=True)
+            self._writer.start()
+        self._writes.put((list(statements), callback))
+
+    def _write_loop(self):
+        conn = self._connect()
+        while (task := self._writes.get()) is not _STOP:
+            statements, callback = task
+            try:
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"{Colors.ERROR}[Database] Write failed on {self.path}: {e}")
+            if callback is not None:
+                GLib.idle_add(lambda cb=callback: cb() and False)
+            self._writes.task_done()
+        self._writes.task_done()
+        conn.close()
+
+    def flush(self):
+        """Block until every queued write is committed."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def close(self):
+        """Finish queued writes and stop the writer thread."""
+        if self._writer is not None and self._writer.is_alive():
+            self._writes.put(_STOP)
+            self._writer.join(FLUSH_TIMEOUT_S)
+        self._writer = None
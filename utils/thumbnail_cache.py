@@ -0,0 +1,190 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from loguru import logger
+
+from utils.colors import Colors
+
+MANIFEST_NAME = "manifest.json"
+
+
+class ThumbnailCache:
+    """
+    On-disk thumbnail cache keyed on the identity of the source file.
+
+    A thumbnail is stored as <key>.png, where the key is derived from the source's
+    device, inode, size and modification time. Renaming a wallpaper keeps its thumbnail,
+    while editing or replacing it produces a new key. A compact JSON manifest records the
+    size and last use of every thumbnail, so valid thumbnails are found with a single
+    stat() and no image decoding. Least recently used thumbnails are evicted once the
+    cache grows past its size budget, and PNGs the manifest doesn't know are removed.
+    Thumbnails still being rendered are never treated as orphans.
+
+    lookup() and get_or_create() may be called from worker threads.
+    """
+
+    def __init__(self, cache_dir: str, size_budget: int):
+        self.cache_dir = cache_dir
+        self.size_budget = size_budget
+        self._manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        # key -> [size in bytes, last used timestamp]
+        self._entries: dict[str, list] = {}
+        self._keys_by_path: dict[str, str] = {}
+        # Keys whose PNG is being rendered and isn't in the manifest yet
+        self._creating: set[str] = set()
+        self._dirty = False
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, "r") as f:
+                entries = json.load(f)
+            if isinstance(entries, dict):
+                self._entries = {k: v for k, v in entries.items() if isinstance(v, list) and len(v) == 2}
+        except FileNotFoundError:
+            pass
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"{Colors.WARNING}[ThumbnailCache] Discarding unreadable manifest: {e}")
+
+    def save(self):
+        """Write the manifest if it changed. Cheap to call after every batch."""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        tmp_path = f"{self._manifest_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, separators=(",", ":"))
+            os.replace(tmp_path, self._manifest_path)
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[ThumbnailCache] Failed to write manifest: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def key_for(source_path: str) -> str | None:
+        try:
+            st = os.stat(source_path)
+        except OSError:
+            return None
+        return f"{st.st_dev:x}-{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+    def path_for_key(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def lookup(self, source_path: str) -> str | None:
+        """Return the thumbnail path for source_path if a valid one is cached."""
+        key = self.key_for(source_path)
+        if key is None:
+            return None
+        with self._lock:
+            self._keys_by_path[source_path] = key
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry[1] = int(time.time())
+            self._dirty = True
+        return self.path_for_key(key)
+
+    def get_or_create(self, source_path: str, create: Callable[[str, str], None]) -> str | None:
+        """
+        Return the thumbnail path for source_path, calling create(source_path, thumb_path)
+        to render it first if it is missing. Returns None if the source can't be read.
+        """
+        cached = self.lookup(source_path)
+        if cached is not None:
+            return cached
+
+        key = self._keys_by_path.get(source_path)
+        if key is None:
+            return None
+        thumb_path = self.path_for_key(key)
+        with self._lock:
+            self._creating.add(key)
+        try:
+            create(source_path, thumb_path)
+            size = os.path.getsize(thumb_path)
+        except Exception as e:
+            logger.error(f"{Colors.ERROR}[ThumbnailCache] Failed to create thumbnail for {source_path}: {e}")
+            with self._lock:
+                self._creating.discard(key)
+            return None
+
+        with self._lock:
+            self._creating.discard(key)
+            self._entries[key] = [size, int(time.time())]
+            self._dirty = True
+        return thumb_path
+
+    def invalidate(self, source_path: str):
+        """Forget the thumbnail of a file that was deleted or is known to be stale."""
+        with self._lock:
+            key = self._keys_by_path.pop(source_path, None)
+            if key is None or key in self._keys_by_path.values():
+                return
+            self._entries.pop(key, None)
+            self._dirty = True
+        self._remove(self.path_for_key(key))
+
+    # ------------------------------------------------------------------
+    # Eviction and garbage collection
+    # ------------------------------------------------------------------
+
+    def evict(self):
+        """Drop least recently used thumbnails until the cache fits its size budget."""
+        with self._lock:
+            total = sum(size for size, _ in self._entries.values())
+            if total <= self.size_budget:
+                return
+            victims = []
+            for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+                if total <= self.size_budget:
+                    break
+                victims.append(key)
+                total -= size
+            for key in victims:
+                del self._entries[key]
+                self._remove(self.path_for_key(key))
+            self._dirty = True
+
+    def collect_garbage(self):
+        """Remove PNGs missing from the manifest and manifest entries missing on disk."""
+        # The lock is held throughout, so a thumbnail can't be rendered or registered
+        # between the scan and the deletions
+        with self._lock:
+            try:
+                with os.scandir(self.cache_dir) as it:
+                    on_disk = {entry.name[:-4] for entry in it if entry.name.endswith(".png")}
+            except OSError:
+                return
+            orphans = on_disk - self._entries.keys() - self._creating
+            missing = self._entries.keys() - on_disk
+            for key in missing:
+                del self._entries[key]
+            if missing:
+                self._dirty = True
+            for key in orphans:
+                self._remove(self.path_for_key(key))
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"{Colors.ERROR}[ThumbnailCache] Failed to delete {path}: {e}")
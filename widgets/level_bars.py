@@ -0,0 +1,75 @@
+from typing import Literal
+
+import cairo
+import gi
+from fabric.widgets.widget import Widget
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk  # noqa: E402
+
+
+class LevelBars(Gtk.DrawingArea, Widget):
+    """
+    Draws a row of vertical bars, one per value, e.g. the usage of every CPU core.
+
+    Bars are filled from the bottom in the CSS color of the widget over a track of the
+    same color at track_alpha. Values are fractions between 0.0 and 1.0.
+    """
+
+    def __init__(
+        self,
+        values: tuple[float, ...] = (),
+        gap: float = 1.0,
+        track_alpha: float = 0.2,
+        name: str | None = None,
+        visible: bool = True,
+        style_classes: str | list[str] | None = None,
+        h_align: Literal["fill", "start", "end", "center", "baseline"] | Gtk.Align | None = None,
+        v_align: Literal["fill", "start", "end", "center", "baseline"] | Gtk.Align | None = None,
+        h_expand: bool = False,
+        v_expand: bool = False,
+        size: tuple[int, int] | int | None = None,
+        **kwargs,
+    ):
+        Gtk.DrawingArea.__init__(self)
+        Widget.__init__(
+            self,
+            name=name,
+            visible=visible,
+            style_classes=style_classes,
+            h_align=h_align,
+            v_align=v_align,
+            h_expand=h_expand,
+            v_expand=v_expand,
+            size=size,
+            **kwargs,
+        )
+        self.values = values
+        self.gap = gap
+        self.track_alpha = track_alpha
+        self.connect("draw", self.on_draw)
+
+    def set_values(self, values: tuple[float, ...]):
+        self.values = values
+        self.queue_draw()
+
+    def on_draw(self, widget: "LevelBars", cr: cairo.Context):
+        count = len(self.values)
+        if not count:
+            return
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        bar_width = max((width - self.gap * (count - 1)) / count, 1.0)
+        color = self.get_style_context().get_color(self.get_state_flags())
+
+        # One path per color keeps this to two fills however many cores there are
+        cr.set_source_rgba(color.red, color.green, color.blue, color.alpha * self.track_alpha)
+        for i in range(count):
+            cr.rectangle(i * (bar_width + self.gap), 0, bar_width, height)
+        cr.fill()
+
+        cr.set_source_rgba(color.red, color.green, color.blue, color.alpha)
+        for i, value in enumerate(self.values):
+            bar_height = min(max(value, 0.0), 1.0) * height
+            cr.rectangle(i * (bar_width + self.gap), height - bar_height, bar_width, bar_height)
+        cr.fill()
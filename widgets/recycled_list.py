@@ -0,0 +1,214 @@
+import math
+from collections.abc import Callable, Sequence
+
+from fabric.widgets.box import Box
+from fabric.widgets.scrolledwindow import ScrolledWindow
+from gi.repository import GLib, Gtk
+
+
+class RecycledList(ScrolledWindow):
+    """
+    A scrolled list that only owns enough row widgets to fill its visible area.
+
+    Rows are built once with create_row() and re-bound with bind_row(row, item, index)
+    whenever the list is scrolled or given new items. Spacers above and below the pool
+    give the scrollbar the same range it would have with one widget per item, so every
+    row must have the same height. The bound item and its index are stored on the row
+    as row.item and row.item_index.
+
+    If on_end_reached is given, it is called whenever the last page of items comes into
+    view, so owners can fetch more items lazily and pass them to extend_items().
+    """
+
+    def __init__(
+        self,
+        create_row: Callable[[], Gtk.Widget],
+        bind_row: Callable[[Gtk.Widget, object, int], None],
+        row_height: int,
+        spacing: int = 4,
+        visible_rows: int | None = None,
+        viewport_name: str = "viewport",
+        on_end_reached: Callable[[], None] | None = None,
+        **kwargs,
+    ):
+        top_spacer = Box()
+        bottom_spacer = Box()
+        rows_box = Box(orientation="v", spacing=spacing)
+        viewport = Box(
+            name=viewport_name,
+            orientation="v",
+            children=[top_spacer, rows_box, bottom_spacer],
+        )
+        super().__init__(child=viewport, **kwargs)
+
+        self.viewport = viewport
+        self._top_spacer = top_spacer
+        self._bottom_spacer = bottom_spacer
+        self._rows_box = rows_box
+        self._create_row = create_row
+        self._bind_row = bind_row
+        # Height of one row plus the gap to the next one, corrected once rows are allocated
+        self._row_height = row_height
+        self._spacing = spacing
+        self._visible_rows = visible_rows
+        self._on_end_reached = on_end_reached
+        self._items: list = []
+        self._rows: list[Gtk.Widget] = []
+        self._first = 0
+        self._bound_count = -1
+        self._dirty = True
+        self._relayout_id = 0
+        self.selected_index = -1
+
+        if visible_rows is not None:
+            self._fit_visible_rows()
+
+        adjustment = self.get_vadjustment()
+        adjustment.connect("value-changed", lambda *_: self._layout())
+        adjustment.connect("notify::page-size", lambda *_: self._schedule_relayout())
+        rows_box.connect("size-allocate", self._on_rows_allocate)
+
+    @property
+    def items(self) -> list:
+        return self._items
+
+    @property
+    def selected_item(self):
+        if 0 <= self.selected_index < len(self._items):
+            return self._items[self.selected_index]
+        return None
+
+    def set_items(self, items: Sequence):
+        """Replace the items, scroll back to the top and clear the selection."""
+        self._items = list(items)
+        self.selected_index = -1
+        self._dirty = True
+        self.get_vadjustment().set_value(0)
+        self._layout()
+
+    def extend_items(self, items: Sequence):
+        """Append items without moving the scroll position or the selection."""
+        self._items.extend(items)
+        self._dirty = True
+        self._layout()
+
+    def refresh(self):
+        """Re-bind the visible rows, e.g. after the items were changed in place."""
+        self._dirty = True
+        self._layout()
+
+    def get_row(self, index: int) -> Gtk.Widget | None:
+        """Return the row currently showing the item at index, if it is bound."""
+        offset = index - self._first
+        if 0 <= index < len(self._items) and 0 <= offset < self._bound_count:
+            return self._rows[offset]
+        return None
+
+    def select(self, index: int):
+        """Move the "selected" style class to the row of index (-1 clears it) and scroll to it."""
+        if not 0 <= index < len(self._items):
+            index = -1
+        for row_index in (self.selected_index, index):
+            row = self.get_row(row_index)
+            if row is not None:
+                self._apply_selected(row, row_index == index)
+        self.selected_index = index
+        if index != -1:
+            self.scroll_to_index(index)
+
+    def scroll_to_index(self, index: int):
+        def scroll():
+            adj = self.get_vadjustment()
+            top = index * self._row_height
+            bottom = top + self._row_height - self._spacing
+            page_size = adj.get_page_size()
+            if top < adj.get_value():
+                # Item above viewport - align to top
+                adj.set_value(top)
+            elif bottom > adj.get_value() + page_size:
+                # Item below viewport - align to bottom
+                adj.set_value(bottom - page_size)
+            return False
+
+        # Wait for the spacers of new items to be allocated, otherwise the value is clamped
+        GLib.idle_add(scroll)
+
+    def _fit_visible_rows(self):
+        height = self._visible_rows * self._row_height - self._spacing
+        self.set_min_content_height(height)
+        self.set_max_content_height(height)
+
+    def _pool_size(self) -> int:
+        if self._visible_rows is not None:
+            rows = self._visible_rows
+        else:
+            page_size = self.get_vadjustment().get_page_size() or self.get_max_content_height()
+            rows = math.ceil(max(page_size, 0) / self._row_height)
+        # One extra row covers the partially visible rows at both edges while scrolling
+        return rows + 1
+
+    def _layout(self):
+        count = len(self._items)
+        bound_count = min(count, self._pool_size())
+        while len(self._rows) < bound_count:
+            row = self._create_row()
+            row.show_all()
+            self._rows_box.add(row)
+            self._rows.append(row)
+
+        first = int(self.get_vadjustment().get_value() // self._row_height)
+        first = max(0, min(first, count - bound_count))
+        if not self._dirty and first == self._first and bound_count == self._bound_count:
+            return
+        self._dirty = False
+        self._first = first
+        self._bound_count = bound_count
+
+        self._top_spacer.set_size_request(-1, first * self._row_height)
+        self._bottom_spacer.set_size_request(-1, (count - first - bound_count) * self._row_height)
+
+        for offset, row in enumerate(self._rows):
+            if offset >= bound_count:
+                row.item = None
+                row.item_index = -1
+                row.set_visible(False)
+                continue
+            index = first + offset
+            row.item = self._items[index]
+            row.item_index = index
+            self._bind_row(row, row.item, index)
+            self._apply_selected(row, index == self.selected_index)
+            row.set_visible(True)
+
+        if self._on_end_reached is not None and count and first + 2 * bound_count >= count:
+            self._on_end_reached()
+
+    @staticmethod
+    def _apply_selected(row: Gtk.Widget, selected: bool):
+        if selected:
+            row.get_style_context().add_class("selected")
+        else:
+            row.get_style_context().remove_class("selected")
+
+    def _schedule_relayout(self):
+        self._dirty = True
+        if not self._relayout_id:
+            self._relayout_id = GLib.idle_add(self._relayout)
+
+    def _relayout(self):
+        self._relayout_id = 0
+        self._layout()
+        return False
+
+    def _on_rows_allocate(self, rows_box, allocation):
+        # Rows are styled by CSS, so the real height is only known after allocation
+        visible = [row for row in self._rows if row.get_visible()]
+        if not visible:
+            return
+        row_height = visible[0].get_allocated_height() + self._spacing
+        if row_height > self._spacing and row_height != self._row_height:
+            self._row_height = row_height
+            if self._visible_rows is not None:
+                self._fit_visible_rows()
+            # Resizing the spacers inside an allocation would be ignored until the next one
+            self._schedule_relayout()
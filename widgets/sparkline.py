@@ -0,0 +1,96 @@
+from typing import Literal
+
+import cairo
+import gi
+from fabric.widgets.widget import Widget
+
+from utils.ring_buffer import RingBuffer
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk  # noqa: E402
+
+
+class Sparkline(Gtk.DrawingArea, Widget):
+    """
+    Draws the history held in a RingBuffer as a filled line, newest value at the right.
+
+    Values are read straight from the buffer's array while drawing. The line takes the
+    CSS color of the widget and the fill the same color at fill_alpha. With maximum=None
+    the vertical scale follows the largest value in the buffer.
+    """
+
+    def __init__(
+        self,
+        buffer: RingBuffer,
+        maximum: float | None = 100.0,
+        line_width: float = 1.5,
+        fill_alpha: float = 0.25,
+        name: str | None = None,
+        visible: bool = True,
+        style_classes: str | list[str] | None = None,
+        h_align: Literal["fill", "start", "end", "center", "baseline"] | Gtk.Align | None = None,
+        v_align: Literal["fill", "start", "end", "center", "baseline"] | Gtk.Align | None = None,
+        h_expand: bool = False,
+        v_expand: bool = False,
+        size: tuple[int, int] | int | None = None,
+        **kwargs,
+    ):
+        Gtk.DrawingArea.__init__(self)
+        Widget.__init__(
+            self,
+            name=name,
+            visible=visible,
+            style_classes=style_classes,
+            h_align=h_align,
+            v_align=v_align,
+            h_expand=h_expand,
+            v_expand=v_expand,
+            size=size,
+            **kwargs,
+        )
+        self.buffer = buffer
+        self.maximum = maximum
+        self.line_width = line_width
+        self.fill_alpha = fill_alpha
+        self.connect("draw", self.on_draw)
+
+    def on_draw(self, widget: "Sparkline", cr: cairo.Context):
+        buffer = self.buffer
+        count = len(buffer)
+        if count < 2:
+            return
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        maximum = self.maximum if self.maximum is not None else buffer.max()
+        if maximum <= 0:
+            maximum = 1.0
+
+        inset = self.line_width / 2
+        scale_y = (height - self.line_width) / maximum
+        step = width / (buffer.capacity - 1)
+        # Right-aligned, so a buffer that is still filling up grows from the right edge
+        x = width - (count - 1) * step
+        bottom = height - inset
+
+        data = buffer.data
+        first, second = buffer.segments()
+        cr.move_to(x, bottom - min(data[first.start], maximum) * scale_y)
+        for segment in (first, second):
+            for i in segment:
+                cr.line_to(x, bottom - min(data[i], maximum) * scale_y)
+                x += step
+
+        color = self.get_style_context().get_color(self.get_state_flags())
+        cr.set_line_width(self.line_width)
+        cr.set_line_join(cairo.LINE_JOIN_ROUND)
+        cr.set_source_rgba(color.red, color.green, color.blue, color.alpha)
+        path = cr.copy_path()
+        cr.stroke()
+
+        # Close the same path along the bottom edge for the fill
+        cr.append_path(path)
+        cr.line_to(width, height)
+        cr.line_to(width - (count - 1) * step, height)
+        cr.close_path()
+        cr.set_source_rgba(color.red, color.green, color.blue, color.alpha * self.fill_alpha)
+        cr.fill()